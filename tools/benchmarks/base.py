@@ -0,0 +1,87 @@
+"""
+Measure and save the results of the benchmarks.
+"""
+
+# Author: Georgios Douzas <gdouzas@icloud.com>
+# License: MIT
+
+import sys
+import platform
+from datetime import datetime, timezone
+from json import dump, load
+from multiprocessing import get_context
+from os.path import dirname, abspath
+from resource import getrusage, RUSAGE_SELF
+from subprocess import run, CalledProcessError
+
+import numpy as np
+
+ROOT_PATH = dirname(dirname(dirname(abspath(__file__))))
+PERCENTILES = (50, 90, 99)
+
+
+def run_isolated(func, *args):
+    """Run a function in a new process, therefore its peak memory is not affected by previous runs."""
+    with get_context('spawn').Pool(1) as pool:
+        return pool.apply(func, args)
+
+
+def get_peak_rss():
+    """Get the peak resident set size of the current process in bytes."""
+    peak_rss = getrusage(RUSAGE_SELF).ru_maxrss
+    return peak_rss if sys.platform == 'darwin' else peak_rss * 1024
+
+
+def summarize_latencies(latencies):
+    """Calculate the mean, minimum and percentiles of latencies."""
+    latencies = np.asarray(latencies)
+    return {
+        'mean': float(latencies.mean()),
+        'min': float(latencies.min()),
+        **{f'p{percentile}': float(np.percentile(latencies, percentile)) for percentile in PERCENTILES}
+    }
+
+
+def collect_metadata():
+    """Collect the commit, platform and versions of the main dependencies."""
+    try:
+        commit = run(['git', 'rev-parse', 'HEAD'], cwd=ROOT_PATH, check=True, capture_output=True, text=True).stdout.strip()
+    except (CalledProcessError, OSError):
+        commit = None
+    versions = {}
+    for module_name in ('numpy', 'scipy', 'sklearn', 'imblearn', 'sklearnext'):
+        try:
+            versions[module_name] = __import__(module_name).__version__
+        except (ImportError, AttributeError):
+            versions[module_name] = None
+    return {
+        'commit': commit,
+        'date': datetime.now(timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'processor': platform.processor(),
+        'versions': versions,
+    }
+
+
+def save_results(path, benchmark, results, parameters):
+    """Save the results of a benchmark as a JSON file."""
+    with open(path, 'w') as file:
+        dump({'benchmark': benchmark, 'metadata': collect_metadata(), 'parameters': parameters, 'results': results}, file, indent=2)
+
+
+def compare_results(results, baseline_path, keys, value):
+    """Compare the results of a benchmark to the ones of a baseline file.
+
+    The ratio of the current to the baseline value is calculated for every
+    result that is identified by the same keys in both files.
+    """
+    with open(baseline_path) as file:
+        baseline = {tuple(result[key] for key in keys): result for result in load(file)['results']}
+    comparison = []
+    for result in results:
+        key = tuple(result[key] for key in keys)
+        if key in baseline and 'error' not in baseline[key]:
+            current_value, baseline_value = value(result), value(baseline[key])
+            comparison.append((*key, baseline_value, current_value, current_value / baseline_value if baseline_value else np.nan))
+    return comparison
@@ -0,0 +1,142 @@
+"""
+Benchmark the quality, cost and downstream scores of the full-batch and online clusterers.
+"""
+
+# Author: Georgios Douzas <gdouzas@icloud.com>
+# License: MIT
+
+from argparse import ArgumentParser
+from time import perf_counter
+
+import numpy as np
+
+from .base import run_isolated, get_peak_rss, save_results
+from .oversamplers import DATABASES, generate_datasets_specs, load_dataset
+from .precision import calculate_drift
+
+N_SAMPLES = (10000, 100000, 1000000)
+N_FEATURES = (10, 100)
+FAMILIES = ('kmeans', 'som')
+CASES = ('kmeans_smote_imbalanced:PAGE BLOCKS 0', 'somo_imbalanced:PAGE BLOCKS 0')
+
+
+def calculate_inertia(X, labels, batch_size=10000):
+    """Calculate the mean squared distance of the samples to the mean of their cluster."""
+    n_clusters = labels.max() + 1
+    counts = np.bincount(labels, minlength=n_clusters)
+    sums, squared_norms = np.zeros((n_clusters, X.shape[1])), 0.0
+    for start in range(0, len(X), batch_size):
+        X_chunk, labels_chunk = np.asarray(X[start:start + batch_size], dtype=float), labels[start:start + batch_size]
+        np.add.at(sums, labels_chunk, X_chunk)
+        squared_norms += (X_chunk ** 2).sum()
+    occupied = counts > 0
+    return float((squared_norms - ((sums[occupied] ** 2).sum(axis=1) / counts[occupied]).sum()) / len(X))
+
+
+def fit_clusterer(family, clustering, spec, n_clusters, random_state):
+    """Fit a clusterer of a family to a dataset and measure its duration, peak memory and inertia."""
+    from ..experiment import CLUSTERERS
+    X, _ = load_dataset(spec, random_state)
+    clusterer_class = CLUSTERERS[clustering][FAMILIES.index(family)]
+    clusterer = clusterer_class(n_clusters=n_clusters, random_state=random_state)
+    baseline_rss = get_peak_rss()
+    start = perf_counter()
+    labels = clusterer.fit(X).labels_
+    duration = perf_counter() - start
+    peak_rss = get_peak_rss()
+    return {
+        'n_samples': len(X),
+        'n_features': X.shape[1],
+        'clusterer': clusterer_class.__name__,
+        'duration': duration,
+        'peak_rss_increment': peak_rss - baseline_rss,
+        'n_clusters': int(len(np.unique(labels))),
+        'inertia': calculate_inertia(X, labels),
+        'labels': labels,
+    }
+
+
+def run_experiment(experiment_name, dataset_name, clustering, n_runs, n_jobs):
+    """Run an experiment on a single dataset with the clusterers of a clustering mode."""
+    from ..cli import load_datasets, load_folds
+    from ..config import CONFIG
+    from ..experiment import generate_configuration
+    from ..runner import Experiment
+
+    configuration = generate_configuration(**{**CONFIG.experiments[experiment_name], 'clustering': clustering})
+    db_name = configuration.pop('db_name')
+    configuration.pop('datasets_names')
+    if n_runs is not None:
+        configuration['n_runs'] = n_runs
+    datasets = load_datasets(db_name, [dataset_name])
+    folds = load_folds(db_name, configuration['n_splits'], configuration['n_runs'], configuration['random_state'])
+    start = perf_counter()
+    experiment = Experiment(experiment_name, datasets, folds=folds, **configuration).run(n_jobs)
+    return {'duration': perf_counter() - start, 'scores': experiment.scores_.to_dict('list'), 'metrics': experiment.scoring_}
+
+
+def main():
+    parser = ArgumentParser(description='Benchmark the full-batch and online clusterers of the clustered oversamplers.')
+    parser.add_argument('--families', nargs='+', default=list(FAMILIES), choices=FAMILIES, help='Families of the clusterers.')
+    parser.add_argument('--n-clusters', type=int, default=20, help='Number of clusters.')
+    parser.add_argument('--databases', nargs='*', default=list(DATABASES), help='Names of the databases whose tables are included.')
+    parser.add_argument('--n-samples', nargs='*', type=int, default=list(N_SAMPLES), help='Number of samples of the synthetic datasets.')
+    parser.add_argument('--n-features', nargs='*', type=int, default=list(N_FEATURES), help='Number of features of the synthetic datasets.')
+    parser.add_argument('--max-cells', type=float, default=1e8, help='Maximum number of values of a synthetic dataset.')
+    parser.add_argument('--cases', nargs='*', default=list(CASES), help='Pairs of experiment and dataset names, separated by a colon, whose scores are compared.')
+    parser.add_argument('--n-runs', type=int, default=None, help='Number of runs of the cross validation. The default is the one of the experiment.')
+    parser.add_argument('--n-jobs', type=int, default=1, help='Number of jobs to run in parallel.')
+    parser.add_argument('--random-state', type=int, default=0, help='Seed of the synthetic datasets and clusterers.')
+    parser.add_argument('--output', default='clusterers.json', help='Path of the JSON file of the results.')
+    args = parser.parse_args()
+
+    # Compare the clusterings of the datasets
+    from sklearn.metrics import adjusted_rand_score
+    results = []
+    for dataset_name, spec in generate_datasets_specs(args.databases, args.n_samples, args.n_features, args.max_cells):
+        for family in args.families:
+            result = {'family': family, 'dataset': dataset_name}
+            try:
+                runs = {clustering: run_isolated(fit_clusterer, family, clustering, spec, args.n_clusters, args.random_state) for clustering in ('batch', 'online')}
+                batch, online = runs['batch'], runs['online']
+                result.update({
+                    **{clustering: {key: value for key, value in run.items() if key != 'labels'} for clustering, run in runs.items()},
+                    'speedup': batch['duration'] / online['duration'],
+                    'inertia_ratio': online['inertia'] / batch['inertia'] if batch['inertia'] else None,
+                    'adjusted_rand_score': float(adjusted_rand_score(batch['labels'], online['labels'])),
+                })
+                print(
+                    f'{family:<8} {dataset_name:<32} time {batch["duration"]:.2f}s -> {online["duration"]:.2f}s  '
+                    f'peak RSS increment {batch["peak_rss_increment"] / 2 ** 20:.0f}MB -> {online["peak_rss_increment"] / 2 ** 20:.0f}MB  '
+                    f'inertia ratio {result["inertia_ratio"]:.3f}  ARI {result["adjusted_rand_score"]:.3f}'
+                )
+            except Exception as exception:
+                result['error'] = repr(exception)
+                print(f'{family:<8} {dataset_name:<32} failed: {exception!r}')
+            results.append(result)
+
+    # Compare the scores of the experiments
+    for case in args.cases:
+        experiment_name, dataset_name = case.split(':')
+        result = {'experiment': experiment_name, 'dataset': dataset_name}
+        try:
+            runs = {clustering: run_isolated(run_experiment, experiment_name, dataset_name, clustering, args.n_runs, args.n_jobs) for clustering in ('batch', 'online')}
+            batch, online = runs['batch'], runs['online']
+            result.update({
+                **{f'{clustering}_duration': run['duration'] for clustering, run in runs.items()},
+                'drift': calculate_drift(online['scores'], batch['scores'], batch['metrics']),
+                'best_scores': {
+                    clustering: {metric: float(np.max(run['scores'][metric])) for metric in run['metrics']} for clustering, run in runs.items()
+                },
+            })
+            drift = ', '.join(f'{metric} {values["mean"]:.4f}/{values["max"]:.4f}' for metric, values in result['drift'].items())
+            print(f'{experiment_name:<28} {dataset_name:<16} time {batch["duration"]:.1f}s -> {online["duration"]:.1f}s  drift (mean/max) {drift}')
+        except Exception as exception:
+            result['error'] = repr(exception)
+            print(f'{experiment_name:<28} {dataset_name:<16} failed: {exception!r}')
+        results.append(result)
+    save_results(args.output, 'clusterers', results, vars(args))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""
+Benchmark the recall and speed of the nearest neighbors algorithms.
+"""
+
+# Author: Georgios Douzas <gdouzas@icloud.com>
+# License: MIT
+
+from argparse import ArgumentParser
+from time import perf_counter
+
+import numpy as np
+
+from .base import summarize_latencies, save_results
+from .oversamplers import DATABASES, generate_datasets_specs, load_dataset
+
+N_SAMPLES = (1000, 10000, 50000)
+N_FEATURES = (10, 100)
+ALGORITHMS = ('kd_tree', 'ball_tree', 'rp_forest')
+N_TREES = (10, 30, 50)
+
+
+def search_neighbors(X, n_neighbors, algorithm, n_trees, random_state):
+    """Build the index of the data and search the neighbors of every sample, as the oversamplers do.
+
+    The cache of the neighbors graphs is cleared, therefore the search is
+    always executed.
+    """
+    from ..cache import CachedNearestNeighbors, NEIGHBORS_CACHE
+    NEIGHBORS_CACHE.clear()
+    start = perf_counter()
+    distances, _ = CachedNearestNeighbors(n_neighbors=n_neighbors, algorithm=algorithm, n_trees=n_trees, random_state=random_state).fit(X).kneighbors()
+    return distances, perf_counter() - start
+
+
+def calculate_recall(distances, exact_distances):
+    """Calculate the fraction of the exact nearest neighbors that are found.
+
+    Neighbors are compared by their distances, therefore ties of the exact
+    neighbors are not counted as misses.
+    """
+    return float(np.mean(distances <= exact_distances[:, -1:] * (1 + 1e-9)))
+
+
+def main():
+    parser = ArgumentParser(description='Benchmark the recall and speed of the nearest neighbors algorithms against the exact search.')
+    parser.add_argument('--algorithms', nargs='+', default=list(ALGORITHMS), help='Names of the nearest neighbors algorithms.')
+    parser.add_argument('--n-trees', nargs='+', type=int, default=list(N_TREES), help='Number of trees of the random projection forests.')
+    parser.add_argument('--n-neighbors', type=int, default=6, help='Number of nearest neighbors.')
+    parser.add_argument('--databases', nargs='*', default=list(DATABASES), help='Names of the databases whose tables are included.')
+    parser.add_argument('--n-samples', nargs='*', type=int, default=list(N_SAMPLES), help='Number of samples of the synthetic datasets.')
+    parser.add_argument('--n-features', nargs='*', type=int, default=list(N_FEATURES), help='Number of features of the synthetic datasets.')
+    parser.add_argument('--max-cells', type=float, default=5e6, help='Maximum number of values of a synthetic dataset.')
+    parser.add_argument('--n-repeats', type=int, default=3, help='Number of repetitions of every search.')
+    parser.add_argument('--random-state', type=int, default=0, help='Seed of the synthetic datasets and forests.')
+    parser.add_argument('--output', default='neighbors.json', help='Path of the JSON file of the results.')
+    args = parser.parse_args()
+
+    configurations = [
+        (algorithm, n_trees) for algorithm in args.algorithms for n_trees in (args.n_trees if algorithm == 'rp_forest' else [None])
+    ]
+    results = []
+    for dataset_name, spec in generate_datasets_specs(args.databases, args.n_samples, args.n_features, args.max_cells):
+        try:
+            X, _ = load_dataset(spec, args.random_state)
+            X = np.asarray(X, dtype=float)
+            exact_latencies = []
+            for _ in range(args.n_repeats):
+                exact_distances, latency = search_neighbors(X, args.n_neighbors, 'brute', None, args.random_state)
+                exact_latencies.append(latency)
+        except Exception as exception:
+            results.append({'dataset': dataset_name, 'algorithm': 'brute', 'error': repr(exception)})
+            print(f'{dataset_name:<32} failed: {exception!r}')
+            continue
+        exact_latency = summarize_latencies(exact_latencies)
+        results.append({'dataset': dataset_name, 'algorithm': 'brute', 'n_trees': None, 'n_samples': len(X), 'n_features': X.shape[1],
+                        'latency': exact_latency, 'speedup': 1.0, 'recall': 1.0})
+        print(f'{dataset_name:<32} {"brute":<16} p50 {exact_latency["p50"]:.4f}s')
+        for algorithm, n_trees in configurations:
+            name = f'{algorithm}-{n_trees}' if n_trees is not None else algorithm
+            result = {'dataset': dataset_name, 'algorithm': algorithm, 'n_trees': n_trees, 'n_samples': len(X), 'n_features': X.shape[1]}
+            try:
+                latencies = []
+                for _ in range(args.n_repeats):
+                    distances, latency = search_neighbors(X, args.n_neighbors, algorithm, n_trees or 30, args.random_state)
+                    latencies.append(latency)
+                latency = summarize_latencies(latencies)
+                result.update({'latency': latency, 'speedup': exact_latency['p50'] / latency['p50'], 'recall': calculate_recall(distances, exact_distances)})
+                print(f'{dataset_name:<32} {name:<16} p50 {latency["p50"]:.4f}s  speedup {result["speedup"]:.2f}x  recall {result["recall"]:.4f}')
+            except Exception as exception:
+                result['error'] = repr(exception)
+                print(f'{dataset_name:<32} {name:<16} failed: {exception!r}')
+            results.append(result)
+    save_results(args.output, 'neighbors', results, vars(args))
+
+
+if __name__ == '__main__':
+    main()
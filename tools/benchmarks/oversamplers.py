@@ -0,0 +1,136 @@
+"""
+Benchmark the throughput, latency and memory of the oversamplers.
+"""
+
+# Author: Georgios Douzas <gdouzas@icloud.com>
+# License: MIT
+
+from argparse import ArgumentParser
+from os.path import dirname, join, exists
+from sqlite3 import connect
+from time import perf_counter
+
+from .base import run_isolated, get_peak_rss, summarize_latencies, save_results, compare_results
+from .. import DATA_PATH
+
+DATABASES = ('binary_class', 'remote_sensing')
+N_SAMPLES = (1000, 10000, 100000, 1000000)
+N_FEATURES = (10, 100, 2000)
+
+
+def generate_datasets_specs(databases, n_samples, n_features, max_cells):
+    """Generate the specifications of the databases' tables and synthetic datasets.
+
+    Synthetic datasets with more than ``max_cells`` values are excluded.
+    """
+    from ..data import read_tables_names
+    specs = []
+    for db_name in databases:
+        path = join(dirname(dirname(__file__)), DATA_PATH, f'{db_name}.db')
+        if exists(path):
+            with connect(path) as connection:
+                specs += [(name, ('database', db_name, name)) for name in read_tables_names(connection)]
+    specs += [
+        (f'SYNTHETIC {samples}x{features}', ('synthetic', samples, features))
+        for samples in n_samples for features in n_features if samples * features <= max_cells
+    ]
+    return specs
+
+
+def load_dataset(spec, random_state):
+    """Load a dataset from its specification."""
+    if spec[0] == 'synthetic':
+        from sklearn.datasets import make_classification
+        _, n_samples, n_features = spec
+        return make_classification(
+            n_samples, n_features, n_informative=max(1, min(n_features // 2, 10)), n_redundant=0, weights=[0.9], random_state=random_state
+        )
+    from ..cli import load_datasets
+    _, db_name, name = spec
+    [(_, (X, y))] = load_datasets(db_name, [name])
+    return X, y
+
+
+def benchmark_oversampler(oversampler_name, spec, n_repeats, random_state):
+    """Measure the latency and peak memory of an oversampler's resampling.
+
+    The oversampler is initialized with the first configuration of its
+    parameter grid and the caches of the clusterers and neighbors are cleared
+    before every repetition.
+    """
+    from sklearn.model_selection import ParameterGrid
+    from ..cache import CLUSTERERS_CACHE, NEIGHBORS_CACHE
+    from ..experiment import generate_oversamplers
+    from ..runner import build_estimator, set_random_state
+
+    oversamplers = {name: (ov, param_grid) for name, ov, param_grid in generate_oversamplers('all')}
+    oversampler, param_grid = oversamplers[oversampler_name]
+    params = ParameterGrid(param_grid)[0]
+    X, y = load_dataset(spec, random_state)
+    baseline_rss = get_peak_rss()
+    latencies = []
+    for _ in range(n_repeats):
+        CLUSTERERS_CACHE.clear()
+        NEIGHBORS_CACHE.clear()
+        estimator = set_random_state(build_estimator(oversampler, params), random_state)
+        start = perf_counter()
+        X_resampled, _ = estimator.fit_resample(X, y)
+        latencies.append(perf_counter() - start)
+    peak_rss = get_peak_rss()
+    latency = summarize_latencies(latencies)
+    return {
+        'n_samples': len(X),
+        'n_features': X.shape[1],
+        'n_resampled_samples': len(X_resampled),
+        'samples_per_second': len(X) / latency['p50'],
+        'latency': latency,
+        'peak_rss': peak_rss,
+        'peak_rss_increment': peak_rss - baseline_rss,
+    }
+
+
+def main():
+    parser = ArgumentParser(description='Benchmark the resampling of the oversamplers.')
+    parser.add_argument('--oversamplers', nargs='+', default=None, help='Names of the oversamplers. The default is all oversamplers.')
+    parser.add_argument('--databases', nargs='*', default=list(DATABASES), help='Names of the databases whose tables are included.')
+    parser.add_argument('--n-samples', nargs='*', type=int, default=list(N_SAMPLES), help='Number of samples of the synthetic datasets.')
+    parser.add_argument('--n-features', nargs='*', type=int, default=list(N_FEATURES), help='Number of features of the synthetic datasets.')
+    parser.add_argument('--max-cells', type=float, default=2e8, help='Maximum number of values of a synthetic dataset.')
+    parser.add_argument('--n-repeats', type=int, default=3, help='Number of repetitions of every resampling.')
+    parser.add_argument('--random-state', type=int, default=0, help='Seed of the synthetic datasets and oversamplers.')
+    parser.add_argument('--output', default='oversamplers.json', help='Path of the JSON file of the results.')
+    parser.add_argument('--baseline', default=None, help='Path of a JSON file of previous results to compare with.')
+    args = parser.parse_args()
+
+    oversamplers_names = args.oversamplers
+    if oversamplers_names is None:
+        from ..experiment import generate_oversamplers
+        oversamplers_names = [name for name, ov, _ in generate_oversamplers('all') if ov is not None]
+    specs = generate_datasets_specs(args.databases, args.n_samples, args.n_features, args.max_cells)
+
+    results = []
+    for dataset_name, spec in specs:
+        for oversampler_name in oversamplers_names:
+            result = {'oversampler': oversampler_name, 'dataset': dataset_name}
+            try:
+                result.update(run_isolated(benchmark_oversampler, oversampler_name, spec, args.n_repeats, args.random_state))
+                print(
+                    f'{oversampler_name:<28} {dataset_name:<32} {result["samples_per_second"]:>12.0f} samples/s '
+                    f'p50 {result["latency"]["p50"]:.4f}s  peak RSS {result["peak_rss"] / 2 ** 20:.0f}MB'
+                )
+            except Exception as exception:
+                result['error'] = repr(exception)
+                print(f'{oversampler_name:<28} {dataset_name:<32} failed: {exception!r}')
+            results.append(result)
+    save_results(args.output, 'oversamplers', results, vars(args))
+
+    if args.baseline is not None:
+        comparison = compare_results(
+            [result for result in results if 'error' not in result], args.baseline, ['oversampler', 'dataset'], lambda result: result['latency']['p50']
+        )
+        for oversampler_name, dataset_name, baseline_latency, latency, ratio in comparison:
+            print(f'{oversampler_name:<28} {dataset_name:<32} p50 {baseline_latency:.4f}s -> {latency:.4f}s ({ratio:.2f}x)')
+
+
+if __name__ == '__main__':
+    main()
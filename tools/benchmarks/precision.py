@@ -0,0 +1,102 @@
+"""
+Benchmark the score drift and memory savings of single-precision input data.
+"""
+
+# Author: Georgios Douzas <gdouzas@icloud.com>
+# License: MIT
+
+from argparse import ArgumentParser
+from time import perf_counter
+
+import numpy as np
+import pandas as pd
+
+from .base import run_isolated, get_peak_rss, save_results
+
+CASES = ('small_data_oversampling:ARCENE', 'lucas:lucas')
+DTYPES = ('float64', 'float32')
+
+
+def run_experiment(experiment_name, dataset_name, dtype, n_runs, n_jobs):
+    """Run an experiment on a single dataset with input data of a data type.
+
+    The duration, the peak memory and the scores of the experiment are
+    returned.
+    """
+    from ..cli import load_datasets, load_folds
+    from ..config import CONFIG
+    from ..runner import Experiment
+
+    configuration = CONFIG[experiment_name]
+    db_name = configuration.pop('db_name')
+    configuration.pop('datasets_names')
+    if n_runs is not None:
+        configuration['n_runs'] = n_runs
+    datasets = load_datasets(db_name, [dataset_name], dtype)
+    folds = load_folds(db_name, configuration['n_splits'], configuration['n_runs'], configuration['random_state'])
+    baseline_rss = get_peak_rss()
+    start = perf_counter()
+    experiment = Experiment(experiment_name, datasets, folds=folds, dtype=dtype, **configuration).run(n_jobs)
+    duration = perf_counter() - start
+    peak_rss = get_peak_rss()
+    [(_, (X, _))] = experiment.datasets_
+    return {
+        'duration': duration,
+        'data_nbytes': int(np.asarray(X, dtype=dtype).nbytes),
+        'peak_rss': peak_rss,
+        'peak_rss_increment': peak_rss - baseline_rss,
+        'scores': experiment.scores_.to_dict('list'),
+        'metrics': experiment.scoring_,
+    }
+
+
+def calculate_drift(scores, baseline_scores, metrics):
+    """Calculate the mean and maximum absolute difference of the scores of each metric.
+
+    Only the candidates that are evaluated with both data types are compared.
+    """
+    scores, baseline_scores = pd.DataFrame(scores), pd.DataFrame(baseline_scores)
+    keys = [column for column in scores.columns if column not in metrics]
+    scores = baseline_scores.merge(scores, on=keys, suffixes=('_baseline', ''))
+    drift = {}
+    for metric in metrics:
+        differences = (scores[metric] - scores[f'{metric}_baseline']).abs()
+        drift[metric] = {'mean': float(differences.mean()), 'max': float(differences.max())}
+    return drift
+
+
+def main():
+    parser = ArgumentParser(description='Benchmark the score drift and memory savings of single-precision input data.')
+    parser.add_argument('--cases', nargs='+', default=list(CASES), help='Pairs of experiment and dataset names, separated by a colon.')
+    parser.add_argument('--n-runs', type=int, default=None, help='Number of runs of the cross validation. The default is the one of the experiment.')
+    parser.add_argument('--n-jobs', type=int, default=1, help='Number of jobs to run in parallel.')
+    parser.add_argument('--output', default='precision.json', help='Path of the JSON file of the results.')
+    args = parser.parse_args()
+
+    results = []
+    for case in args.cases:
+        experiment_name, dataset_name = case.split(':')
+        result = {'experiment': experiment_name, 'dataset': dataset_name}
+        try:
+            runs = {dtype: run_isolated(run_experiment, experiment_name, dataset_name, dtype, args.n_runs, args.n_jobs) for dtype in DTYPES}
+            baseline, single = runs['float64'], runs['float32']
+            result.update({
+                **{dtype: {key: value for key, value in run.items() if key not in ('scores', 'metrics')} for dtype, run in runs.items()},
+                'drift': calculate_drift(single['scores'], baseline['scores'], baseline['metrics']),
+                'memory_savings': 1 - single['peak_rss_increment'] / baseline['peak_rss_increment'] if baseline['peak_rss_increment'] else None,
+            })
+            drift = ', '.join(f'{metric} {values["mean"]:.4f}/{values["max"]:.4f}' for metric, values in result['drift'].items())
+            print(
+                f'{experiment_name:<28} {dataset_name:<16} data {baseline["data_nbytes"] / 2 ** 20:.1f}MB -> {single["data_nbytes"] / 2 ** 20:.1f}MB  '
+                f'peak RSS increment {baseline["peak_rss_increment"] / 2 ** 20:.0f}MB -> {single["peak_rss_increment"] / 2 ** 20:.0f}MB  '
+                f'time {baseline["duration"]:.1f}s -> {single["duration"]:.1f}s  drift (mean/max) {drift}'
+            )
+        except Exception as exception:
+            result['error'] = repr(exception)
+            print(f'{experiment_name:<28} {dataset_name:<16} failed: {exception!r}')
+        results.append(result)
+    save_results(args.output, 'precision', results, vars(args))
+
+
+if __name__ == '__main__':
+    main()
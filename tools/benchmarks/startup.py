@@ -0,0 +1,59 @@
+"""
+Benchmark the startup time of the command-line interface.
+"""
+
+# Author: Georgios Douzas <gdouzas@icloud.com>
+# License: MIT
+
+import sys
+from argparse import ArgumentParser
+from os.path import dirname, abspath
+from statistics import median
+from subprocess import run
+from time import perf_counter
+
+ROOT_PATH = dirname(dirname(dirname(abspath(__file__))))
+COMMANDS = {
+    'help': ['--help'],
+    'downloading help': ['downloading', '--help'],
+    'experiment help': ['experiment', '--help'],
+}
+SCRIPT = 'import sys; sys.argv = ["run", *sys.argv[1:]]; from tools.cli import run; run()'
+
+
+def time_command(args, n_repeats):
+    """Time the execution of a command in new interpreters."""
+    timings = []
+    for _ in range(n_repeats):
+        start = perf_counter()
+        run([sys.executable, '-c', SCRIPT, *args], cwd=ROOT_PATH, check=True, capture_output=True)
+        timings.append(perf_counter() - start)
+    return timings
+
+
+def profile_imports(args, n_modules):
+    """Find the modules with the highest cumulative import time of a command."""
+    process = run([sys.executable, '-X', 'importtime', '-c', SCRIPT, *args], cwd=ROOT_PATH, capture_output=True, text=True)
+    imports = []
+    for line in process.stderr.splitlines():
+        if line.startswith('import time:') and '|' in line:
+            _, cumulative, module = line[len('import time:'):].split('|')
+            if cumulative.strip().isdigit():
+                imports.append((int(cumulative) / 1e6, module.strip()))
+    return sorted(imports, reverse=True)[:n_modules]
+
+
+def main():
+    parser = ArgumentParser(description='Benchmark the startup time of the run command.')
+    parser.add_argument('--n-repeats', type=int, default=5, help='Number of times each command is executed.')
+    parser.add_argument('--n-modules', type=int, default=0, help='Number of slowest imported modules to report per command.')
+    args = parser.parse_args()
+    for name, command in COMMANDS.items():
+        timings = time_command(command, args.n_repeats)
+        print(f'{name:<20} median {median(timings):.3f}s  min {min(timings):.3f}s')
+        for duration, module in profile_imports(command, args.n_modules) if args.n_modules else []:
+            print(f'    {duration:.3f}s  {module}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,177 @@
+"""
+Cache intermediate results that are shared across parameter combinations.
+"""
+
+# Author: Georgios Douzas <gdouzas@icloud.com>
+# License: MIT
+
+from collections import OrderedDict
+from hashlib import blake2b
+
+import numpy as np
+from sklearn.neighbors import NearestNeighbors
+
+from .neighbors import fit_forest
+from .profiling import get_profiler
+
+
+def fingerprint(array):
+    """Calculate a fingerprint of an array's content, shape and data type."""
+    if array is None:
+        return None
+    array = np.ascontiguousarray(array)
+    if array.dtype == object:
+        array = array.astype(str)
+    digest = blake2b(array.view(np.uint8).ravel() if array.size else b'', digest_size=16)
+    digest.update(f'{array.shape}{array.dtype}'.encode())
+    return digest.hexdigest()
+
+
+def calculate_nbytes(value):
+    """Calculate the size in bytes of the arrays contained in a value."""
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, dict):
+        return sum(calculate_nbytes(val) for val in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(calculate_nbytes(val) for val in value)
+    return 0
+
+
+class LRUCache:
+    """A least recently used cache bounded by number of entries and size in bytes."""
+
+    def __init__(self, maxsize=128, max_nbytes=None):
+        self.maxsize = maxsize
+        self.max_nbytes = max_nbytes
+        self.clear()
+
+    def __len__(self):
+        return len(self.entries_)
+
+    def __contains__(self, key):
+        return key in self.entries_
+
+    def clear(self):
+        """Remove all entries."""
+        self.entries_ = OrderedDict()
+        self.nbytes_ = 0
+        self.hits_ = 0
+        self.misses_ = 0
+
+    def get(self, key, default=None):
+        """Get the value of a key and mark it as the most recently used."""
+        if key not in self.entries_:
+            self.misses_ += 1
+            return default
+        self.hits_ += 1
+        self.entries_.move_to_end(key)
+        return self.entries_[key][0]
+
+    def put(self, key, value):
+        """Insert a value and evict the least recently used entries."""
+        if key in self.entries_:
+            self.nbytes_ -= self.entries_.pop(key)[1]
+        nbytes = calculate_nbytes(value)
+        if self.max_nbytes is not None and nbytes > self.max_nbytes:
+            return
+        self.entries_[key] = (value, nbytes)
+        self.nbytes_ += nbytes
+        while len(self.entries_) > self.maxsize or (self.max_nbytes is not None and self.nbytes_ > self.max_nbytes):
+            self.nbytes_ -= self.entries_.popitem(last=False)[1][1]
+
+
+CLUSTERERS_CACHE = LRUCache(maxsize=32, max_nbytes=2 ** 30)
+NEIGHBORS_CACHE = LRUCache(maxsize=64, max_nbytes=2 ** 30)
+
+
+def clear_caches():
+    """Remove the entries of the clusterers and neighbors caches."""
+    CLUSTERERS_CACHE.clear()
+    NEIGHBORS_CACHE.clear()
+
+
+class CachedClustererMixin:
+    """Mixin class that memoizes the fit of a clusterer.
+
+    The fitted attributes are stored in a cache shared by all the instances
+    and they are keyed on the fingerprint of the input data and the clusterer's
+    parameters. Therefore clones of the same clusterer that are fitted on the same
+    data, e.g. a training fold resampled by different oversampler configurations,
+    run the clustering algorithm only once.
+    """
+
+    cache = CLUSTERERS_CACHE
+
+    def fit(self, X, y=None, **fit_params):
+        with get_profiler().stage(self.__class__.__name__, 'cluster'):
+            params = self.get_params()
+            key = (self.__class__.__name__, fingerprint(X), fingerprint(y), repr(sorted(params.items())))
+            fitted_attributes = self.cache.get(key)
+            if fitted_attributes is None:
+                super(CachedClustererMixin, self).fit(X, y, **fit_params)
+                fitted_attributes = {name: value for name, value in vars(self).items() if name not in params}
+                self.cache.put(key, fitted_attributes)
+            else:
+                vars(self).update(fitted_attributes)
+        return self
+
+
+class CachedNearestNeighbors(NearestNeighbors):
+    """Nearest neighbors estimator that shares its neighbors graph.
+
+    The neighbors graph of the query data is calculated for ``max_n_neighbors``
+    neighbors and it is stored in a cache shared by all the instances, keyed
+    on the fingerprints of the fitted and query data. Any smaller number of
+    neighbors is answered by slicing the cached graph. Therefore oversampler
+    configurations that differ only in the number of neighbors search the
+    neighbors of a training fold only once. The algorithm ``'rp_forest'``
+    searches the neighbors approximately with a random projection forest.
+    """
+
+    cache = NEIGHBORS_CACHE
+
+    def __init__(self, n_neighbors=5, max_n_neighbors=None, radius=1.0, algorithm='auto',
+                 leaf_size=30, metric='minkowski', p=2, metric_params=None, n_jobs=None, n_trees=30, random_state=None):
+        super(CachedNearestNeighbors, self).__init__(n_neighbors=n_neighbors, radius=radius, algorithm=algorithm,
+                                                     leaf_size=leaf_size, metric=metric, p=p, metric_params=metric_params, n_jobs=n_jobs)
+        self.max_n_neighbors = max_n_neighbors
+        self.n_trees = n_trees
+        self.random_state = random_state
+
+    def fit(self, X, y=None):
+        """Store the fitted data, the search index is built only when the graph is not cached."""
+        self.X_fit_ = X
+        self.n_samples_fit_ = len(X)
+        self.fit_fingerprint_ = fingerprint(X)
+        return self
+
+    def kneighbors(self, X=None, n_neighbors=None, return_distance=True):
+        """Find the nearest neighbors of the query data."""
+        with get_profiler().stage('kneighbors', 'neighbors'):
+            return self._kneighbors(X, n_neighbors, return_distance)
+
+    def _search(self, X, n_neighbors, return_distance):
+        """Build the search index of the fitted data and find the nearest neighbors of the query data."""
+        if self.algorithm == 'rp_forest':
+            return fit_forest(self, self.X_fit_).kneighbors(X, n_neighbors, return_distance)
+        super(CachedNearestNeighbors, self).fit(self.X_fit_)
+        return super(CachedNearestNeighbors, self).kneighbors(X, n_neighbors, return_distance)
+
+    def _kneighbors(self, X, n_neighbors, return_distance):
+        """Find the nearest neighbors of the query data through the cached graph."""
+        if n_neighbors is None:
+            n_neighbors = self.n_neighbors
+        n_max_neighbors = self.n_samples_fit_ - (X is None)
+        if n_neighbors > n_max_neighbors:
+            return self._search(X, n_neighbors, return_distance)
+        excluded_params = ('n_neighbors', 'max_n_neighbors', 'n_jobs') + (('n_trees', 'random_state') if self.algorithm != 'rp_forest' else ())
+        params = {param: value for param, value in self.get_params().items() if param not in excluded_params}
+        key = (self.fit_fingerprint_, fingerprint(X), repr(sorted(params.items())))
+        graph = self.cache.get(key)
+        if graph is None or graph[1].shape[1] < n_neighbors:
+            n_graph_neighbors = min(max(n_neighbors, self.max_n_neighbors or 0), n_max_neighbors)
+            graph = self._search(X, n_graph_neighbors, True)
+            self.cache.put(key, graph)
+        distances, indices = graph[0][:, :n_neighbors], graph[1][:, :n_neighbors]
+        return (distances, indices) if return_distance else indices
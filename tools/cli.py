@@ -5,43 +5,108 @@ Implement the command-line interface.
 # Author: Georgios Douzas <gdouzas@icloud.com>
 # License: MIT
 
-from argparse import ArgumentParser, RawTextHelpFormatter
+from argparse import ArgumentParser, ArgumentTypeError, RawTextHelpFormatter
+from glob import glob, escape as glob_escape
+from os import makedirs
 from os.path import dirname, join, exists
-from pickle import load
 from sqlite3 import connect
-
-import pandas as pd
-from sklearnext.tools import BinaryExperiment
+from warnings import warn
 
 from . import DATA_PATH, EXPERIMENTS_PATH
-from .data import ImbalancedBinaryClassDatasets, BinaryClassDatasets
-from .experiment import CONFIG
+from .config import CONFIG, SEARCH_STRATEGIES
+
+DTYPES = ('float64', 'float32')
+DATABASES_MAPPING = {'imbalanced_binary_class': 'ImbalancedBinaryClassDatasets', 'binary_class': 'BinaryClassDatasets'}
+
 
-DATABASES_MAPPING = {'imbalanced_binary_class': ImbalancedBinaryClassDatasets, 'binary_class': BinaryClassDatasets}
+def get_db_path(db_name):
+    """Get the path of a sqlite database."""
+    return join(dirname(__file__), DATA_PATH, f'{db_name}.db')
 
 
-def load_datasets(db_name, datasets_names):
-    """Load datasets from sqlite database."""
+def load_datasets(db_name, datasets_names, dtype=None):
+    """Load datasets from sqlite database.
 
-    path = join(dirname(__file__), DATA_PATH, f'{db_name}.db')
+    The datasets are read as memory-mapped arrays when they are available,
+    otherwise they are read from the database. The arrays are written when
+    the database is downloaded or with the arrays subcommand. The input data
+    of the arrays are optionally converted to a data type.
+    """
+    import pandas as pd
+    from .data import read_arrays, read_tables_names
+
+    path = get_db_path(db_name)
     if not exists(path):
         raise FileNotFoundError(f'Database {db_name} was not found.')
+    arrays = read_arrays(join(dirname(__file__), DATA_PATH, db_name), dtype)
 
     with connect(path) as connection:
 
         if datasets_names == 'all':
-            datasets_names = [name[0] for name in connection.execute("SELECT name FROM sqlite_master WHERE type='table';")]
+            datasets_names = read_tables_names(connection)
 
         datasets = []
 
         for dataset_name in datasets_names:
-            ds = pd.read_sql(f'select * from "{dataset_name}"', connection)
-            X, y = ds.iloc[:, :-1], ds.iloc[:, -1]
+            if dataset_name in arrays:
+                X, y = arrays[dataset_name]
+            else:
+                ds = pd.read_sql(f'select * from "{dataset_name}"', connection)
+                X, y = ds.iloc[:, :-1], ds.iloc[:, -1]
             datasets.append((dataset_name, (X, y)))
     
     return datasets
 
 
+def load_folds(db_name, n_splits, n_runs, random_state):
+    """Load the fold plans of datasets that are stored as memory-mapped arrays.
+
+    The fold plans are written along with the arrays, while the missing ones
+    are generated in memory by the experiment.
+    """
+    from .data import read_folds
+
+    arrays_path = join(dirname(__file__), DATA_PATH, db_name)
+    if random_state is None or not exists(arrays_path):
+        return {}
+    return read_folds(arrays_path, n_splits, n_runs, random_state)
+
+
+def export_folds(db_name):
+    """Write the fold plans of the experiments of a database for its memory-mapped arrays."""
+    from .data import read_arrays, write_folds
+    from .runner import generate_random_states, generate_folds
+
+    arrays_path = join(dirname(__file__), DATA_PATH, db_name)
+    arrays = read_arrays(arrays_path)
+    plans = {
+        (configuration['n_splits'], configuration['n_runs'], configuration['random_state'])
+        for configuration in (CONFIG[name] for name, params in CONFIG.experiments.items() if params['db_name'] == db_name)
+    }
+    for n_splits, n_runs, random_state in plans:
+        if random_state is not None:
+            random_states = generate_random_states(random_state, n_runs)
+            folds = {name: generate_folds(y, n_splits, random_states) for name, (_, y) in arrays.items()}
+            write_folds(arrays_path, folds, n_splits, n_runs, random_state)
+
+
+def parse_shard(shard):
+    """Parse a shard of the form i/N to a pair of zero-based index and number of shards."""
+    try:
+        index, n_shards = map(int, shard.split('/'))
+    except ValueError:
+        raise ArgumentTypeError(f'Shard should be of the form i/N. Got {shard} instead.')
+    if not 1 <= index <= n_shards:
+        raise ArgumentTypeError(f'Shard index should be between 1 and the number of shards. Got {shard} instead.')
+    return index - 1, n_shards
+
+
+def get_shard_path(experiments_path, name, shard):
+    """Get the path of a shard's checkpoint."""
+    index, n_shards = shard
+    return join(experiments_path, f'{name}.shard-{index + 1}-of-{n_shards}.db')
+
+
 def create_parser():
     """Parse command-line arguments."""
 
@@ -58,15 +123,61 @@ def create_parser():
     # Downloading subparser
     downloading_parser = subparsers.add_parser('downloading', help='Download data as sqlite database.', formatter_class=RawTextHelpFormatter)
     downloading_parser.add_argument('name', help=f'The name of the database. It should be one of the following:\n{databases_names}', choices=DATABASES_MAPPING.keys())
+    downloading_parser.add_argument('--max-connections', type=int, default=8, help='Maximum number of concurrent HTTP connections.')
+    downloading_parser.add_argument('--offline', action='store_true', help='Use only the cached raw data, without network access.')
+    downloading_parser.add_argument('--incremental', action='store_true', help='Rebuild only the tables that are missing or whose fetching code changed.')
+    downloading_parser.add_argument('--refresh', action='store_true', help='Download again the raw data of the tables and rebuild the ones that changed. It implies --incremental.')
+
+    # Arrays subparser
+    arrays_parser = subparsers.add_parser('arrays', help='Write the datasets of a saved database as memory-mappable arrays.', formatter_class=RawTextHelpFormatter)
+    arrays_parser.add_argument('name', help='The name of the database.')
 
     # Add arguments
     experiment_parser = subparsers.add_parser('experiment', help='Run experiment from available experimental configurations.', formatter_class=RawTextHelpFormatter)
-    experiment_parser.add_argument('name', help=f'The name of the experiment. It should be one of the following:\n{experiments_names}', choices=CONFIG.keys())
+    experiment_parser.add_argument('names', nargs='*', help=f'The names of the experiments. Compatible experiments are combined and run as a single experiment. They should be any of the following:\n{experiments_names}')
+    experiment_parser.add_argument('--all', action='store_true', help='Run all experiments.')
     experiment_parser.add_argument('--n-jobs', type=int, default=-1, help='Number of jobs to run in parallel. -1 means using all processors.')
     experiment_parser.add_argument('--verbose', type=int, default=0, help='Controls the verbosity: the higher, the more messages.')
     experiment_parser.add_argument('--compared-oversamplers', nargs=2, default=None, help='Pair of oversamplers to compare when percentage difference of performance is calculated.')
     experiment_parser.add_argument('--alpha', type=float, default=0.05, help='Significance level of the Friedman test.')
     experiment_parser.add_argument('--control-oversampler', default=None, help='Control oversampler of the Holms method.')
+    experiment_parser.add_argument('--search', default=None, choices=SEARCH_STRATEGIES, help='Search strategy of the parameter grids. It overrides the one of the experimental configuration.')
+    experiment_parser.add_argument('--min-resource', type=int, default=None, help='Number of folds that every candidate is evaluated on when the search strategy is halving.')
+    experiment_parser.add_argument('--reduction-factor', type=int, default=None, help='Inverse of the proportion of candidates selected at each iteration of the halving search.')
+    experiment_parser.add_argument('--resume', action='store_true', help='Resume the experiment from its checkpoint, skipping the completed tasks.')
+    experiment_parser.add_argument('--profile', action='store_true', help='Record the wall time and memory of every stage of the tasks and export them as a CSV file and a Chrome trace.')
+    experiment_parser.add_argument('--plan', action='store_true', help='Report the number of fits, estimated running time and peak memory of the experiment without running it.')
+    experiment_parser.add_argument('--n-probes', type=int, default=1, help='Number of timed configurations per oversampler and dataset shape when the experiment is planned.')
+    experiment_parser.add_argument('--distributed', action='store_true', help='Queue the tasks in the experiment database, so that they are shared with workers on other nodes.')
+    experiment_parser.add_argument('--lease-duration', type=float, default=600, help='Seconds after which a task of a distributed experiment is claimed again, unless its worker renews the lease.')
+    experiment_parser.add_argument('--poll-interval', type=float, default=5, help='Seconds between checks of the queue of a distributed experiment.')
+
+    experiment_parser.add_argument('--dtype', default=None, choices=DTYPES, help='Data type of the input data. The default is the data type of the datasets, i.e. float64.')
+    experiment_parser.add_argument('--shard', type=parse_shard, default=None, help='Evaluate only the i-th of N shards of the tasks, e.g. 2/4. The shards are combined with the merge subcommand.')
+
+    # Worker subparser
+    worker_parser = subparsers.add_parser('worker', help='Execute tasks of a distributed experiment.', formatter_class=RawTextHelpFormatter)
+    worker_parser.add_argument('names', nargs='*', help='The names of the experiments. They should be the same as the ones of the distributed experiment.')
+    worker_parser.add_argument('--all', action='store_true', help='Execute tasks of all experiments.')
+    worker_parser.add_argument('--n-jobs', type=int, default=-1, help='Number of jobs to run in parallel. -1 means using all processors.')
+    worker_parser.add_argument('--verbose', type=int, default=0, help='Controls the verbosity: the higher, the more messages.')
+    worker_parser.add_argument('--search', default=None, choices=SEARCH_STRATEGIES, help='Search strategy of the parameter grids. It should be the same as the one of the distributed experiment.')
+    worker_parser.add_argument('--min-resource', type=int, default=None, help='Number of folds that every candidate is evaluated on when the search strategy is halving.')
+    worker_parser.add_argument('--reduction-factor', type=int, default=None, help='Inverse of the proportion of candidates selected at each iteration of the halving search.')
+    worker_parser.add_argument('--dtype', default=None, choices=DTYPES, help='Data type of the input data. It should be the same as the one of the distributed experiment.')
+    worker_parser.add_argument('--lease-duration', type=float, default=600, help='Seconds after which a claimed task is claimed again, unless its lease is renewed.')
+    worker_parser.add_argument('--poll-interval', type=float, default=5, help='Seconds between checks of the queue.')
+
+    # Merge subparser
+    merge_parser = subparsers.add_parser('merge', help='Merge the shards of an experiment.', formatter_class=RawTextHelpFormatter)
+    merge_parser.add_argument('names', nargs='*', help='The names of the experiments. They should be the same as the ones of the shards.')
+    merge_parser.add_argument('--all', action='store_true', help='Merge the shards of all experiments.')
+    merge_parser.add_argument('--compared-oversamplers', nargs=2, default=None, help='Pair of oversamplers to compare when percentage difference of performance is calculated.')
+    merge_parser.add_argument('--alpha', type=float, default=0.05, help='Significance level of the Friedman test.')
+    merge_parser.add_argument('--control-oversampler', default=None, help='Control oversampler of the Holms method.')
+    merge_parser.add_argument('--search', default=None, choices=SEARCH_STRATEGIES, help='Search strategy of the parameter grids. It should be the same as the one of the shards.')
+    merge_parser.add_argument('--min-resource', type=int, default=None, help='Number of folds that every candidate is evaluated on when the search strategy is halving.')
+    merge_parser.add_argument('--reduction-factor', type=int, default=None, help='Inverse of the proportion of candidates selected at each iteration of the halving search.')
 
     return parser
 
@@ -80,22 +191,109 @@ def run():
     if args.subcommand == 'downloading':
 
         # Select database
-        datasets = DATABASES_MAPPING[args.name]()
+        from . import data
+        datasets = getattr(data, DATABASES_MAPPING[args.name])(args.max_connections, offline=args.offline)
 
         # Download and save database
-        datasets.download().save(join(dirname(__file__), DATA_PATH), args.name)
-    
-    elif args.subcommand == 'experiment':
-        
-        # Get configuration
-        configuration = CONFIG[args.name]
-
-        # Load datasets from database
-        db_name, datasets_names = configuration.pop('db_name'), configuration.pop('datasets_names')
-        datasets = load_datasets(db_name, datasets_names)
+        data_path = join(dirname(__file__), DATA_PATH)
+        if args.incremental or args.refresh:
+            datasets.update(data_path, args.name, args.refresh)
+        else:
+            datasets.download().save(data_path, args.name)
+        export_folds(args.name)
+
+    elif args.subcommand == 'arrays':
+
+        # Write arrays of saved database
+        from .data import export_arrays
+        if not exists(get_db_path(args.name)):
+            parser.error(f'Database {args.name} was not found.')
+        export_arrays(join(dirname(__file__), DATA_PATH), args.name)
+        export_folds(args.name)
     
-        # Run and save experiment
-        experiment = BinaryExperiment(args.name, datasets, **configuration)
-        experiment.run(args.n_jobs, args.verbose)
-        experiment.calculate_results(args.compared_oversamplers, args.alpha, args.control_oversampler)
-        experiment.dump(join(dirname(__file__), EXPERIMENTS_PATH))
+    else:
+
+        from .runner import Experiment
+
+        # Select experiments
+        names = list(CONFIG) if args.all else args.names
+        if not names:
+            parser.error('At least one experiment name or --all is required.')
+        invalid_names = [name for name in names if name not in CONFIG]
+        if invalid_names:
+            parser.error(f'Invalid experiment names {invalid_names}. They should be any of the following: {", ".join(CONFIG)}.')
+        if getattr(args, 'profile', False) and getattr(args, 'distributed', False):
+            parser.error('Option --profile is not supported with --distributed.')
+
+        # Check the databases of the experiments before running any of them
+        missing_names = [name for name in names if not exists(get_db_path(CONFIG.experiments[name]['db_name']))]
+        if missing_names and not args.all:
+            parser.error(f'The databases of experiments {missing_names} were not found.')
+        if missing_names:
+            warn(f'Experiments {missing_names} are skipped, since their databases were not found.')
+            names = [name for name in names if name not in missing_names]
+
+        # Combine compatible experiments, loading each database once
+        loaded_datasets = {}
+        for names in CONFIG.group(dict.fromkeys(names)):
+            configuration = CONFIG.combine(names)
+            db_name, datasets_names = configuration.pop('db_name'), configuration.pop('datasets_names')
+            dtype = getattr(args, 'dtype', None)
+            key = (db_name, str(datasets_names))
+            if key not in loaded_datasets:
+                loaded_datasets[key] = load_datasets(db_name, datasets_names, dtype)
+
+            # Override search strategy
+            search_params = {'search': args.search, 'min_resource': args.min_resource, 'reduction_factor': args.reduction_factor}
+            configuration.update({param: value for param, value in search_params.items() if value is not None})
+
+            # Load fold plans
+            datasets = loaded_datasets[key]
+            folds = load_folds(db_name, configuration['n_splits'], configuration['n_runs'], configuration['random_state'])
+
+            execute_experiment(parser, args, Experiment(CONFIG.get_name(names), datasets, folds=folds, dtype=dtype, **configuration))
+
+
+def execute_experiment(parser, args, experiment):
+    """Plan, run, merge or execute the tasks of an experiment given the command-line arguments."""
+
+    # Plan experiment
+    if getattr(args, 'plan', False):
+        from .planner import plan_experiment, summarize_plan
+        plan = plan_experiment(experiment, args.n_jobs, args.n_probes)
+        print(plan.to_string(index=False, formatters={'Duration': '{:.1f}s'.format, 'Peak memory': lambda nbytes: f'{nbytes / 2 ** 20:.1f}MB'}))
+        summary = summarize_plan(plan, experiment.datasets_, args.n_jobs)
+        for name, value in summary.items():
+            if name.endswith('time'):
+                value = f'{value / 3600:.2f}h'
+            elif name.endswith('memory'):
+                value = f'{value / 2 ** 20:.1f}MB'
+            print(f'{name}: {value}')
+        return
+
+    # Execute tasks of distributed experiment
+    experiments_path = join(dirname(__file__), EXPERIMENTS_PATH)
+    makedirs(experiments_path, exist_ok=True)
+    path = join(experiments_path, f'{experiment.name}.db')
+    if args.subcommand == 'worker':
+        experiment.work(path, args.n_jobs, args.verbose, args.lease_duration, args.poll_interval)
+        return
+
+    # Run shard of experiment
+    shard = getattr(args, 'shard', None)
+    if shard is not None:
+        if args.distributed:
+            parser.error('Options --shard and --distributed are mutually exclusive.')
+        experiment.run(args.n_jobs, args.verbose, get_shard_path(experiments_path, experiment.name, shard), args.resume, shard=shard)
+        return
+
+    # Run or merge and save experiment
+    if args.subcommand == 'merge':
+        paths = glob(join(experiments_path, f'{glob_escape(experiment.name)}.shard-*-of-*.db'))
+        experiment.merge(paths, path)
+    elif args.distributed:
+        experiment.distribute(path, args.n_jobs, args.verbose, args.resume, args.lease_duration, args.poll_interval)
+    else:
+        experiment.run(args.n_jobs, args.verbose, path, args.resume, experiments_path if args.profile else None)
+    experiment.calculate_results(args.compared_oversamplers, args.alpha, args.control_oversampler)
+    experiment.dump(experiments_path)
@@ -0,0 +1,135 @@
+"""
+Cluster large datasets in mini-batches.
+"""
+
+# Author: Georgios Douzas <gdouzas@icloud.com>
+# License: MIT
+
+from math import ceil, sqrt
+
+import numpy as np
+from sklearn.base import BaseEstimator, ClusterMixin
+from sklearn.cluster import MiniBatchKMeans as _MiniBatchKMeans
+from sklearn.utils import check_array, check_random_state
+
+CLUSTERINGS = ('batch', 'online')
+
+
+def check_n_clusters(n_clusters, n_samples):
+    """Get the number of clusters, given as a number or as a fraction of the samples."""
+    if isinstance(n_clusters, float):
+        n_clusters = round(n_clusters * n_samples)
+    return int(min(max(n_clusters, 1), n_samples))
+
+
+def iterate_chunks(n_samples, batch_size, order=None):
+    """Iterate the indices of the chunks of the samples, in their order or in a given order."""
+    for start in range(0, n_samples, batch_size):
+        yield slice(start, start + batch_size) if order is None else np.sort(order[start:start + batch_size])
+
+
+class MiniBatchKMeans(_MiniBatchKMeans):
+    """Mini-batch k-means clusterer whose number of clusters may be a fraction of the samples."""
+
+    def fit(self, X, y=None, sample_weight=None):
+        """Compute the centroids from mini-batches of the data."""
+        n_clusters = self.n_clusters
+        self.n_clusters = check_n_clusters(n_clusters, len(X))
+        try:
+            super(MiniBatchKMeans, self).fit(X, y, sample_weight=sample_weight)
+        finally:
+            self.n_clusters = n_clusters
+        return self
+
+
+class OnlineSOM(ClusterMixin, BaseEstimator):
+    """Self-organizing map that is trained online on chunks of the data.
+
+    The ``n_clusters`` units fill the rows of a rectangular grid, except for
+    the last one that may be partially filled. They are moved after every
+    chunk towards the mean of the chunk's samples, weighted by the
+    neighborhood of their best matching units, while the learning rate and
+    the neighborhood radius decrease. The data are scaled to the unit hypercube and only a chunk of
+    them is processed at a time, therefore the memory does not increase with
+    the number of samples. The clusters are the units that are the best
+    matching unit of at least one sample and neighboring clusters are the
+    ones of adjacent units, given as a list of pairs of labels.
+    """
+
+    def __init__(self, n_clusters=8, n_epochs=2, batch_size=1024, learning_rate=0.5, sigma=None, random_state=None):
+        self.n_clusters = n_clusters
+        self.n_epochs = n_epochs
+        self.batch_size = batch_size
+        self.learning_rate = learning_rate
+        self.sigma = sigma
+        self.random_state = random_state
+
+    def _scale(self, X):
+        """Scale the data to the unit hypercube."""
+        return (np.asarray(X, dtype=float) - self.data_min_) / self.data_range_
+
+    def _find_units(self, X_scaled):
+        """Find the best matching unit of every sample."""
+        distances = (self.codebook_ ** 2).sum(axis=1) - 2 * X_scaled @ self.codebook_.T
+        return distances.argmin(axis=1)
+
+    def fit(self, X, y=None):
+        """Train the map and assign every sample to the cluster of its best matching unit."""
+        X = check_array(X)
+        random_state = check_random_state(self.random_state)
+        n_samples = len(X)
+        n_units = check_n_clusters(self.n_clusters, n_samples)
+        n_rows = max(int(sqrt(n_units)), 1)
+        n_columns = ceil(n_units / n_rows)
+        self.grid_ = np.array([(row, column) for row in range(n_rows) for column in range(n_columns)])[:n_units]
+
+        # Scale the data and initialize the units to random samples
+        self.data_min_ = np.min(X, axis=0)
+        self.data_range_ = np.max(X, axis=0) - self.data_min_
+        self.data_range_[self.data_range_ == 0] = 1.0
+        self.codebook_ = self._scale(X[np.sort(random_state.choice(n_samples, len(self.grid_), replace=len(self.grid_) > n_samples))])
+
+        # Update the units after every chunk
+        sigma = self.sigma if self.sigma is not None else max(n_rows, n_columns) / 2
+        n_steps = self.n_epochs * ceil(n_samples / self.batch_size)
+        step = 0
+        for _ in range(self.n_epochs):
+            for chunk in iterate_chunks(n_samples, self.batch_size, random_state.permutation(n_samples)):
+                fraction = step / max(n_steps - 1, 1)
+                learning_rate = self.learning_rate * (1 - fraction) + 0.01 * fraction
+                radius = max(sigma * (1 - fraction) + 0.5 * fraction, 1e-3)
+                X_chunk = self._scale(X[chunk])
+                grid_distances = ((self.grid_[self._find_units(X_chunk), np.newaxis] - self.grid_) ** 2).sum(axis=2)
+                influence = np.exp(-grid_distances / (2 * radius ** 2))
+                weights = influence.sum(axis=0)
+                updated = weights > 0
+                targets = (influence.T @ X_chunk)[updated] / weights[updated, np.newaxis]
+                self.codebook_[updated] += learning_rate * (targets - self.codebook_[updated])
+                step += 1
+
+        # Label the samples by their occupied units
+        units = np.concatenate([self._find_units(self._scale(X[chunk])) for chunk in iterate_chunks(n_samples, self.batch_size)])
+        occupied = np.unique(units)
+        self.labels_mapping_ = np.full(len(self.grid_), -1)
+        self.labels_mapping_[occupied] = np.arange(len(occupied))
+        self.labels_ = self.labels_mapping_[units]
+        self.cluster_centers_ = self.codebook_[occupied] * self.data_range_ + self.data_min_
+        self.n_clusters_ = len(occupied)
+
+        # Find the neighboring clusters of adjacent units
+        units = np.full(n_rows * n_columns, -1)
+        units[:n_units] = np.arange(n_units)
+        units = units.reshape(n_rows, n_columns)
+        adjacent = np.vstack([
+            np.column_stack([units[:, :-1].ravel(), units[:, 1:].ravel()]),
+            np.column_stack([units[:-1].ravel(), units[1:].ravel()])
+        ])
+        adjacent = adjacent[(adjacent >= 0).all(axis=1)]
+        adjacent = self.labels_mapping_[adjacent[np.lexsort(adjacent.T[::-1])]]
+        self.neighbors_ = [(int(label1), int(label2)) for label1, label2 in adjacent if label1 >= 0 and label2 >= 0]
+        return self
+
+    def predict(self, X):
+        """Predict the cluster of the best matching unit of every sample, or -1 when the unit is not a cluster."""
+        X = check_array(X)
+        return np.concatenate([self.labels_mapping_[self._find_units(self._scale(X[chunk]))] for chunk in iterate_chunks(len(X), self.batch_size)])
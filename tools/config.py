@@ -0,0 +1,99 @@
+"""
+Register the configurations of the experiments.
+"""
+
+# Author: Georgios Douzas <gdouzas@icloud.com>
+# License: MIT
+
+from collections.abc import Mapping
+from json import dumps
+
+SEARCH_STRATEGIES = ('grid', 'halving')
+MAX_COMBINED_NAMES = 3
+
+EXPERIMENTS = {
+    'no_oversampling_imbalanced': dict(db_name='imbalanced_binary_class', oversamplers_names=['NO OVERSAMPLING']),
+    'random_oversampling_imbalanced': dict(db_name='imbalanced_binary_class', oversamplers_names=['RANDOM OVERSAMPLING']),
+    'smote_imbalanced': dict(db_name='imbalanced_binary_class', oversamplers_names=['SMOTE']),
+    'borderline_smote_imbalanced': dict(db_name='imbalanced_binary_class', oversamplers_names=['BORDERLINE SMOTE']),
+    'adasyn_imbalanced': dict(db_name='imbalanced_binary_class', oversamplers_names=['ADASYN']),
+    'gsmote_imbalanced': dict(db_name='imbalanced_binary_class', oversamplers_names=['G-SMOTE']),
+    'kmeans_ros_imbalanced': dict(db_name='imbalanced_binary_class', oversamplers_names=['K-MEANS RANDOM OVERSAMPLING']),
+    'kmeans_smote_imbalanced': dict(db_name='imbalanced_binary_class', oversamplers_names=['K-MEANS SMOTE']),
+    'kmeans_borderline_smote_imbalanced': dict(db_name='imbalanced_binary_class', oversamplers_names=['K-MEANS BORDERLINE SMOTE']),
+    'kmeans_gsmote_imbalanced': dict(db_name='imbalanced_binary_class', oversamplers_names=['K-MEANS G-SMOTE']),
+    'somo_imbalanced': dict(db_name='imbalanced_binary_class', oversamplers_names=['SOMO']),
+    'gsomo_imbalanced': dict(db_name='imbalanced_binary_class', oversamplers_names=['G-SOMO']),
+    'lucas': dict(db_name='remote_sensing', datasets_names=['lucas'], classifiers_names=['KNN' , 'DT', 'GBC'], oversamplers_names='basic', scoring=['f1_macro'], n_splits=3),
+    'random_oversampling_insurance': dict(db_name='various', datasets_names=['insurance'], oversamplers_names='scaled'),
+    'small_data_oversampling': dict(db_name='binary_class', oversamplers_names='undersampled', scoring=['accuracy'])
+}
+
+
+class ConfigurationRegistry(Mapping):
+    """Lazy mapping of experiments' names to their configurations.
+
+    The registry holds only the parameters of the configurations. The
+    estimators and parameter grids of an experiment, as well as the modules
+    that define them, are imported and generated when the experiment is
+    accessed. Every access returns a new configuration.
+    """
+
+    def __init__(self, experiments):
+        self.experiments = experiments
+
+    def __getitem__(self, name):
+        from .experiment import generate_configuration
+        return generate_configuration(**self.experiments[name])
+
+    def __contains__(self, name):
+        return name in self.experiments
+
+    def __iter__(self):
+        return iter(self.experiments)
+
+    def __len__(self):
+        return len(self.experiments)
+
+    def group(self, names):
+        """Group the experiments that are combined.
+
+        Experiments are combined when they share all parameters except their
+        oversamplers. The oversamplers should also be modified in the same way,
+        e.g. scaled or undersampled.
+        """
+        groups = {}
+        for name in names:
+            params = dict(self.experiments[name])
+            oversamplers_names = params.pop('oversamplers_names', 'all')
+            params['modification'] = oversamplers_names if oversamplers_names in ('scaled', 'undersampled') else None
+            groups.setdefault(dumps(params, sort_keys=True), []).append(name)
+        return list(groups.values())
+
+    def combine(self, names):
+        """Combine the configurations of experiments that belong to the same group.
+
+        Oversamplers that are included in multiple experiments, e.g. the
+        NO OVERSAMPLING baseline, are evaluated only once.
+        """
+        if len(self.group(names)) != 1:
+            raise ValueError(f'Experiments {names} can not be combined.')
+        configurations = [self[name] for name in names]
+        oversamplers = {}
+        for configuration in configurations:
+            for name, ov, param_grid in configuration['oversamplers']:
+                oversamplers.setdefault(name, (name, ov, param_grid))
+        return {**configurations[0], 'oversamplers': list(oversamplers.values())}
+
+    def get_name(self, names):
+        """Get the name of combined experiments.
+
+        It is the experiments' names joined by "+", or the name of their database
+        followed by their number when there are many of them.
+        """
+        if len(names) <= MAX_COMBINED_NAMES:
+            return '+'.join(names)
+        return f'{self.experiments[names[0]]["db_name"]}_{len(names)}_experiments'
+
+
+CONFIG = ConfigurationRegistry(EXPERIMENTS)
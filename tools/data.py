@@ -5,10 +5,16 @@ Download, transform and simulate various datasets.
 # Author: Georgios Douzas <gdouzas@icloud.com>
 # License: MIT
 
-from os.path import join
-from os import remove
+from os.path import join, exists, dirname
+from os import remove, replace, makedirs, getpid
+from json import dump, load, dumps, loads
+from inspect import getsource
+from hashlib import sha256
+from threading import BoundedSemaphore, local, get_ident
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from re import sub
 from collections import Counter
+from collections.abc import Mapping
 from itertools import product
 from urllib.parse import urljoin
 from string import ascii_lowercase
@@ -21,14 +27,266 @@ from tqdm import tqdm
 import requests
 import numpy as np
 import pandas as pd
-from sklearn.utils import check_X_y
-from sklearn.datasets import make_classification
-from imblearn.datasets import make_imbalance
+
+from . import DATA_PATH
+
+MANIFEST_NAME = 'manifest.json'
+METADATA_TABLE = 'metadata'
+INDICES_TABLE = 'indices'
+
+
+def read_manifest(path):
+    """Read the manifest of the memory-mappable arrays."""
+    manifest_path = join(path, MANIFEST_NAME)
+    if not exists(manifest_path):
+        return []
+    with open(manifest_path) as file:
+        return load(file)
+
+
+def _get_file_name(manifest, name, extension):
+    """Get the file name of a dataset's array."""
+    if name in manifest and extension in manifest[name]:
+        return manifest[name][extension][:-len(f'.{extension}.npy')]
+    return f'{len(manifest):03d}_{sub(r"[^0-9a-z]+", "_", name.lower()).strip("_")}'
+
+
+def write_arrays(path, datasets, removed_names=(), update=False, variants=()):
+    """Write datasets as memory-mappable arrays along with a manifest.
+
+    Datasets with non-numeric input data are not written and should be
+    read from the sqlite database. The variants of datasets are given as
+    their name, the name of their parent dataset and the indices of the
+    parent's rows, and only the indices are written. When ``update`` is
+    true, the datasets are added to the existing manifest, replacing the
+    ones with the same name, and the ``removed_names`` are dropped from it.
+    """
+    makedirs(path, exist_ok=True)
+    manifest = {}
+    if update:
+        manifest = {dataset['name']: dataset for dataset in read_manifest(path) if dataset['name'] not in removed_names}
+    for name, data in datasets:
+        try:
+            X = np.ascontiguousarray(data.iloc[:, :-1].to_numpy(dtype=float))
+        except (ValueError, TypeError):
+            manifest.pop(name, None)
+            continue
+        y = data.iloc[:, -1].to_numpy()
+        if y.dtype == object:
+            y = y.astype(str)
+        file_name = _get_file_name(manifest, name, 'X')
+        np.save(join(path, f'{file_name}.X.npy'), X)
+        np.save(join(path, f'{file_name}.y.npy'), y)
+        manifest[name] = {'name': name, 'X': f'{file_name}.X.npy', 'y': f'{file_name}.y.npy', 'shape': list(X.shape)}
+    for name, parent, indices in variants:
+        if parent not in manifest:
+            manifest.pop(name, None)
+            continue
+        file_name = _get_file_name(manifest, name, 'indices')
+        np.save(join(path, f'{file_name}.indices.npy'), np.asarray(indices, dtype=np.int32))
+        manifest[name] = {'name': name, 'parent': parent, 'indices': f'{file_name}.indices.npy', 'shape': [len(indices), manifest[parent]['shape'][1]]}
+    temp_path = join(path, f'{MANIFEST_NAME}.tmp')
+    with open(temp_path, 'w') as file:
+        dump(list(manifest.values()), file, indent=2)
+    replace(temp_path, join(path, MANIFEST_NAME))
+
+
+class IndexedArray:
+    """Read-only array of the indexed rows of another array.
+
+    The rows are selected only when the array is indexed, e.g. with the
+    training or test indices of a fold, therefore only the selected rows
+    of the other array are copied. It is converted to a regular array
+    otherwise.
+    """
+
+    def __init__(self, array, indices):
+        self.array = array
+        self.indices = indices
+
+    @property
+    def shape(self):
+        return (len(self.indices), *self.array.shape[1:])
+
+    @property
+    def dtype(self):
+        return self.array.dtype
+
+    @property
+    def ndim(self):
+        return self.array.ndim
+
+    @property
+    def nbytes(self):
+        return len(self.indices) * self.array[:1].nbytes
+
+    def __len__(self):
+        return len(self.indices)
+
+    def __getitem__(self, key):
+        if isinstance(key, tuple):
+            return self.array[(self.indices[key[0]], *key[1:])]
+        return self.array[self.indices[key]]
+
+    def __array__(self, dtype=None, copy=None):
+        array = self.array[self.indices]
+        return array if dtype is None else array.astype(dtype, copy=False)
+
+
+class DatasetsArrays(Mapping):
+    """Read-only mapping of datasets' names to their arrays.
+
+    The arrays of a dataset are opened as memory-mapped arrays only when the
+    dataset is accessed. The input data of the variants of a dataset are
+    indexed arrays of their parent's input data, therefore every parent is
+    opened once, regardless of the number of its variants, and the rows of a
+    variant are copied only when they are selected, e.g. for a fold. When a data type
+    is given, the input data are converted to it in memory, therefore the
+    stored arrays are not modified.
+    """
+
+    def __init__(self, path, manifest, dtype=None):
+        self.path = path
+        self.manifest = {dataset['name']: dataset for dataset in manifest}
+        self.dtype = dtype
+        self.arrays_ = {}
+
+    def _load_X(self, file_name):
+        """Load the input data of a dataset with the data type of the mapping."""
+        X = np.load(join(self.path, file_name), mmap_mode='r')
+        if self.dtype is None or X.dtype == self.dtype:
+            return X
+        return X.astype(self.dtype)
+
+    def __getitem__(self, name):
+        if name not in self.arrays_:
+            dataset = self.manifest[name]
+            if 'parent' in dataset:
+                X, y = self[dataset['parent']]
+                indices = np.load(join(self.path, dataset['indices']), mmap_mode='r')
+                self.arrays_[name] = IndexedArray(X, indices), y[indices]
+            else:
+                self.arrays_[name] = self._load_X(dataset['X']), np.load(join(self.path, dataset['y']), mmap_mode='r')
+        return self.arrays_[name]
+
+    def __iter__(self):
+        return iter(self.manifest)
+
+    def __len__(self):
+        return len(self.manifest)
+
+
+def read_arrays(path, dtype=None):
+    """Read the datasets of a manifest as read-only memory-mapped arrays, optionally converting the input data to a data type."""
+    return DatasetsArrays(path, read_manifest(path), dtype)
+
+
+def export_arrays(path, db_name):
+    """Write the datasets of a saved sqlite database as memory-mappable arrays."""
+    with connect(join(path, f'{db_name}.db')) as connection:
+        variants = read_variants(connection)
+        variants_names = [name for name, *_ in variants]
+        tables = [(name, pd.read_sql(f'select * from "{name}"', connection)) for name in read_tables_names(connection) if name not in variants_names]
+    write_arrays(join(path, db_name), tables, variants=variants)
+
+
+def _get_folds_key(n_splits, n_runs, random_state):
+    """Get the key of a fold plan in the manifest."""
+    return f'{n_splits}x{n_runs}-{random_state}'
+
+
+def read_folds(path, n_splits, n_runs, random_state):
+    """Read the fold plans of the datasets of a manifest as read-only memory-mapped arrays.
+
+    A fold plan contains the fold of every sample for each run of the
+    repeated stratified k-fold cross validation.
+    """
+    key = _get_folds_key(n_splits, n_runs, random_state)
+    return {
+        dataset['name']: np.load(join(path, dataset['folds'][key]), mmap_mode='r')
+        for dataset in read_manifest(path) if key in dataset.get('folds', {})
+    }
+
+
+def write_folds(path, folds, n_splits, n_runs, random_state):
+    """Write the fold plans of datasets and add them to the manifest.
+
+    The fold plans of a dataset are removed from the manifest when the
+    dataset is written again.
+    """
+    key = _get_folds_key(n_splits, n_runs, random_state)
+    manifest = {dataset['name']: dataset for dataset in read_manifest(path)}
+    for name, fold_ids in folds.items():
+        file_name = f'{_get_file_name(manifest, name, "X" if "X" in manifest[name] else "indices")}.folds.{key}.npy'
+        np.save(join(path, file_name), fold_ids)
+        manifest[name].setdefault('folds', {})[key] = file_name
+    temp_path = join(path, f'{MANIFEST_NAME}.{getpid()}.tmp')
+    with open(temp_path, 'w') as file:
+        dump(list(manifest.values()), file, indent=2)
+    replace(temp_path, join(path, MANIFEST_NAME))
+
+
+def read_tables_names(connection):
+    """Read the names of the datasets' tables and views of a sqlite database."""
+    return [
+        name for name, in connection.execute("SELECT name FROM sqlite_master WHERE type IN ('table', 'view')")
+        if name not in (METADATA_TABLE, INDICES_TABLE)
+    ]
+
+
+def read_variants(connection):
+    """Read the names, parents' names and rows' indices of the datasets' variants of a sqlite database."""
+    if not connection.execute(f"SELECT name FROM sqlite_master WHERE type='table' AND name='{INDICES_TABLE}'").fetchone():
+        return []
+    indices = pd.read_sql(f'SELECT name, parent, row FROM {INDICES_TABLE} ORDER BY name, position', connection)
+    return [(name, group.parent.iloc[0], group.row.to_numpy()) for name, group in indices.groupby('name', sort=False)]
+
+
+def drop_table(connection, name):
+    """Drop a dataset's table or view from a sqlite database."""
+    for table_type, in connection.execute('SELECT type FROM sqlite_master WHERE name = ?', (name,)).fetchall():
+        connection.execute(f'DROP {table_type.upper()} "{name}"')
+    if connection.execute(f"SELECT name FROM sqlite_master WHERE type='table' AND name='{INDICES_TABLE}'").fetchone():
+        connection.execute(f'DELETE FROM {INDICES_TABLE} WHERE name = ?', (name,))
+
+
+def calculate_source_version(*objects):
+    """Calculate a version of the source code of functions and values."""
+    digest = sha256()
+    for obj in objects:
+        try:
+            source = getsource(obj)
+        except TypeError:
+            source = repr(obj)
+        digest.update(source.encode())
+    return digest.hexdigest()
 
 
 class Datasets:
+    """Base class to download, transform and save datasets.
+
+    The fetching methods run concurrently and the HTTP requests share a
+    bounded number of reused connections. The raw payloads are stored in
+    an on-disk content-addressed cache, therefore a database can be rebuilt
+    from the cache without network access.
+
+    Every table of a saved database is recorded in a metadata table along
+    with the URLs and hashes of its raw payloads and the version of its
+    fetching method's source code. A database can then be updated
+    incrementally, rebuilding only the tables that are missing or whose
+    source code or, optionally, remote payloads changed.
+    """
 
     UCI_URL = 'https://archive.ics.uci.edu/ml/machine-learning-databases/'
+    CACHE_PATH = join(dirname(__file__), DATA_PATH, 'cache')
+
+    def __init__(self, max_connections=8, cache_path=None, offline=False):
+        self.max_connections = max_connections
+        self.cache_path = cache_path
+        self.offline = offline
+        self._semaphore = BoundedSemaphore(max_connections)
+        self._sessions = local()
+        self._records = local()
 
     @staticmethod
     def _modify_columns(data):
@@ -36,23 +294,198 @@ class Datasets:
         X, y = data.drop(columns='target'), data.target
         X.columns = range(len(X.columns))
         return pd.concat([X, y], axis=1)
-    
-    def download(self):
-        """Download the datasets."""
-        self.datasets_ = []
-        func_names = [func_name for func_name in dir(self) if 'fetch_' in func_name]
-        for func_name in tqdm(func_names, desc='Datasets'):
-            name = sub('fetch_', '', func_name).upper().replace('_', ' ')
-            fetch_data = getattr(self, func_name)
-            data = self._modify_columns(fetch_data())
-            self.datasets_.append((name, data))
+
+    @staticmethod
+    def _write(path, content):
+        """Write content to a file atomically."""
+        makedirs(dirname(path), exist_ok=True)
+        temp_path = f'{path}.{getpid()}.{get_ident()}.tmp'
+        with open(temp_path, 'wb') as file:
+            file.write(content)
+        replace(temp_path, path)
+
+    def _get_session(self):
+        """Get the HTTP session of the current thread."""
+        if not hasattr(self._sessions, 'session'):
+            session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_connections=self.max_connections, pool_maxsize=self.max_connections)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            self._sessions.session = session
+        return self._sessions.session
+
+    def _record(self, url, content_hash):
+        """Record the hash of a URL's content fetched by the current fetching method."""
+        payloads = getattr(self._records, 'payloads', None)
+        if payloads is not None:
+            payloads.append((url, content_hash))
+
+    def _fetch(self, url, revalidate=False):
+        """Fetch the content of a URL through the on-disk cache.
+
+        When ``revalidate`` is true, the cached content is ignored and
+        replaced by the downloaded one.
+        """
+        cache_path = self.CACHE_PATH if self.cache_path is None else self.cache_path
+        url_path = join(cache_path, 'urls', sha256(url.encode()).hexdigest())
+        if exists(url_path) and not revalidate:
+            with open(url_path) as file:
+                content_hash = file.read()
+            content_path = join(cache_path, 'contents', content_hash)
+            if exists(content_path):
+                self._record(url, content_hash)
+                with open(content_path, 'rb') as file:
+                    return file.read()
+        if self.offline:
+            raise ConnectionError(f'URL {url} is not cached and downloading is disabled.')
+        with self._semaphore:
+            response = self._get_session().get(url)
+        response.raise_for_status()
+        content = response.content
+        content_hash = sha256(content).hexdigest()
+        self._write(join(cache_path, 'contents', content_hash), content)
+        self._write(url_path, content_hash.encode())
+        self._record(url, content_hash)
+        return content
+
+    def _fetch_all(self, urls):
+        """Fetch the contents of multiple URLs concurrently."""
+        payloads = getattr(self._records, 'payloads', None)
+
+        def fetch(url):
+            self._records.payloads = payloads
+            return self._fetch(url)
+
+        with ThreadPoolExecutor(max_workers=self.max_connections) as executor:
+            return list(executor.map(fetch, urls))
+
+    def _open(self, url):
+        """Open the content of a URL as a file-like object."""
+        return BytesIO(self._fetch(url))
+
+    def _get_func_names(self):
+        """Get the names of the fetching methods."""
+        return [func_name for func_name in dir(self) if func_name.startswith('fetch_')]
+
+    def _calculate_transform_version(self, func_name):
+        """Calculate the version of the transformation applied by a fetching method."""
+        return calculate_source_version(getattr(type(self), func_name), self._modify_columns)
+
+    def _call(self, func_name):
+        """Call a fetching method and record the hashes of the fetched contents."""
+        self._records.payloads = []
+        try:
+            return getattr(self, func_name)(), sorted(self._records.payloads)
+        finally:
+            self._records.payloads = None
+
+    def download(self, func_names=None):
+        """Download the datasets, optionally only the ones of the given fetching methods."""
+        if func_names is None:
+            func_names = self._get_func_names()
+        datasets, self.sources_, self.payloads_, self.variants_ = {}, {}, {}, []
+        with ThreadPoolExecutor(max_workers=self.max_connections) as executor:
+            futures = {executor.submit(self._call, func_name): func_name for func_name in func_names}
+            for future in tqdm(as_completed(futures), total=len(futures), desc='Datasets'):
+                func_name = futures[future]
+                name = sub('fetch_', '', func_name).upper().replace('_', ' ')
+                data, self.payloads_[func_name] = future.result()
+                datasets[func_name] = (name, self._modify_columns(data))
+                self.sources_[name] = func_name
+        self.datasets_ = [datasets[func_name] for func_name in func_names]
         return self
-    
+
+    def _write_tables(self, connection):
+        """Write the datasets, their variants and their metadata to a sqlite database.
+
+        The variants are written as views that select the indexed rows of
+        their parent's table.
+        """
+        connection.execute(
+            f'CREATE TABLE IF NOT EXISTS {METADATA_TABLE} '
+            '(name TEXT PRIMARY KEY, source TEXT, urls TEXT, payload_hash TEXT, transform_version TEXT)'
+        )
+        connection.execute(
+            f'CREATE TABLE IF NOT EXISTS {INDICES_TABLE} '
+            '(name TEXT, parent TEXT, position INTEGER, row INTEGER, PRIMARY KEY (name, position)) WITHOUT ROWID'
+        )
+        for name, data in self.datasets_:
+            drop_table(connection, name)
+            data.to_sql(name, connection, index=False)
+        for name, parent, indices in self.variants_:
+            drop_table(connection, name)
+            connection.executemany(f'INSERT INTO {INDICES_TABLE} VALUES (?, ?, ?, ?)', [(name, parent, position, int(row)) for position, row in enumerate(indices)])
+            connection.execute(
+                f'CREATE VIEW "{name}" AS SELECT data.* FROM "{parent}" AS data '
+                f'JOIN {INDICES_TABLE} ON data.rowid = {INDICES_TABLE}.row + 1 '
+                f"WHERE {INDICES_TABLE}.name = '{name}' ORDER BY {INDICES_TABLE}.position"
+            )
+        versions = {func_name: self._calculate_transform_version(func_name) for func_name in self.payloads_}
+        for name, *_ in self.datasets_ + self.variants_:
+            func_name = self.sources_[name]
+            payloads = self.payloads_[func_name]
+            connection.execute(
+                f'INSERT OR REPLACE INTO {METADATA_TABLE} VALUES (?, ?, ?, ?, ?)',
+                (name, func_name, dumps(payloads), sha256(dumps(payloads).encode()).hexdigest(), versions[func_name])
+            )
+
     def save(self, path, db_name):
-        """Save datasets."""
+        """Save datasets as sqlite database and memory-mappable arrays."""
         with connect(join(path, f'{db_name}.db')) as connection:
-            for name, data in self.datasets_:
-                data.to_sql(name, connection, index=False, if_exists='replace')
+            connection.execute(f'DROP TABLE IF EXISTS {METADATA_TABLE}')
+            self._write_tables(connection)
+        write_arrays(join(path, db_name), self.datasets_, variants=self.variants_)
+        return self
+
+    def _select_outdated(self, metadata, tables_names, refresh):
+        """Select the fetching methods whose tables are missing or outdated."""
+        outdated = []
+        revalidated = {}
+        for func_name in self._get_func_names():
+            records = metadata.get(func_name)
+            if (
+                records is None
+                or any(name not in tables_names for name, *_ in records)
+                or any(version != self._calculate_transform_version(func_name) for *_, version in records)
+            ):
+                outdated.append(func_name)
+            elif refresh:
+                revalidated[func_name] = loads(records[0][1])
+        if revalidated:
+            urls = sorted({url for payloads in revalidated.values() for url, _ in payloads})
+            with ThreadPoolExecutor(max_workers=self.max_connections) as executor:
+                contents = executor.map(lambda url: self._fetch(url, revalidate=True), urls)
+                hashes = {url: sha256(content).hexdigest() for url, content in zip(urls, contents)}
+            outdated += [
+                func_name for func_name, payloads in revalidated.items()
+                if any(hashes[url] != content_hash for url, content_hash in payloads)
+            ]
+        return outdated
+
+    def update(self, path, db_name, refresh=False):
+        """Update a saved database, rebuilding only the outdated tables.
+
+        A table is outdated when it is missing or the source code of its
+        fetching method changed. When ``refresh`` is true, the recorded URLs
+        are downloaded again and the tables whose payloads changed are also
+        rebuilt. The rest of the database is left untouched.
+        """
+        db_path = join(path, f'{db_name}.db')
+        with connect(db_path) as connection:
+            tables_names = set(read_tables_names(connection))
+            metadata = {}
+            if connection.execute(f"SELECT name FROM sqlite_master WHERE type='table' AND name='{METADATA_TABLE}'").fetchone():
+                for name, func_name, urls, version in connection.execute(f'SELECT name, source, urls, transform_version FROM {METADATA_TABLE}'):
+                    metadata.setdefault(func_name, []).append((name, urls, version))
+        self.download(self._select_outdated(metadata, tables_names, refresh))
+        removed_names = [name for func_name in self.payloads_ for name, *_ in metadata.get(func_name, []) if name not in self.sources_]
+        with connect(db_path) as connection:
+            for name in removed_names:
+                drop_table(connection, name)
+                connection.execute(f'DELETE FROM {METADATA_TABLE} WHERE name = ?', (name,))
+            self._write_tables(connection)
+        write_arrays(join(path, db_name), self.datasets_, removed_names, update=True, variants=self.variants_)
+        return self
 
 
 class ImbalancedBinaryClassDatasets(Datasets):
@@ -64,6 +497,14 @@ class ImbalancedBinaryClassDatasets(Datasets):
     MULTIPLICATION_FACTORS = [2, 3]
     RANDOM_STATE = 0
 
+    def _calculate_transform_version(self, func_name):
+        """Calculate the version of the transformation applied by a fetching method,
+        including the generation of the undersampled versions."""
+        return calculate_source_version(
+            getattr(type(self), func_name), self._modify_columns, ImbalancedBinaryClassDatasets.download,
+            self._calculate_ratio, ImbalancedBinaryClassDatasets._select_imbalanced_indices, self.MULTIPLICATION_FACTORS, self.RANDOM_STATE
+        )
+
     @staticmethod
     def _calculate_ratio(multiplication_factor, y):
         """Calculate ratio based on IRs multiplication factor."""
@@ -71,27 +512,28 @@ class ImbalancedBinaryClassDatasets(Datasets):
         ratio[1] = int(ratio[1] / multiplication_factor)
         return ratio
 
-    def _make_imbalance(self, data, multiplication_factor):
-        """Undersample the minority class."""
-        X_columns = [col for col in data.columns if col != 'target']
-        X, y = check_X_y(data.loc[:, X_columns], data.target)
+    def _select_imbalanced_indices(self, data, multiplication_factor):
+        """Select the indices of the rows that undersample the minority class."""
+        from imblearn.under_sampling import RandomUnderSampler
+        indices = np.arange(len(data)).reshape(-1, 1)
         if multiplication_factor > 1.0:
-            sampling_strategy = self._calculate_ratio(multiplication_factor, y)
-            X, y = make_imbalance(X, y, sampling_strategy=sampling_strategy, random_state=self.RANDOM_STATE)
-        data = pd.DataFrame(np.column_stack((X, y)))
-        data.iloc[:, -1] = data.iloc[:, -1].astype(int)
-        return data
-    
-    def download(self):
-        """Download the datasets and append undersampled versions of them."""
-        super(ImbalancedBinaryClassDatasets, self).download()
-        undersampled_datasets = []
+            sampling_strategy = self._calculate_ratio(multiplication_factor, data.target)
+            undersampler = RandomUnderSampler(sampling_strategy=sampling_strategy, replacement=False, random_state=self.RANDOM_STATE)
+            indices, _ = undersampler.fit_resample(indices, data.target)
+        return indices[:, 0]
+
+    def download(self, func_names=None):
+        """Download the datasets and append undersampled versions of them.
+
+        The undersampled versions are variants that select rows of their
+        parent dataset.
+        """
+        super(ImbalancedBinaryClassDatasets, self).download(func_names)
         for (name, data), factor in list(product(self.datasets_, self.MULTIPLICATION_FACTORS)):
             ratio = self._calculate_ratio(factor, data.target)
             if ratio[1] >= 15:
-                data = self._make_imbalance(data, factor)
-                undersampled_datasets.append((f'{name} ({factor})', data))
-        self.datasets_ += undersampled_datasets
+                self.variants_.append((f'{name} ({factor})', name, self._select_imbalanced_indices(data, factor)))
+                self.sources_[f'{name} ({factor})'] = self.sources_[name]
         return self
                 
     def fetch_breast_tissue(self):
@@ -102,7 +544,7 @@ class ImbalancedBinaryClassDatasets(Datasets):
         http://archive.ics.uci.edu/ml/datasets/breast+tissue
         """
         url = urljoin(self.UCI_URL, '00192/BreastTissue.xls')
-        data = pd.read_excel(url, sheet_name='Data')
+        data = pd.read_excel(self._open(url), sheet_name='Data')
         data = data.drop(columns='Case #').rename(columns={'Class': 'target'})
         data['target'] = data['target'].isin(['car', 'fad']).astype(int)
         return data
@@ -115,7 +557,7 @@ class ImbalancedBinaryClassDatasets(Datasets):
         https://archive.ics.uci.edu/ml/datasets/ecoli
         """
         url = urljoin(self.UCI_URL, 'ecoli/ecoli.data')
-        data = pd.read_csv(url, header=None, delim_whitespace=True)
+        data = pd.read_csv(self._open(url), header=None, delim_whitespace=True)
         data = data.drop(columns=0).rename(columns={8: 'target'})
         data['target'] = data['target'].isin(['pp']).astype(int)
         return data
@@ -127,7 +569,7 @@ class ImbalancedBinaryClassDatasets(Datasets):
 
         https://www.openml.org/d/188
         """
-        data = pd.read_csv(self.OPENML_URL)
+        data = pd.read_csv(self._open(self.OPENML_URL))
         data = data.iloc[:, -9:].rename(columns={'Utility': 'target'})
         data = data[data != '?'].dropna()
         data['target'] = data['target'].isin(['best']).astype(int)
@@ -141,7 +583,7 @@ class ImbalancedBinaryClassDatasets(Datasets):
         https://archive.ics.uci.edu/ml/datasets/glass+identification
         """
         url = urljoin(self.UCI_URL, 'glass/glass.data')
-        data = pd.read_csv(url, header=None)
+        data = pd.read_csv(self._open(url), header=None)
         data = data.drop(columns=0).rename(columns={10: 'target'})
         data['target'] = data['target'].isin([1]).astype(int)
         return data
@@ -154,7 +596,7 @@ class ImbalancedBinaryClassDatasets(Datasets):
         https://archive.ics.uci.edu/ml/datasets/Haberman's+Survival
         """
         url = urljoin(self.UCI_URL, 'haberman/haberman.data')
-        data = pd.read_csv(url, header=None)
+        data = pd.read_csv(self._open(url), header=None)
         data.rename(columns={3: 'target'}, inplace=True)
         data['target'] = data['target'].isin([2]).astype(int)
         return data
@@ -167,7 +609,7 @@ class ImbalancedBinaryClassDatasets(Datasets):
         http://archive.ics.uci.edu/ml/datasets/statlog+(heart)
         """
         url = urljoin(self.UCI_URL, 'statlog/heart/heart.dat')
-        data = pd.read_csv(url, header=None, delim_whitespace=True)
+        data = pd.read_csv(self._open(url), header=None, delim_whitespace=True)
         data.rename(columns={13: 'target'}, inplace=True)
         data['target'] = data['target'].isin([2]).astype(int)
         return data
@@ -180,7 +622,7 @@ class ImbalancedBinaryClassDatasets(Datasets):
         https://archive.ics.uci.edu/ml/datasets/iris
         """
         url = urljoin(self.UCI_URL, 'iris/bezdekIris.data')
-        data = pd.read_csv(url, header=None)
+        data = pd.read_csv(self._open(url), header=None)
         data.rename(columns={4: 'target'}, inplace=True)
         data['target'] = data['target'].isin(['Iris-setosa']).astype(int)
         return data
@@ -193,7 +635,7 @@ class ImbalancedBinaryClassDatasets(Datasets):
         https://archive.ics.uci.edu/ml/datasets/Libras+Movement
         """
         url = urljoin(self.UCI_URL, 'libras/movement_libras.data')
-        data = pd.read_csv(url, header=None)
+        data = pd.read_csv(self._open(url), header=None)
         data.rename(columns={90: 'target'}, inplace=True)
         data['target'] = data['target'].isin([1]).astype(int)
         return data
@@ -206,7 +648,7 @@ class ImbalancedBinaryClassDatasets(Datasets):
         https://archive.ics.uci.edu/ml/datasets/liver+disorders
         """
         url = urljoin(self.UCI_URL, 'liver-disorders/bupa.data')
-        data = pd.read_csv(url, header=None)
+        data = pd.read_csv(self._open(url), header=None)
         data.rename(columns={6: 'target'}, inplace=True)
         data['target'] = data['target'].isin([1]).astype(int)
         return data
@@ -218,7 +660,7 @@ class ImbalancedBinaryClassDatasets(Datasets):
 
         https://www.kaggle.com/uciml/pima-indians-diabetes-database
         """
-        database = requests.get(self.GITHUB_URL).content
+        database = self._fetch(self.GITHUB_URL)
         with open('temp.db', 'wb') as file:
             file.write(database)
         with connect('temp.db') as con:
@@ -235,7 +677,7 @@ class ImbalancedBinaryClassDatasets(Datasets):
         https://archive.ics.uci.edu/ml/datasets/Statlog+%28Image+Segmentation%29
         """
         url = urljoin(self.UCI_URL, 'statlog/segment/segment.dat')
-        data = pd.read_csv(url, header=None, delim_whitespace=True)
+        data = pd.read_csv(self._open(url), header=None, delim_whitespace=True)
         data = data.drop(columns=[2, 3, 4]).rename(columns={19: 'target'})
         data['target'] = data['target'].isin([1]).astype(int)
         return data
@@ -248,9 +690,9 @@ class ImbalancedBinaryClassDatasets(Datasets):
         https://archive.ics.uci.edu/ml/datasets/Statlog+(Vehicle+Silhouettes)
         """
         data = pd.DataFrame()
-        for letter in ascii_lowercase[0:9]:
-            url = urljoin(self.UCI_URL, 'statlog/vehicle/xa%s.dat') % letter
-            partial_data = pd.read_csv(url, header=None, delim_whitespace=True)
+        urls = [urljoin(self.UCI_URL, 'statlog/vehicle/xa%s.dat') % letter for letter in ascii_lowercase[0:9]]
+        for content in self._fetch_all(urls):
+            partial_data = pd.read_csv(BytesIO(content), header=None, delim_whitespace=True)
             partial_data = partial_data.rename(columns={18: 'target'})
             partial_data['target'] = partial_data['target'].isin(['van']).astype(int)
             data = data.append(partial_data)
@@ -264,7 +706,7 @@ class ImbalancedBinaryClassDatasets(Datasets):
         https://archive.ics.uci.edu/ml/datasets/wine
         """
         url = urljoin(self.UCI_URL, 'wine/wine.data')
-        data = pd.read_csv(url, header=None)
+        data = pd.read_csv(self._open(url), header=None)
         data.rename(columns={0: 'target'}, inplace=True)
         data['target'] = data['target'].isin([2]).astype(int)
         return data
@@ -277,7 +719,7 @@ class ImbalancedBinaryClassDatasets(Datasets):
         http://sci2s.ugr.es/keel/dataset.php?cod=145
         """
         url = urljoin(join(self.KEEL_URL, 'imb_IRlowerThan9/'), 'new-thyroid1.zip')
-        zipped_data = requests.get(url).content
+        zipped_data = self._fetch(url)
         unzipped_data = ZipFile(BytesIO(zipped_data)).read('new-thyroid1.dat').decode('utf-8')
         data = pd.read_csv(StringIO(sub(r'@.+\n+', '', unzipped_data)), header=None, sep=', ', engine='python')
         data.rename(columns={5: 'target'}, inplace=True)
@@ -292,7 +734,7 @@ class ImbalancedBinaryClassDatasets(Datasets):
         http://sci2s.ugr.es/keel/dataset.php?cod=146
         """
         url = urljoin(join(self.KEEL_URL, 'imb_IRlowerThan9/'), 'new-thyroid2.zip')
-        zipped_data = requests.get(url).content
+        zipped_data = self._fetch(url)
         unzipped_data = ZipFile(BytesIO(zipped_data)).read('newthyroid2.dat').decode('utf-8')
         data = pd.read_csv(StringIO(sub(r'@.+\n+', '', unzipped_data)), header=None, sep=', ', engine='python')
         data.rename(columns={5: 'target'}, inplace=True)
@@ -307,7 +749,7 @@ class ImbalancedBinaryClassDatasets(Datasets):
         http://sci2s.ugr.es/keel/dataset.php?cod=980
         """
         url = urljoin(join(self.KEEL_URL, 'imb_IRhigherThan9p2/'), 'cleveland-0_vs_4.zip')
-        zipped_data = requests.get(url).content
+        zipped_data = self._fetch(url)
         unzipped_data = ZipFile(BytesIO(zipped_data)).read('cleveland-0_vs_4.dat').decode('utf-8')
         data = pd.read_csv(StringIO(sub(r'@.+\n+', '', unzipped_data)), header=None)
         data.rename(columns={13: 'target'}, inplace=True)
@@ -322,7 +764,7 @@ class ImbalancedBinaryClassDatasets(Datasets):
         http://sci2s.ugr.es/keel/dataset.php?cod=1330
         """
         url = urljoin(join(self.KEEL_URL, 'imb_IRhigherThan9p3/'), 'dermatology-6.zip')
-        zipped_data = requests.get(url).content
+        zipped_data = self._fetch(url)
         unzipped_data = ZipFile(BytesIO(zipped_data)).read('dermatology-6.dat').decode('utf-8')
         data = pd.read_csv(StringIO(sub(r'@.+\n+', '', unzipped_data)), header=None)
         data.rename(columns={34: 'target'}, inplace=True)
@@ -337,7 +779,7 @@ class ImbalancedBinaryClassDatasets(Datasets):
         http://sci2s.ugr.es/keel/dataset.php?cod=998
         """
         url = urljoin(join(self.KEEL_URL, 'imb_IRhigherThan9p2/'), 'led7digit-0-2-4-5-6-7-8-9_vs_1.zip')
-        zipped_data = requests.get(url).content
+        zipped_data = self._fetch(url)
         unzipped_data = ZipFile(BytesIO(zipped_data)).read('led7digit-0-2-4-5-6-7-8-9_vs_1.dat').decode('utf-8')
         data = pd.read_csv(StringIO(sub(r'@.+\n+', '', unzipped_data)), header=None)
         data.rename(columns={7: 'target'}, inplace=True)
@@ -352,7 +794,7 @@ class ImbalancedBinaryClassDatasets(Datasets):
         http://sci2s.ugr.es/keel/dataset.php?cod=147
         """
         url = urljoin(join(self.KEEL_URL, 'imb_IRlowerThan9/'), 'page-blocks0.zip')
-        zipped_data = requests.get(url).content
+        zipped_data = self._fetch(url)
         unzipped_data = ZipFile(BytesIO(zipped_data)).read('page-blocks0.dat').decode('utf-8')
         data = pd.read_csv(StringIO(sub(r'@.+\n+', '', unzipped_data)), header=None)
         data.rename(columns={10: 'target'}, inplace=True)
@@ -367,7 +809,7 @@ class ImbalancedBinaryClassDatasets(Datasets):
         http://sci2s.ugr.es/keel/dataset.php?cod=124
         """
         url = urljoin(join(self.KEEL_URL, 'imb_IRhigherThan9p1/'), 'page-blocks-1-3_vs_4.zip')
-        zipped_data = requests.get(url).content
+        zipped_data = self._fetch(url)
         unzipped_data = ZipFile(BytesIO(zipped_data)).read('page-blocks-1-3_vs_4.dat').decode('utf-8')
         data = pd.read_csv(StringIO(sub(r'@.+\n+', '', unzipped_data)), header=None)
         data.rename(columns={10: 'target'}, inplace=True)
@@ -382,7 +824,7 @@ class ImbalancedBinaryClassDatasets(Datasets):
         http://sci2s.ugr.es/keel/dataset.php?cod=127
         """
         url = urljoin(join(self.KEEL_URL, 'imb_IRhigherThan9p1/'), 'vowel0.zip')
-        zipped_data = requests.get(url).content
+        zipped_data = self._fetch(url)
         unzipped_data = ZipFile(BytesIO(zipped_data)).read('vowel0.dat').decode('utf-8')
         data = pd.read_csv(StringIO(sub(r'@.+\n+', '', unzipped_data)), header=None)
         data.rename(columns={13: 'target'}, inplace=True)
@@ -397,7 +839,7 @@ class ImbalancedBinaryClassDatasets(Datasets):
         http://sci2s.ugr.es/keel/dataset.php?cod=153
         """
         url = urljoin(join(self.KEEL_URL, 'imb_IRlowerThan9/'), 'yeast1.zip')
-        zipped_data = requests.get(url).content
+        zipped_data = self._fetch(url)
         unzipped_data = ZipFile(BytesIO(zipped_data)).read('yeast1.dat').decode('utf-8')
         data = pd.read_csv(StringIO(sub(r'@.+\n+', '', unzipped_data)), header=None)
         data.rename(columns={8: 'target'}, inplace=True)
@@ -412,7 +854,7 @@ class ImbalancedBinaryClassDatasets(Datasets):
         http://sci2s.ugr.es/keel/dataset.php?cod=154
         """
         url = urljoin(join(self.KEEL_URL, 'imb_IRlowerThan9/'), 'yeast3.zip')
-        zipped_data = requests.get(url).content
+        zipped_data = self._fetch(url)
         unzipped_data = ZipFile(BytesIO(zipped_data)).read('yeast3.dat').decode('utf-8')
         data = pd.read_csv(StringIO(sub(r'@.+\n+', '', unzipped_data)), header=None)
         data.rename(columns={8: 'target'}, inplace=True)
@@ -427,7 +869,7 @@ class ImbalancedBinaryClassDatasets(Datasets):
         http://sci2s.ugr.es/keel/dataset.php?cod=133
         """
         url = urljoin(join(self.KEEL_URL, 'imb_IRhigherThan9p1/'), 'yeast4.zip')
-        zipped_data = requests.get(url).content
+        zipped_data = self._fetch(url)
         unzipped_data = ZipFile(BytesIO(zipped_data)).read('yeast4.dat').decode('utf-8')
         data = pd.read_csv(StringIO(sub(r'@.+\n+', '', unzipped_data)), header=None)
         data.rename(columns={8: 'target'}, inplace=True)
@@ -442,7 +884,7 @@ class ImbalancedBinaryClassDatasets(Datasets):
         http://sci2s.ugr.es/keel/dataset.php?cod=134
         """
         url = urljoin(join(self.KEEL_URL, 'imb_IRhigherThan9p1/'), 'yeast5.zip')
-        zipped_data = requests.get(url).content
+        zipped_data = self._fetch(url)
         unzipped_data = ZipFile(BytesIO(zipped_data)).read('yeast5.dat').decode('utf-8')
         data = pd.read_csv(StringIO(sub(r'@.+\n+', '', unzipped_data)), header=None)
         data.rename(columns={8: 'target'}, inplace=True)
@@ -457,7 +899,7 @@ class ImbalancedBinaryClassDatasets(Datasets):
         http://sci2s.ugr.es/keel/dataset.php?cod=135
         """
         url = urljoin(join(self.KEEL_URL, 'imb_IRhigherThan9p1/'), 'yeast6.zip')
-        zipped_data = requests.get(url).content
+        zipped_data = self._fetch(url)
         unzipped_data = ZipFile(BytesIO(zipped_data)).read('yeast6.dat').decode('utf-8')
         data = pd.read_csv(StringIO(sub(r'@.+\n+', '', unzipped_data)), header=None)
         data.rename(columns={8: 'target'}, inplace=True)
@@ -466,6 +908,7 @@ class ImbalancedBinaryClassDatasets(Datasets):
 
     def fetch_mandelon_1(self):
         """Simulate a variation of the MANDELON Data Set."""
+        from sklearn.datasets import make_classification
         X, y = make_classification(n_samples=4000, n_features=20, weights=[0.97, 0.03], random_state=self.RANDOM_STATE)
         data = pd.DataFrame(np.column_stack([X, y]))
         data.rename(columns={20: 'target'}, inplace=True)
@@ -474,6 +917,7 @@ class ImbalancedBinaryClassDatasets(Datasets):
 
     def fetch_mandelon_2(self):
         """Simulate a variation of the MANDELON Data Set."""
+        from sklearn.datasets import make_classification
         X, y = make_classification(n_samples=3000, n_features=200, weights=[0.97, 0.03], random_state=self.RANDOM_STATE)
         data = pd.DataFrame(np.column_stack([X, y]))
         data.rename(columns={200: 'target'}, inplace=True)
@@ -490,7 +934,7 @@ class BinaryClassDatasets(Datasets):
         https://archive.ics.uci.edu/ml/datasets/banknote+authentication
         """
         url = urljoin(self.UCI_URL, '00267/data_banknote_authentication.txt')
-        data = pd.read_csv(url, header=None)
+        data = pd.read_csv(self._open(url), header=None)
         data.rename(columns={4: 'target'}, inplace=True)
         return data
 
@@ -502,8 +946,8 @@ class BinaryClassDatasets(Datasets):
         url = urljoin(self.UCI_URL, 'arcene')
         data, labels = [], []
         for data_type in ('train', 'valid'):
-            data.append(pd.read_csv(join(url, f'ARCENE/arcene_{data_type}.data'), header=None, sep=' ').drop(columns=list(range(1999, 10001))))
-            labels.append(pd.read_csv(join(url, ('ARCENE/' if data_type == 'train' else '') + f'arcene_{data_type}.labels'), header=None).rename(columns={0:'target'}))
+            data.append(pd.read_csv(self._open(join(url, f'ARCENE/arcene_{data_type}.data')), header=None, sep=' ').drop(columns=list(range(1999, 10001))))
+            labels.append(pd.read_csv(self._open(join(url, ('ARCENE/' if data_type == 'train' else '') + f'arcene_{data_type}.labels')), header=None).rename(columns={0:'target'}))
         data = pd.concat(data, ignore_index=True)
         labels = pd.concat(labels, ignore_index=True)
         data = pd.concat([data, labels], axis=1)
@@ -516,7 +960,7 @@ class BinaryClassDatasets(Datasets):
         https://archive.ics.uci.edu/ml/datasets/Audit+Data
         """
         url = urljoin(self.UCI_URL, '00475/audit_data.zip')
-        zipped_data = requests.get(url).content
+        zipped_data = self._fetch(url)
         unzipped_data = ZipFile(BytesIO(zipped_data)).read('audit_data/audit_risk.csv').decode('utf-8')
         data = pd.read_csv(StringIO(sub(r'@.+\n+', '', unzipped_data)), engine='python')
         data = data.rename(columns={'Risk': 'target'}).dropna()
@@ -528,7 +972,7 @@ class BinaryClassDatasets(Datasets):
         https://archive.ics.uci.edu/ml/datasets/Spambase
         """
         url = urljoin(self.UCI_URL, 'spambase/spambase.data')
-        data = pd.read_csv(url, header=None)
+        data = pd.read_csv(self._open(url), header=None)
         data.rename(columns={57: 'target'}, inplace=True)
         return data
 
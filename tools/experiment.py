@@ -6,11 +6,11 @@ Configure and run the experimental procedure.
 # License: MIT
 
 from collections import Counter
+from functools import partial
 
 from sklearn.base import clone
 from sklearn.linear_model import LogisticRegression
 from sklearn.tree import DecisionTreeClassifier
-from sklearn.neighbors.classification import KNeighborsClassifier
 from sklearn.ensemble import GradientBoostingClassifier
 from sklearn.preprocessing import MinMaxScaler
 from imblearn.pipeline import make_pipeline
@@ -19,6 +19,35 @@ from sklearnext.over_sampling import RandomOverSampler, SMOTE, BorderlineSMOTE,
 from sklearnext.cluster import KMeans, SOM
 from sklearnext.over_sampling.base import BaseClusterOverSampler
 
+from .cache import CachedClustererMixin, CachedNearestNeighbors
+from .cluster import CLUSTERINGS, MiniBatchKMeans, OnlineSOM
+from .config import CONFIG
+from .neighbors import NEIGHBORS_ALGORITHMS, ForestKNeighborsClassifier
+
+
+class CachedKMeans(CachedClustererMixin, KMeans):
+    """KMeans clusterer that shares its fit across oversampler configurations."""
+
+
+class CachedSOM(CachedClustererMixin, SOM):
+    """SOM clusterer that shares its fit across oversampler configurations."""
+
+
+class CachedMiniBatchKMeans(CachedClustererMixin, MiniBatchKMeans):
+    """Mini-batch KMeans clusterer that shares its fit across oversampler configurations."""
+
+
+class CachedOnlineSOM(CachedClustererMixin, OnlineSOM):
+    """Online SOM clusterer that shares its fit across oversampler configurations."""
+
+
+CLUSTERERS = {'batch': (CachedKMeans, CachedSOM), 'online': (CachedMiniBatchKMeans, CachedOnlineSOM)}
+
+
+def generate_sampling_strategy(y, factor):
+    """Generate a dictionary of the sampling strategy."""
+    return {k:int(v / factor) for k,v in Counter(y).items()}
+
 
 class UnderOverSampler(BaseClusterOverSampler):
     """A class that applies random undersampling and oversampling."""
@@ -71,11 +100,20 @@ def select_pipelines(pipelines, names):
     return [(name, pipeline, param_grid) for name, pipeline, param_grid in pipelines if name in names]
 
 
-def generate_classifiers(classifiers_names):
+def generate_neighbors(values, algorithm='auto', additional_neighbor=1):
+    """Generate a nearest neighbors estimator that shares the neighbors graph of the largest value.
+
+    The estimator is the default value of an oversampler's parameter whose
+    grid includes the values, which the runner replaces by copies of it.
+    """
+    return CachedNearestNeighbors(max_n_neighbors=max(values) + additional_neighbor, algorithm=algorithm)
+
+
+def generate_classifiers(classifiers_names, neighbors_algorithm='auto'):
     """Generate classifiers."""
     classifiers = [
         ('LR', LogisticRegression(solver='lbfgs', max_iter=1e4, multi_class='auto'), {}),
-        ('KNN', KNeighborsClassifier(), {'n_neighbors': [3, 5]}),
+        ('KNN', ForestKNeighborsClassifier(algorithm=neighbors_algorithm), {'n_neighbors': [3, 5]}),
         ('DT', DecisionTreeClassifier(), {'max_depth': [3, 6]}),
         ('GBC', GradientBoostingClassifier(), {'max_depth': [3, 6], 'n_estimators': [50, 100]})
     ]
@@ -85,43 +123,44 @@ def generate_classifiers(classifiers_names):
     return classifiers
     
 
-def generate_oversamplers(oversamplers_names):
+def generate_oversamplers(oversamplers_names, neighbors_algorithm='auto', clustering='batch'):
     "Generate oversamplers."
+    kmeans, som = CLUSTERERS[clustering]
     oversamplers = [
         ('NO OVERSAMPLING', None, {}),
         ('RANDOM OVERSAMPLING', RandomOverSampler(), {}),
-        ('SMOTE', SMOTE(), {'k_neighbors': [3, 5]}),
-        ('BORDERLINE SMOTE', BorderlineSMOTE(), {'k_neighbors': [3, 5]}),
-        ('ADASYN', ADASYN(), {'n_neighbors': [2, 3]}),
-        ('G-SMOTE', GeometricSMOTE(), {
+        ('SMOTE', SMOTE(k_neighbors=generate_neighbors([3, 5], neighbors_algorithm)), {'k_neighbors': [3, 5]}),
+        ('BORDERLINE SMOTE', BorderlineSMOTE(k_neighbors=generate_neighbors([3, 5], neighbors_algorithm), m_neighbors=CachedNearestNeighbors(n_neighbors=11, algorithm=neighbors_algorithm)), {'k_neighbors': [3, 5]}),
+        ('ADASYN', ADASYN(n_neighbors=generate_neighbors([2, 3], neighbors_algorithm)), {'n_neighbors': [2, 3]}),
+        ('G-SMOTE', GeometricSMOTE(k_neighbors=generate_neighbors([3, 5], neighbors_algorithm)), {
             'k_neighbors': [3, 5], 
             'selection_strategy': ['combined', 'minority', 'majority'], 
             'truncation_factor': [-1.0, -0.5, .0, 0.25, 0.5, 0.75, 1.0], 
             'deformation_factor': [.0, 0.2, 0.4, 0.5, 0.6, 0.8, 1.0]
             }
         ),
-        ('K-MEANS RANDOM OVERSAMPLING', RandomOverSampler(clusterer=KMeans(), distributor=DensityDistributor()), {
+        ('K-MEANS RANDOM OVERSAMPLING', RandomOverSampler(k_neighbors=generate_neighbors([3, 5], neighbors_algorithm), clusterer=kmeans(), distributor=DensityDistributor()), {
             'k_neighbors': [3, 5],
             'clusterer__n_clusters': [0.0, 0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0],
             'distributor__distances_exponent': [0, 1, 2, 5],
             'distributor__filtering_threshold': [0.0, 0.5, 1.0, 2.0]
             }
         ),
-        ('K-MEANS SMOTE', SMOTE(clusterer=KMeans(), distributor=DensityDistributor()), {
+        ('K-MEANS SMOTE', SMOTE(k_neighbors=generate_neighbors([3, 5], neighbors_algorithm), clusterer=kmeans(), distributor=DensityDistributor()), {
             'k_neighbors': [3, 5],
             'clusterer__n_clusters': [0.0, 0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0],
             'distributor__distances_exponent': [0, 1, 2, 5],
             'distributor__filtering_threshold': [0.0, 0.5, 1.0, 2.0]
             }
         ),
-        ('K-MEANS BORDERLINE SMOTE', BorderlineSMOTE(clusterer=KMeans(), distributor=DensityDistributor()), {
+        ('K-MEANS BORDERLINE SMOTE', BorderlineSMOTE(k_neighbors=generate_neighbors([3, 5], neighbors_algorithm), m_neighbors=CachedNearestNeighbors(n_neighbors=11, algorithm=neighbors_algorithm), clusterer=kmeans(), distributor=DensityDistributor()), {
             'k_neighbors': [3, 5],
             'clusterer__n_clusters': [0.0, 0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0],
             'distributor__distances_exponent': [0, 1, 2, 5],
             'distributor__filtering_threshold': [0.0, 0.5, 1.0, 2.0]
             }
         ),
-        ('K-MEANS G-SMOTE', GeometricSMOTE(clusterer=KMeans(), distributor=DensityDistributor()), {
+        ('K-MEANS G-SMOTE', GeometricSMOTE(k_neighbors=generate_neighbors([3, 5], neighbors_algorithm), clusterer=kmeans(), distributor=DensityDistributor()), {
             'k_neighbors': [3, 5],
             'selection_strategy': ['combined', 'minority', 'majority'],
             'truncation_factor': [-1.0, -0.5, .0, 0.25, 0.5, 0.75, 1.0], 
@@ -131,7 +170,7 @@ def generate_oversamplers(oversamplers_names):
             'distributor__filtering_threshold': [0.0, 0.5, 1.0, 2.0]
             }
         ),
-        ('SOMO', SMOTE(clusterer=SOM(), distributor=DensityDistributor()), {
+        ('SOMO', SMOTE(k_neighbors=generate_neighbors([3, 5], neighbors_algorithm), clusterer=som(), distributor=DensityDistributor()), {
             'k_neighbors': [3, 5],
             'clusterer__n_clusters': [0.0, 0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0],
             'distributor__distances_exponent': [0, 1, 2, 5],
@@ -139,7 +178,7 @@ def generate_oversamplers(oversamplers_names):
             'distributor__distribution_ratio': [0.0, 0.25, 0.5, 0.75, 1.0]
             }
         ),
-        ('G-SOMO', GeometricSMOTE(clusterer=SOM(), distributor=DensityDistributor()), {
+        ('G-SOMO', GeometricSMOTE(k_neighbors=generate_neighbors([3, 5], neighbors_algorithm), clusterer=som(), distributor=DensityDistributor()), {
             'k_neighbors': [3, 5],
             'selection_strategy': ['combined', 'minority', 'majority'],
             'truncation_factor': [-1.0, -0.5, .0, 0.25, 0.5, 0.75, 1.0], 
@@ -156,39 +195,35 @@ def generate_oversamplers(oversamplers_names):
     if oversamplers_names == 'scaled':
         oversamplers = append_transformer(MinMaxScaler(), oversamplers)
     elif oversamplers_names == 'undersampled':
-        oversamplers = set_sampling_strategy(lambda y: generate_sampling_strategy(y, 1/3), oversamplers)
-        oversamplers = append_transformer(RandomUnderSampler(sampling_strategy=lambda y: generate_sampling_strategy(y, 3)), oversamplers)
+        oversamplers = set_sampling_strategy(partial(generate_sampling_strategy, factor=1 / 3), oversamplers)
+        oversamplers = append_transformer(RandomUnderSampler(sampling_strategy=partial(generate_sampling_strategy, factor=3)), oversamplers)
+    elif oversamplers_names not in ('all', 'basic'):
+        oversamplers = select_pipelines(oversamplers, oversamplers_names)
 
     return oversamplers
 
 
 def generate_configuration(db_name, datasets_names='all', classifiers_names='all', oversamplers_names='all', 
-                           scoring='imbalanced', n_splits=5, n_runs=3, random_state=0):
-    """Generate configuration dictionary for an experiment."""
+                           scoring='imbalanced', n_splits=5, n_runs=3, random_state=0, search='grid', min_resource=None, reduction_factor=3,
+                           neighbors_algorithm='auto', clustering='batch'):
+    """Generate configuration dictionary for an experiment.
+
+    The nearest neighbors of the oversamplers and classifiers are searched with
+    ``neighbors_algorithm``, one of ``NEIGHBORS_ALGORITHMS``. The clustered
+    oversamplers use full-batch clusterers when ``clustering`` is ``'batch'``
+    and mini-batch KMeans or an online SOM when it is ``'online'``.
+    """
+    if neighbors_algorithm not in NEIGHBORS_ALGORITHMS:
+        raise ValueError(f'Parameter `neighbors_algorithm` should be one of {NEIGHBORS_ALGORITHMS}. Got {neighbors_algorithm} instead.')
+    if clustering not in CLUSTERINGS:
+        raise ValueError(f'Parameter `clustering` should be one of {CLUSTERINGS}. Got {clustering} instead.')
     if scoring == 'imbalanced':
         scoring = ['roc_auc', 'f1', 'geometric_mean_score']
     n_splits = 5
     n_runs = 3
     random_state = 0
-    classifiers = generate_classifiers(classifiers_names)
-    oversamplers = generate_oversamplers(oversamplers_names)
-    return dict(db_name=db_name, datasets_names=datasets_names, classifiers=classifiers, oversamplers=oversamplers, scoring=scoring, n_splits=n_splits, n_runs=n_runs, random_state=random_state)
-
-
-CONFIG = {
-    'no_oversampling_imbalanced': generate_configuration('imbalanced_binary_class', oversamplers_names=['NO OVERSAMPLING']),
-    'random_oversampling_imbalanced': generate_configuration('imbalanced_binary_class', oversamplers_names=['RANDOM OVERSAMPLING']),
-    'smote_imbalanced': generate_configuration('imbalanced_binary_class', oversamplers_names=['SMOTE']),
-    'borderline_smote_imbalanced': generate_configuration('imbalanced_binary_class', oversamplers_names=['BORDERLINE SMOTE']),
-    'adasyn_imbalanced': generate_configuration('imbalanced_binary_class', oversamplers_names=['ADASYN']),
-    'gsmote_imbalanced': generate_configuration('imbalanced_binary_class', oversamplers_names=['G-SMOTE']),
-    'kmeans_ros_imbalanced': generate_configuration('imbalanced_binary_class', oversamplers_names=['K-MEANS RANDOM OVERSAMPLING']),
-    'kmeans_smote_imbalanced': generate_configuration('imbalanced_binary_class', oversamplers_names=['K-MEANS SMOTE']),
-    'kmeans_borderline_smote_imbalanced': generate_configuration('imbalanced_binary_class', oversamplers_names=['K-MEANS BORDERLINE SMOTE']),
-    'kmeans_gsmote_imbalanced': generate_configuration('imbalanced_binary_class', oversamplers_names=['K-MEANS G-SMOTE']),
-    'somo_imbalanced': generate_configuration('imbalanced_binary_class', oversamplers_names=['SOMO']),
-    'gsomo_imbalanced': generate_configuration('imbalanced_binary_class', oversamplers_names=['G-SOMO']),
-    'lucas': generate_configuration('remote_sensing', datasets_names=['lucas'], classifiers_names=['KNN' , 'DT', 'GBC'], oversamplers_names='basic', scoring=['f1_macro'], n_splits=3),
-    'random_oversampling_insurance': generate_configuration('various', datasets_names=['insurance'], oversamplers_names='scaled'),
-    'small_data_oversampling': generate_configuration('binary_class', oversamplers_names='undersampled', scoring=['accuracy'])
-}
+    classifiers = generate_classifiers(classifiers_names, neighbors_algorithm)
+    oversamplers = generate_oversamplers(oversamplers_names, neighbors_algorithm, clustering)
+    return dict(db_name=db_name, datasets_names=datasets_names, classifiers=classifiers, oversamplers=oversamplers, scoring=scoring, n_splits=n_splits, n_runs=n_runs, random_state=random_state,
+                search=search, min_resource=min_resource, reduction_factor=reduction_factor)
+
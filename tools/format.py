@@ -7,12 +7,34 @@ Format experimental results.
 
 import pandas as pd
 
+from .store import ScoresStore
+
 METRICS_NAMES_MAPPING = {'roc_auc': 'AUC', 'f1': 'F-SCORE', 'geometric_mean_score': 'G-MEAN'}
 
 
-def generate_mean_std_tbl(experiment, name):
+def load_results(experiment, classifiers=None, metrics=None):
+    """Return the results of an experiment or calculate them lazily
+    from a scores store, given either as an object or a path."""
+    if isinstance(experiment, str):
+        experiment = ScoresStore(experiment)
+    if isinstance(experiment, ScoresStore):
+        experiment = experiment.calculate_results(classifiers=classifiers, metrics=metrics)
+    return experiment
+
+
+def select_rows(tbl, classifiers=None, metrics=None):
+    """Select the rows of a table that correspond to classifiers and metrics."""
+    if classifiers is not None:
+        tbl = tbl[tbl['Classifier'].isin(classifiers)]
+    if metrics is not None:
+        tbl = tbl[tbl['Metric'].isin(metrics)]
+    return tbl
+
+
+def generate_mean_std_tbl(experiment, name, classifiers=None, metrics=None):
     """Generate table that combines mean and sem values."""
-    mean_vals, std_vals = getattr(experiment, f'mean_{name}_'), getattr(experiment, f'sem_{name}_')
+    experiment = load_results(experiment, classifiers, metrics)
+    mean_vals, std_vals = (select_rows(getattr(experiment, f'{stat}_{name}_'), classifiers, metrics) for stat in ('mean', 'sem'))
     index = mean_vals.iloc[:, :2]
     scores = mean_vals.iloc[:, 2:].applymap('{:,.2f}'.format) + r" $\pm$ "  + std_vals.iloc[:, 2:].applymap('{:,.2f}'.format)
     tbl = pd.concat([index, scores], axis=1)
@@ -20,9 +42,10 @@ def generate_mean_std_tbl(experiment, name):
     return tbl
 
 
-def generate_pvalues_tbl(experiment, name):
+def generate_pvalues_tbl(experiment, name, classifiers=None, metrics=None):
     """Format p-values."""
-    tbl = getattr(experiment, f'{name}_test_').copy()
+    experiment = load_results(experiment, classifiers, metrics)
+    tbl = select_rows(getattr(experiment, f'{name}_test_'), classifiers, metrics).copy()
     for name in tbl.dtypes[tbl.dtypes == float].index:
         tbl[name] = tbl[name].apply(lambda pvalue: '%.1e' % pvalue)
     tbl['Metric'] = tbl['Metric'].apply(lambda metric: METRICS_NAMES_MAPPING[metric])
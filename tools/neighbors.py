@@ -0,0 +1,210 @@
+"""
+Search the nearest neighbors exactly or approximately.
+"""
+
+# Author: Georgios Douzas <gdouzas@icloud.com>
+# License: MIT
+
+import numpy as np
+from sklearn.neighbors import KNeighborsClassifier
+from sklearn.utils import check_random_state
+
+NEIGHBORS_ALGORITHMS = ('auto', 'brute', 'kd_tree', 'ball_tree', 'rp_forest')
+MAX_CHUNK_SIZE = 2 ** 24
+
+
+def calculate_squared_distances(X, Y):
+    """Calculate the squared euclidean distances of the rows of two arrays."""
+    distances = (X ** 2).sum(axis=1)[:, np.newaxis] - 2 * X @ Y.T + (Y ** 2).sum(axis=1)
+    return np.maximum(distances, 0, out=distances)
+
+
+class RandomProjectionForest:
+    """Approximate nearest neighbors index of random projection trees.
+
+    Every tree splits the samples recursively in two halves at the median of
+    their projections on a random direction, until at most ``leaf_size`` samples
+    remain. The candidate neighbors of a query are the samples of its leaves
+    across all trees and the nearest of them are selected by their exact
+    distances. Queries with fewer candidates than neighbors are searched
+    exhaustively. The recall of the search increases with ``n_trees`` and
+    ``leaf_size`` and decreases with the number of samples and the intrinsic
+    dimension of the data, e.g. the default parameters find 88% of the 5
+    nearest neighbors of 3000 samples of a 20-dimensional gaussian but only
+    64% of 20000 samples. They should be calibrated with the neighbors
+    benchmark when exact neighbors matter.
+    """
+
+    def __init__(self, n_trees=30, leaf_size=30, random_state=None):
+        self.n_trees = n_trees
+        self.leaf_size = leaf_size
+        self.random_state = random_state
+
+    def _build_tree(self, random_state):
+        """Build a tree of the fitted data, splitting all the nodes of every level at once.
+
+        The samples of every node are stored contiguously in a permutation of
+        the samples' indices. Internal nodes are identified by nonnegative and
+        leaves by negative integers.
+        """
+        n_samples, n_features = self.X_fit_.shape
+        samples = np.arange(n_samples)
+        directions, thresholds, children, leaves_starts, leaves_sizes = [], [], [], [], []
+        counts = {'nodes': 0, 'leaves': 0}
+
+        def identify(starts, sizes):
+            ids, leaf = np.empty(len(sizes), dtype=int), sizes <= self.leaf_size
+            ids[~leaf] = counts['nodes'] + np.arange(np.count_nonzero(~leaf))
+            ids[leaf] = ~(counts['leaves'] + np.arange(np.count_nonzero(leaf)))
+            counts['nodes'] += np.count_nonzero(~leaf)
+            counts['leaves'] += np.count_nonzero(leaf)
+            leaves_starts.append(starts[leaf])
+            leaves_sizes.append(sizes[leaf])
+            return ids, ~leaf
+
+        starts, sizes = np.array([0]), np.array([n_samples])
+        [root], internal = identify(starts, sizes)
+        starts, sizes = starts[internal], sizes[internal]
+        while starts.size:
+            offsets = np.cumsum(sizes) - sizes
+            segments = np.repeat(np.arange(len(sizes)), sizes)
+            positions = np.arange(sizes.sum()) + np.repeat(starts - offsets, sizes)
+            level_directions = random_state.normal(size=(len(sizes), n_features))
+            projections = np.einsum('ij,ij->i', self.X_fit_[samples[positions]], level_directions[segments])
+            order = np.lexsort((projections, segments))
+            samples[positions], projections = samples[positions[order]], projections[order]
+            halves = sizes // 2
+            directions.append(level_directions)
+            thresholds.append((projections[offsets + halves - 1] + projections[offsets + halves]) / 2)
+            starts, sizes = np.column_stack([starts, starts + halves]).ravel(), np.column_stack([halves, sizes - halves]).ravel()
+            ids, internal = identify(starts, sizes)
+            children.append(ids.reshape(-1, 2))
+            starts, sizes = starts[internal], sizes[internal]
+
+        leaves_starts, leaves_sizes = np.concatenate(leaves_starts), np.concatenate(leaves_sizes)
+        columns = np.arange(leaves_sizes.max())
+        mask = columns < leaves_sizes[:, np.newaxis]
+        padded_leaves = np.full(mask.shape, -1)
+        padded_leaves[mask] = samples[(leaves_starts[:, np.newaxis] + columns)[mask]]
+        if not directions:
+            return root, np.empty((0, n_features)), np.empty(0), np.empty((0, 2), dtype=int), padded_leaves
+        return root, np.vstack(directions), np.concatenate(thresholds), np.vstack(children), padded_leaves
+
+    @staticmethod
+    def _route(tree, X):
+        """Find the leaf of every query in a tree."""
+        root, directions, thresholds, children, _ = tree
+        nodes = np.full(len(X), root)
+        active = np.flatnonzero(nodes >= 0)
+        while active.size:
+            node = nodes[active]
+            right = np.einsum('ij,ij->i', X[active], directions[node]) > thresholds[node]
+            nodes[active] = children[node, right.astype(int)]
+            active = active[nodes[active] >= 0]
+        return ~nodes
+
+    def fit(self, X):
+        """Build the trees of the data."""
+        random_state = check_random_state(self.random_state)
+        self.X_fit_ = np.asarray(X)
+        self.squared_norms_ = (self.X_fit_ ** 2).sum(axis=1)
+        self.trees_ = [self._build_tree(random_state) for _ in range(self.n_trees)]
+        return self
+
+    def _search_exact(self, X, queries, n_neighbors):
+        """Search the nearest neighbors of queries among all the fitted data."""
+        distances = calculate_squared_distances(X, self.X_fit_)
+        if queries is not None:
+            distances[np.arange(len(X)), queries] = np.inf
+        indices = np.argsort(distances, axis=1, kind='stable')[:, :n_neighbors]
+        return np.take_along_axis(distances, indices, axis=1), indices
+
+    def _search_chunk(self, X, leaves_ids, queries, n_neighbors):
+        """Search the nearest neighbors of a chunk of queries among the samples of their leaves."""
+        candidates = np.sort(np.hstack([tree[-1][leaves_ids[:, position]] for position, tree in enumerate(self.trees_)]), axis=1)
+        if candidates.shape[1] < n_neighbors:
+            return self._search_exact(X, queries, n_neighbors)
+        invalid = candidates < 0
+        invalid[:, 1:] |= candidates[:, 1:] == candidates[:, :-1]
+        if queries is not None:
+            invalid |= candidates == queries[:, np.newaxis]
+        candidates_ = np.maximum(candidates, 0)
+        products = np.matmul(self.X_fit_[candidates_], X[:, :, np.newaxis])[:, :, 0]
+        distances = np.maximum((X ** 2).sum(axis=1)[:, np.newaxis] - 2 * products + self.squared_norms_[candidates_], 0)
+        distances[invalid] = np.inf
+        # Select the nearest candidates, breaking ties by their indices since candidates are sorted
+        order = np.argsort(distances, axis=1, kind='stable')[:, :n_neighbors]
+        distances, indices = np.take_along_axis(distances, order, axis=1), np.take_along_axis(candidates, order, axis=1)
+        incomplete = np.flatnonzero(np.isinf(distances[:, -1]))
+        if incomplete.size:
+            distances[incomplete], indices[incomplete] = self._search_exact(
+                X[incomplete], queries[incomplete] if queries is not None else None, n_neighbors
+            )
+        return distances, indices
+
+    def kneighbors(self, X=None, n_neighbors=5, return_distance=True):
+        """Find the approximate nearest neighbors of the query data.
+
+        When the query data are not given, the neighbors of the fitted data are
+        searched, excluding every sample from its own neighbors.
+        """
+        queries = None
+        if X is None:
+            X, queries = self.X_fit_, np.arange(len(self.X_fit_))
+        X = np.asarray(X)
+        n_samples_fit = len(self.X_fit_) - (queries is not None)
+        if n_neighbors > n_samples_fit:
+            raise ValueError(f'Expected n_neighbors <= n_samples_fit, but n_neighbors = {n_neighbors}, n_samples_fit = {n_samples_fit}')
+        leaves_ids = np.column_stack([self._route(tree, X) for tree in self.trees_])
+        n_candidates = sum(tree[-1].shape[1] for tree in self.trees_)
+        chunk_size = max(1, MAX_CHUNK_SIZE // (n_candidates * max(X.shape[1], 1)))
+        distances, indices = np.empty((len(X), n_neighbors)), np.empty((len(X), n_neighbors), dtype=int)
+        for start in range(0, len(X), chunk_size):
+            chunk = slice(start, start + chunk_size)
+            distances[chunk], indices[chunk] = self._search_chunk(
+                X[chunk], leaves_ids[chunk], queries[chunk] if queries is not None else None, n_neighbors
+            )
+        return (np.sqrt(distances), indices) if return_distance else indices
+
+
+def fit_forest(estimator, X):
+    """Fit the random projection forest of a nearest neighbors estimator."""
+    if not (estimator.metric == 'euclidean' or (estimator.metric == 'minkowski' and estimator.p == 2)):
+        raise ValueError(f'Random projection forests support only the euclidean metric, got {estimator.metric}.')
+    return RandomProjectionForest(estimator.n_trees, estimator.leaf_size, estimator.random_state).fit(X)
+
+
+class ForestKNeighborsClassifier(KNeighborsClassifier):
+    """Nearest neighbors classifier that also searches the neighbors with a random projection forest.
+
+    The algorithm ``'rp_forest'`` selects the approximate search of
+    :class:`RandomProjectionForest`, any other algorithm is passed to
+    :class:`KNeighborsClassifier`. The approximate neighbors, and therefore
+    the predictions, may differ from the exact ones.
+    """
+
+    def __init__(self, n_neighbors=5, weights='uniform', algorithm='auto', leaf_size=30, p=2,
+                 metric='minkowski', metric_params=None, n_jobs=None, n_trees=30, random_state=None):
+        super(ForestKNeighborsClassifier, self).__init__(n_neighbors=n_neighbors, weights=weights, algorithm=algorithm, leaf_size=leaf_size,
+                                                         p=p, metric=metric, metric_params=metric_params, n_jobs=n_jobs)
+        self.n_trees = n_trees
+        self.random_state = random_state
+
+    def fit(self, X, y):
+        """Fit the classifier and the forest of the training data."""
+        if self.algorithm != 'rp_forest':
+            return super(ForestKNeighborsClassifier, self).fit(X, y)
+        self.algorithm = 'brute'
+        try:
+            super(ForestKNeighborsClassifier, self).fit(X, y)
+        finally:
+            self.algorithm = 'rp_forest'
+        self._fit_method = 'rp_forest'
+        self.forest_ = fit_forest(self, self._fit_X)
+        return self
+
+    def kneighbors(self, X=None, n_neighbors=None, return_distance=True):
+        """Find the nearest neighbors of the query data."""
+        if self.algorithm != 'rp_forest':
+            return super(ForestKNeighborsClassifier, self).kneighbors(X, n_neighbors, return_distance)
+        return self.forest_.kneighbors(X, n_neighbors if n_neighbors is not None else self.n_neighbors, return_distance)
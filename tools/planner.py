@@ -0,0 +1,175 @@
+"""
+Plan the computational cost of an experiment before running it.
+"""
+
+# Author: Georgios Douzas <gdouzas@icloud.com>
+# License: MIT
+
+from math import ceil
+from time import perf_counter
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+from joblib import effective_n_jobs
+from sklearn.base import clone
+from sklearn.utils import check_random_state
+
+from .cache import clear_caches
+from .runner import build_estimator, fit_score, set_random_state
+from .staging import get_staged_param, group_staged_classifiers, truncate_classifier
+
+
+def calculate_halving_schedule(n_candidates, min_resource, max_resource, reduction_factor):
+    """Calculate the number of candidates and folds of each iteration of the search.
+
+    The best ``ceil(n_candidates / reduction_factor)`` candidates are selected
+    at each iteration, as in :meth:`Experiment._select`.
+    """
+    schedule = []
+    start, end = 0, min_resource
+    while True:
+        schedule.append((n_candidates, end - start))
+        if end == max_resource:
+            break
+        n_candidates = ceil(n_candidates / reduction_factor)
+        start, end = end, min(end * reduction_factor, max_resource)
+    return schedule
+
+
+def time_task(oversampler, groups, X, y, train_indices, test_indices, scorers, random_state):
+    """Time the resampling of a training fold and the evaluation of each group of staged classifiers.
+
+    The first classifier of a group is fitted and the others are truncated
+    from it, as in :func:`fit_score`.
+    """
+    X_train, y_train = X[train_indices], y[train_indices]
+    X_test, y_test = X[test_indices], y[test_indices]
+    start = perf_counter()
+    X_resampled, y_resampled = X_train, y_train
+    if oversampler is not None:
+        X_resampled, y_resampled = set_random_state(oversampler, random_state).fit_resample(X_train, y_train)
+    resampling_time = perf_counter() - start
+    fitting_times = []
+    for group in groups:
+        start = perf_counter()
+        classifier = set_random_state(group[0], random_state).fit(X_resampled, y_resampled)
+        staged_classifiers = [classifier]
+        if len(group) > 1:
+            param = get_staged_param(classifier)
+            staged_classifiers += truncate_classifier(classifier, param, [clf.get_params()[param] for clf in group[1:]], X_test, y_resampled)
+        for staged_classifier in staged_classifiers:
+            for scorer in scorers:
+                scorer(staged_classifier, X_test, y_test)
+        fitting_times.append(perf_counter() - start)
+    return resampling_time, fitting_times
+
+
+def measure_peak_memory(oversampler, classifiers, X, y, train_indices, test_indices, scorers, random_state):
+    """Measure the peak memory in bytes that is allocated by a task."""
+    tracemalloc.start()
+    try:
+        fit_score(None, [(oversampler, classifiers)], X, y, train_indices, test_indices, scorers, random_state)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def plan_experiment(experiment, n_jobs=-1, n_probes=1):
+    """Plan the number of fits, running time and peak memory of an experiment.
+
+    The number of resamplings and fits of each dataset and oversampler are
+    enumerated from the classes of equivalent configurations of the parameter
+    grids, the groups of staged classifier configurations, the number of
+    folds and the search strategy. Their duration and the peak memory of a
+    task are calibrated by timing ``n_probes`` randomly selected
+    configurations of the oversampler and groups of each classifier on the
+    first training fold of the dataset. The probes are shared by datasets of
+    the same shape. The caches of clusterers and nearest neighbors are cleared
+    before every probe and measurement, therefore their fits are included.
+    """
+    experiment._initialize(n_jobs, 0)
+    random_state = check_random_state(experiment.random_state)
+    staged_groups = {}
+    for clf_name, clf, clf_grid in experiment.classifiers_:
+        classifiers = [build_estimator(clf, params) for params in clf_grid]
+        staged_groups[clf_name] = [[classifiers[position] for position in positions] for positions in group_staged_classifiers(classifiers)]
+    probes = {}
+    plan = []
+    for dataset_name, (X, y) in experiment.datasets_:
+        _, _, train_indices, test_indices = experiment.folds_[dataset_name][0]
+        task_random_state = experiment.random_states_[0]
+        for ov_name, ov, ov_grid in experiment.oversamplers_:
+
+            # Count resamplings and fits, assuming that the selected candidates are spread evenly over the equivalence classes
+            n_configurations = len(experiment.equivalents_[ov_name])
+            schedules = {
+                clf_name: [
+                    (min(n_configurations * len(clf_grid), ceil(n_candidates * n_configurations / len(ov_grid))), n_folds)
+                    for n_candidates, n_folds in calculate_halving_schedule(
+                        len(ov_grid) * len(clf_grid), experiment.min_resource_, experiment.max_resource_, experiment.reduction_factor
+                    )
+                ]
+                for clf_name, _, clf_grid in experiment.classifiers_
+            }
+            # Only the first classifier of every group of staged configurations is fitted
+            n_fits = {
+                clf_name: sum(min(n_candidates, n_configurations * len(staged_groups[clf_name])) * n_folds for n_candidates, n_folds in schedule)
+                for clf_name, schedule in schedules.items()
+            }
+            n_resamplings = sum(
+                min(n_configurations, sum(n_candidates for n_candidates, _ in iterations)) * iterations[0][1]
+                for iterations in zip(*schedules.values())
+            )
+
+            # Time probes of the oversampler and groups of classifiers
+            key = (ov_name, X.shape)
+            if key not in probes:
+                resampling_times, fitting_times, peak_memory = [], [], 0
+                for probe in range(n_probes):
+                    oversampler = build_estimator(ov, ov_grid[random_state.randint(len(ov_grid))])
+                    groups = [
+                        [clone(classifier) for classifier in staged_groups[clf_name][random_state.randint(len(staged_groups[clf_name]))]]
+                        for clf_name, *_ in experiment.classifiers_
+                    ]
+                    clear_caches()
+                    resampling_time, groups_times = time_task(
+                        oversampler, groups, X, y, train_indices, test_indices, experiment.scorers_, task_random_state
+                    )
+                    resampling_times.append(resampling_time)
+                    fitting_times.append(groups_times)
+                    if probe == 0:
+                        clear_caches()
+                        peak_memory = measure_peak_memory(
+                            oversampler, [classifier for group in groups for classifier in group], X, y, train_indices, test_indices,
+                            experiment.scorers_, task_random_state
+                        )
+                probes[key] = (np.mean(resampling_times), np.mean(fitting_times, axis=0), peak_memory)
+            resampling_time, fitting_times, peak_memory = probes[key]
+
+            duration = resampling_time * n_resamplings + sum(
+                fitting_time * n_fits[clf_name] for (clf_name, *_), fitting_time in zip(experiment.classifiers_, fitting_times)
+            )
+            plan.append((dataset_name, ov_name, n_configurations, n_resamplings, sum(n_fits.values()), duration, peak_memory))
+
+    plan = pd.DataFrame(plan, columns=['Dataset', 'Oversampler', 'Configurations', 'Resamplings', 'Fits', 'Duration', 'Peak memory'])
+    return plan
+
+
+def summarize_plan(plan, datasets, n_jobs=-1):
+    """Summarize the plan of an experiment.
+
+    The wall-clock time assumes that the tasks are evenly distributed to the
+    workers. The peak memory assumes that every worker runs the task with the
+    highest peak memory, while the datasets are shared by the workers.
+    """
+    n_workers = effective_n_jobs(n_jobs)
+    datasets_memory = sum(X.nbytes + y.nbytes for _, (X, y) in datasets)
+    return {
+        'Resamplings': int(plan['Resamplings'].sum()),
+        'Fits': int(plan['Fits'].sum()),
+        'CPU time': plan['Duration'].sum(),
+        'Workers': n_workers,
+        'Wall-clock time': plan['Duration'].sum() / n_workers,
+        'Peak memory': datasets_memory + n_workers * plan['Peak memory'].max(),
+    }
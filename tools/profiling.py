@@ -0,0 +1,171 @@
+"""
+Profile the stages of the experimental procedure.
+"""
+
+# Author: Georgios Douzas <gdouzas@icloud.com>
+# License: MIT
+
+from contextlib import contextmanager, nullcontext
+from functools import wraps
+from json import dump
+from os import getpid
+from os.path import join
+from threading import get_ident
+from time import perf_counter_ns
+import tracemalloc
+
+import pandas as pd
+
+AGGREGATION_KEYS = ['Oversampler', 'Category', 'Stage']
+
+
+class NullProfiler:
+    """Profiler that records nothing, used when profiling is disabled."""
+
+    enabled = False
+    events_ = ()
+
+    def __init__(self):
+        self._context = nullcontext()
+
+    def stage(self, name, category, **args):
+        return self._context
+
+    def start(self):
+        return self
+
+    def stop(self):
+        return self
+
+
+class Profiler:
+    """Profiler that records the wall time and memory of nested stages.
+
+    Every stage is recorded as an event with its start time and duration
+    in microseconds, its peak memory in bytes that is allocated above the
+    memory at the start of the stage, as traced by tracemalloc, and the
+    identifier of its parent stage.
+    """
+
+    enabled = True
+
+    def __init__(self, memory=True):
+        self.memory = memory
+
+    def start(self):
+        """Start recording events."""
+        self.events_ = []
+        self._stack = []
+        self._started_tracing = self.memory and not tracemalloc.is_tracing()
+        if self._started_tracing:
+            tracemalloc.start()
+        return self
+
+    def stop(self):
+        """Stop recording events."""
+        if self._started_tracing:
+            tracemalloc.stop()
+        return self
+
+    @contextmanager
+    def stage(self, name, category, **args):
+        """Record the wall time and memory of a stage."""
+        tracing = self.memory and tracemalloc.is_tracing()
+        if tracing:
+            current, peak = tracemalloc.get_traced_memory()
+            if self._stack:
+                self._stack[-1][1] = max(self._stack[-1][1], peak)
+            tracemalloc.reset_peak()
+        else:
+            current = 0
+        event_id = len(self.events_)
+        parent_id = self._stack[-1][2] if self._stack else None
+        self._stack.append([current, current, event_id])
+        self.events_.append(None)
+        start = perf_counter_ns()
+        try:
+            yield
+        finally:
+            duration = perf_counter_ns() - start
+            start_memory, peak, _ = self._stack.pop()
+            if tracing:
+                peak = max(peak, tracemalloc.get_traced_memory()[1])
+                if self._stack:
+                    self._stack[-1][1] = max(self._stack[-1][1], peak)
+            self.events_[event_id] = {
+                'name': name, 'cat': category, 'ts': start / 1e3, 'dur': duration / 1e3, 'pid': getpid(), 'tid': get_ident(),
+                'id': event_id, 'parent': parent_id, 'memory': peak - start_memory, 'args': args
+            }
+
+    def wrap(self, method, name, category):
+        """Wrap a method to record it as a stage."""
+        @wraps(method)
+        def wrapped_method(*args, **kwargs):
+            with self.stage(name, category):
+                return method(*args, **kwargs)
+        return wrapped_method
+
+
+NULL_PROFILER = NullProfiler()
+_profiler = NULL_PROFILER
+
+
+def get_profiler():
+    """Get the profiler of the current process."""
+    return _profiler
+
+
+def set_profiler(profiler):
+    """Set the profiler of the current process."""
+    global _profiler
+    _profiler = NULL_PROFILER if profiler is None else profiler
+
+
+def instrument_steps(estimator, profiler):
+    """Record the resampling and transformation of each step of a pipeline as a stage."""
+    for _, step in getattr(estimator, 'steps', []):
+        for method_name in ('fit_resample', 'fit_transform'):
+            if hasattr(step, method_name):
+                setattr(step, method_name, profiler.wrap(getattr(step, method_name), step.__class__.__name__, 'step'))
+    return estimator
+
+
+def aggregate_profile(events, keys=AGGREGATION_KEYS):
+    """Aggregate the events of the stages.
+
+    The self time of a stage excludes the time of its nested stages, e.g.
+    the generation of samples by an oversampler excludes its clustering
+    and neighbors search.
+    """
+    events = pd.DataFrame(events)
+    if events.empty:
+        return pd.DataFrame(columns=keys + ['Count', 'Total time', 'Self time', 'Mean time', 'Peak memory'])
+    events['Oversampler'] = [args.get('oversampler') for args in events['args']]
+    events['Category'], events['Stage'] = events['cat'], events['name']
+    children_time = events.groupby(['pid', 'task', 'parent'])['dur'].sum()
+    events['self'] = events['dur'] - [
+        children_time.get((pid, task, event_id), 0.0) for pid, task, event_id in zip(events['pid'], events['task'], events['id'])
+    ]
+    profile = events.groupby(keys, sort=False, dropna=False).agg(
+        **{'Count': ('dur', 'size'), 'Total time': ('dur', 'sum'), 'Self time': ('self', 'sum'), 'Mean time': ('dur', 'mean'), 'Peak memory': ('memory', 'max')}
+    )
+    for column in ('Total time', 'Self time', 'Mean time'):
+        profile[column] /= 1e6
+    return profile.sort_values('Self time', ascending=False).reset_index()
+
+
+def export_profile(events, path, name):
+    """Export the aggregated stages as a CSV file and the events as a Chrome trace.
+
+    The trace can be opened with chrome://tracing or Perfetto.
+    """
+    aggregate_profile(events).to_csv(join(path, f'{name}.profile.csv'), index=False)
+    trace_events = [
+        {
+            'name': event['name'], 'cat': event['cat'], 'ph': 'X', 'ts': event['ts'], 'dur': event['dur'], 'pid': event['pid'], 'tid': event['tid'],
+            'args': {**event['args'], 'memory': event['memory']}
+        }
+        for event in events
+    ]
+    with open(join(path, f'{name}.trace.json'), 'w') as file:
+        dump({'traceEvents': trace_events, 'displayTimeUnit': 'ms'}, file)
@@ -0,0 +1,85 @@
+"""
+Calculate the results and statistical tests of the experimental procedure.
+"""
+
+# Author: Georgios Douzas <gdouzas@icloud.com>
+# License: MIT
+
+import numpy as np
+import pandas as pd
+from scipy.stats import friedmanchisquare, ttest_rel
+
+
+def holm_correction(pvalues):
+    """Apply the Holm step-down correction to a sequence of p-values."""
+    pvalues = np.asarray(pvalues, dtype=float)
+    n_pvalues = pvalues.size
+    order = np.argsort(pvalues)
+    adjusted = np.minimum(1.0, np.maximum.accumulate((n_pvalues - np.arange(n_pvalues)) * pvalues[order]))
+    corrected = np.empty(n_pvalues)
+    corrected[order] = adjusted
+    return corrected
+
+
+def pivot_optimal_results(optimal_results, oversamplers_names):
+    """Pivot the optimal scores to a table with a column per oversampler."""
+    optimal_results = optimal_results.pivot_table(index=['Dataset', 'Classifier', 'Metric'], columns='Oversampler', values='Score', sort=False)
+    return optimal_results.reindex(columns=[name for name in oversamplers_names if name in optimal_results.columns])
+
+
+def aggregate(results):
+    """Calculate the mean and standard error of results across datasets."""
+    grouped_results = results.groupby(level=['Classifier', 'Metric'], sort=False)
+    return grouped_results.mean().reset_index(), grouped_results.sem().reset_index()
+
+
+def calculate_results(optimal_results, compared_oversamplers=None, alpha=0.05, control_oversampler=None):
+    """Calculate the mean and standard error of the scores, percentage
+    difference and ranking across datasets as well as the Friedman and
+    Holm's tests, given the optimal scores of each oversampler.
+
+    The Holm's test adjusts the p-values of the paired t-tests of the control
+    oversampler's scores against the scores of every other oversampler.
+    """
+    oversamplers_names = list(optimal_results.columns)
+    results = {}
+
+    # Optimal scores
+    results['mean_scores_'], results['sem_scores_'] = aggregate(optimal_results)
+
+    # Percentage difference of scores
+    if compared_oversamplers is None and len(oversamplers_names) > 1:
+        compared_oversamplers = oversamplers_names[-2:]
+    if compared_oversamplers is not None:
+        first, second = (optimal_results[name] for name in compared_oversamplers)
+        perc_diff_scores = (100 * (second - first) / first).rename('Difference').to_frame()
+        results['mean_perc_diff_scores_'], results['sem_perc_diff_scores_'] = aggregate(perc_diff_scores)
+
+    # Ranking
+    ranking = optimal_results.rank(axis=1, ascending=False)
+    results['mean_ranking_'], results['sem_ranking_'] = aggregate(ranking)
+
+    # Friedman test
+    if len(oversamplers_names) > 2:
+        friedman_test = [
+            (classifier, metric, friedmanchisquare(*scores.values.T).pvalue)
+            for (classifier, metric), scores in optimal_results.groupby(level=['Classifier', 'Metric'], sort=False)
+        ]
+        friedman_test = pd.DataFrame(friedman_test, columns=['Classifier', 'Metric', 'p-value'])
+        friedman_test['Significance'] = friedman_test['p-value'] < alpha
+        results['friedman_test_'] = friedman_test
+
+    # Holm's test
+    if len(oversamplers_names) > 1:
+        if control_oversampler is None:
+            control_oversampler = oversamplers_names[-1]
+        holms_test = []
+        for (classifier, metric), scores in optimal_results.groupby(level=['Classifier', 'Metric'], sort=False):
+            pvalues = [
+                ttest_rel(scores[control_oversampler], scores[name]).pvalue
+                for name in oversamplers_names if name != control_oversampler
+            ]
+            holms_test.append((classifier, metric, *holm_correction(pvalues)))
+        results['holms_test_'] = pd.DataFrame(holms_test, columns=['Classifier', 'Metric'] + [name for name in oversamplers_names if name != control_oversampler])
+
+    return results
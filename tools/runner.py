@@ -0,0 +1,704 @@
+"""
+Run the experimental procedure and calculate its results.
+"""
+
+# Author: Georgios Douzas <gdouzas@icloud.com>
+# License: MIT
+
+from os import makedirs, getpid
+from os.path import join, exists
+from socket import gethostname
+from threading import Event, Thread
+from time import sleep
+from itertools import count
+from contextlib import contextmanager
+from pickle import dump
+from math import ceil
+from numbers import Integral
+from shutil import rmtree
+from tempfile import mkdtemp
+from json import dumps
+from zlib import crc32
+
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed, effective_n_jobs
+from sklearn.base import clone
+from sklearn.metrics import get_scorer, make_scorer
+from sklearn.model_selection import StratifiedKFold, ParameterGrid
+from sklearn.utils import check_random_state
+from imblearn.metrics import geometric_mean_score
+
+from .results import pivot_optimal_results, calculate_results
+from .store import ScoresStore, TaskQueue
+from .cache import fingerprint, CachedNearestNeighbors
+from .data import IndexedArray
+from .staging import get_staged_param, group_staged_classifiers, truncate_classifier
+from .config import SEARCH_STRATEGIES
+from .profiling import Profiler, NULL_PROFILER, set_profiler, instrument_steps, aggregate_profile, export_profile
+
+SCORERS = {'geometric_mean_score': make_scorer(geometric_mean_score)}
+KEYS = ['Dataset', 'Oversampler', 'Oversampler params', 'Classifier', 'Classifier params']
+COLUMNS = ['Dataset', 'Oversampler', 'ov_ind', 'Classifier', 'clf_ind', 'Run', 'Fold']
+
+
+def check_scorer(scoring):
+    """Get the scorer that corresponds to a scoring name."""
+    return SCORERS[scoring] if scoring in SCORERS else get_scorer(scoring)
+
+
+def set_random_state(estimator, random_state):
+    """Set the random state of an estimator and its nested estimators."""
+    params = {param: random_state for param in estimator.get_params() if param.split('__')[-1] == 'random_state'}
+    return estimator.set_params(**params)
+
+
+def check_array(array, dtype=None):
+    """Convert to array of a data type, keeping memory-mapped and indexed arrays of the same data type as they are."""
+    if isinstance(array, (np.memmap, IndexedArray)) and (dtype is None or array.dtype == dtype):
+        return array
+    return np.asarray(array, dtype=dtype)
+
+
+def broadcast_datasets(datasets, folder):
+    """Place the arrays of each dataset in a memory-mapped file.
+
+    Parallel workers receive references to the memory-mapped files
+    instead of copies of the datasets. Arrays that are already memory-mapped,
+    e.g. loaded from the datasets store, and indexed arrays of them are not
+    copied.
+    """
+    broadcasted_datasets = []
+    for position, (name, arrays) in enumerate(datasets):
+        broadcasted_arrays = []
+        for suffix, array in zip(('X', 'y'), arrays):
+            if not isinstance(array, (np.memmap, IndexedArray)) and array.dtype != object:
+                path = join(folder, f'{position}.{suffix}.npy')
+                np.save(path, array)
+                array = np.load(path, mmap_mode='r')
+            broadcasted_arrays.append(array)
+        broadcasted_datasets.append((name, tuple(broadcasted_arrays)))
+    return broadcasted_datasets
+
+
+def generate_random_states(random_state, n_runs):
+    """Generate the random state of each run."""
+    return check_random_state(random_state).randint(np.iinfo(np.int32).max, size=n_runs)
+
+
+def generate_folds(y, n_splits, random_states):
+    """Generate the fold plan of a dataset, i.e. the test fold of every sample for each run."""
+    fold_ids = np.empty((len(random_states), len(y)), dtype=np.int8 if n_splits <= np.iinfo(np.int8).max else np.int16)
+    for run, random_state in enumerate(random_states):
+        for fold, (_, test_indices) in enumerate(StratifiedKFold(n_splits=n_splits, shuffle=True, random_state=random_state).split(np.zeros(len(y)), y)):
+            fold_ids[run, test_indices] = fold
+    return fold_ids
+
+
+def canonicalize_params(params, default_params):
+    """Remove the parameters of an oversampler's configuration that do not affect its resampling.
+
+    The number of minority neighbors of a geometric oversampler does not
+    affect the resampling when its selection strategy is ``'majority'``, since
+    only the nearest majority neighbor of each sample is selected. This does
+    not hold for clustered oversamplers, which switch to the ``'minority'``
+    strategy in clusters without majority samples, therefore their
+    configurations are left to the comparison of the resampled data.
+    """
+    all_params = {**default_params, **params}
+    canonical_params = {}
+    for param, value in params.items():
+        prefix = param[:-len('k_neighbors')]
+        if param.endswith('k_neighbors') and all_params.get(f'{prefix}selection_strategy') == 'majority' and all_params.get(f'{prefix}clusterer') is None:
+            continue
+        canonical_params[param] = value
+    return canonical_params
+
+
+def select_shard(key, n_shards):
+    """Select the shard of a task from a stable hash of its key."""
+    return crc32(dumps(key).encode()) % n_shards
+
+
+def build_estimator(estimator, params):
+    """Clone an estimator and set its parameters.
+
+    Parameters that are estimators, e.g. the nearest neighbors of an
+    oversampler, are cloned too, since the same instance is shared by the
+    configurations of a parameter grid and setting the random state of the
+    estimator would modify it. The integer values of parameters whose default
+    value is a cached nearest neighbors estimator are replaced by a copy of the
+    estimator with one more neighbor, since the oversamplers search the
+    neighbors of a sample including itself. Therefore the configurations
+    share the estimator's neighbors graph while the parameter grid keeps the
+    numbers of neighbors.
+    """
+    if estimator is None:
+        return None
+    default_params = estimator.get_params()
+    estimator_params = {}
+    for param, value in params.items():
+        if isinstance(value, Integral) and isinstance(default_params.get(param), CachedNearestNeighbors):
+            value = clone(default_params[param]).set_params(n_neighbors=value + 1)
+        elif hasattr(value, 'get_params') and not isinstance(value, type):
+            value = clone(value)
+        estimator_params[param] = value
+    return clone(estimator).set_params(**estimator_params)
+
+
+def get_scorer_name(scorer):
+    """Get the name of a scorer's metric."""
+    return getattr(getattr(scorer, '_score_func', None), '__name__', scorer.__class__.__name__)
+
+
+def score(classifier, X_test, y_test, scorers, profiler):
+    """Score a fitted classifier on the test fold."""
+    scores = []
+    for scorer in scorers:
+        with profiler.stage(get_scorer_name(scorer), 'score'):
+            scores.append(scorer(classifier, X_test, y_test))
+    return scores
+
+
+def fit_score(task_id, estimators, X, y, train_indices, test_indices, scorers, random_state, profile=False):
+    """Resample the training fold once per oversampler, fit every classifier on it and score them on the test fold.
+
+    Oversampler configurations that generate identical resampled data
+    share the scores of their classifiers, which are fitted once. Classifier
+    configurations that differ only in a staged parameter, e.g. the number
+    of estimators of gradient boosting, are evaluated on the stages of the
+    configuration with its largest value. When profile is true, the wall time and memory of every stage are recorded
+    and returned along with the scores.
+    """
+    profiler = Profiler().start() if profile else NULL_PROFILER
+    set_profiler(profiler)
+    try:
+        with profiler.stage('task', 'task'):
+            X_train, y_train = X[train_indices], y[train_indices]
+            X_test, y_test = X[test_indices], y[test_indices]
+            scores, resampled_scores = [], {}
+            for oversampler, classifiers in estimators:
+                X_resampled, y_resampled = X_train, y_train
+                if oversampler is not None:
+                    set_random_state(oversampler, random_state)
+                    if profiler.enabled:
+                        instrument_steps(oversampler, profiler)
+                    with profiler.stage(oversampler.__class__.__name__, 'resample'):
+                        X_resampled, y_resampled = oversampler.fit_resample(X_train, y_train)
+                cached_scores = resampled_scores.setdefault((fingerprint(X_resampled), fingerprint(y_resampled)), {})
+                oversampler_scores = [None] * len(classifiers)
+                for positions in group_staged_classifiers(classifiers):
+                    group = [set_random_state(classifiers[position], random_state) for position in positions]
+                    keys = [f'{classifier.__class__.__name__}{classifier.get_params()}' for classifier in group]
+                    if any(key not in cached_scores for key in keys):
+
+                        # Fit the classifier with the largest value of the staged parameter and truncate it
+                        classifier = group[0]
+                        with profiler.stage(classifier.__class__.__name__, 'fit'):
+                            classifier.fit(X_resampled, y_resampled)
+                        staged_classifiers = [classifier]
+                        if len(group) > 1:
+                            param = get_staged_param(classifier)
+                            with profiler.stage(classifier.__class__.__name__, 'stage'):
+                                staged_classifiers += truncate_classifier(
+                                    classifier, param, [clf.get_params()[param] for clf in group[1:]], X_test, y_resampled
+                                )
+
+                        for key, staged_classifier in zip(keys, staged_classifiers):
+                            if key not in cached_scores:
+                                cached_scores[key] = score(staged_classifier, X_test, y_test, scorers, profiler)
+                    for position, key in zip(positions, keys):
+                        oversampler_scores[position] = cached_scores[key]
+                scores.append(oversampler_scores)
+    finally:
+        profiler.stop()
+        set_profiler(None)
+    return task_id, scores, list(profiler.events_)
+
+
+class Experiment:
+    """Define and run an experiment of oversamplers and classifiers.
+
+    Every oversampler and classifier configuration of the parameter grids
+    is evaluated with repeated stratified k-fold cross validation. Each
+    oversampler configuration resamples a training fold only once and the
+    resampled data are used to fit all the classifier configurations.
+    Equivalent oversampler configurations, i.e. ones that differ only in
+    parameters that do not affect the resampling, are evaluated once and
+    their scores are reported for every configuration. When the
+    search strategy is ``'halving'``, successive halving is applied on each
+    combination of dataset, oversampler and classifier: all candidates are
+    evaluated on ``min_resource`` folds and only the best ``1 / reduction_factor``
+    of them, by their mean ranking across the metrics, are evaluated on
+    ``reduction_factor`` times more folds, until the survivors are evaluated
+    on all ``n_splits * n_runs`` folds. The fold plans
+    of the datasets, as generated by ``generate_folds``, are optionally given
+    as a mapping of datasets' names to arrays, e.g. read from the datasets'
+    store, otherwise they are generated from ``random_state``. When ``dtype``
+    is given, the input data are converted to it, e.g. ``'float32'`` halves
+    the memory of the datasets and of the resampled training folds.
+    """
+
+    def __init__(self,
+                 name,
+                 datasets,
+                 oversamplers,
+                 classifiers,
+                 scoring=None,
+                 n_splits=5,
+                 n_runs=3,
+                 random_state=None,
+                 search='grid',
+                 min_resource=None,
+                 reduction_factor=3,
+                 folds=None,
+                 dtype=None):
+        self.name = name
+        self.datasets = datasets
+        self.oversamplers = oversamplers
+        self.classifiers = classifiers
+        self.scoring = scoring
+        self.n_splits = n_splits
+        self.n_runs = n_runs
+        self.random_state = random_state
+        self.search = search
+        self.min_resource = min_resource
+        self.reduction_factor = reduction_factor
+        self.folds = folds
+        self.dtype = dtype
+
+    def _initialize(self, n_jobs, verbose):
+        """Check parameters and generate the cross validation folds."""
+        if self.search not in SEARCH_STRATEGIES:
+            raise ValueError(f'Parameter `search` should be one of {SEARCH_STRATEGIES}. Got {self.search} instead.')
+        self.n_jobs_ = n_jobs
+        self.verbose_ = verbose
+        if self.scoring is None:
+            self.scoring_ = ['accuracy']
+        else:
+            self.scoring_ = [self.scoring] if isinstance(self.scoring, str) else list(self.scoring)
+        self.scorers_ = [check_scorer(scoring) for scoring in self.scoring_]
+        self.oversamplers_ = [(name, ov, list(ParameterGrid(param_grid))) for name, ov, param_grid in self.oversamplers]
+        self.classifiers_ = [(name, clf, list(ParameterGrid(param_grid))) for name, clf, param_grid in self.classifiers]
+        self.equivalents_, self.representatives_ = {}, {}
+        for name, ov, grid in self.oversamplers_:
+            default_params = ov.get_params() if ov is not None else {}
+            classes = {}
+            for ind, params in enumerate(grid):
+                # The values of the parameters are shared by the configurations of a grid
+                key = tuple((param, id(value)) for param, value in canonicalize_params(params, default_params).items())
+                classes.setdefault(key, []).append(ind)
+            self.equivalents_[name] = {inds[0]: inds for inds in classes.values()}
+            self.representatives_[name] = {ind: inds[0] for inds in classes.values() for ind in inds}
+        self.params_ = {
+            **{('ov', name, ind): str(params) for name, _, grid in self.oversamplers_ for ind, params in enumerate(grid)},
+            **{('clf', name, ind): str(params) for name, _, grid in self.classifiers_ for ind, params in enumerate(grid)}
+        }
+        self.random_states_ = generate_random_states(self.random_state, self.n_runs)
+        self.datasets_ = [(name, (check_array(X, self.dtype), check_array(y))) for name, (X, y) in self.datasets]
+        self.folds_ = {}
+        for name, (X, y) in self.datasets_:
+            if self.folds is not None and name in self.folds:
+                fold_ids = self.folds[name]
+                if fold_ids.shape != (self.n_runs, len(y)):
+                    raise ValueError(f'The fold plan of dataset {name} should have shape {(self.n_runs, len(y))}. Got {fold_ids.shape} instead.')
+            else:
+                fold_ids = generate_folds(y, self.n_splits, self.random_states_)
+            self.folds_[name] = [
+                (run, fold, np.flatnonzero(fold_ids[run] != fold), np.flatnonzero(fold_ids[run] == fold))
+                for run in range(self.n_runs) for fold in range(self.n_splits)
+            ]
+        self.max_resource_ = self.n_splits * self.n_runs
+        self.shard_ = None
+        if self.search == 'halving':
+            min_resource = self.n_splits if self.min_resource is None else self.min_resource
+            if not 1 <= min_resource <= self.max_resource_:
+                raise ValueError(f'Parameter `min_resource` should be between 1 and {self.max_resource_}. Got {min_resource} instead.')
+            if self.reduction_factor < 2:
+                raise ValueError(f'Parameter `reduction_factor` should be at least 2. Got {self.reduction_factor} instead.')
+            self.min_resource_ = min_resource
+        else:
+            self.min_resource_ = self.max_resource_
+
+    def _to_records(self, rows):
+        """Replace the indices of the parameters with their description."""
+        return [
+            (dataset_name, ov_name, self.params_[('ov', ov_name, ov_ind)], clf_name, self.params_[('clf', clf_name, clf_ind)], run, fold, *scores)
+            for dataset_name, ov_name, ov_ind, clf_name, clf_ind, run, fold, *scores in rows
+        ]
+
+    def _load_completed(self, store):
+        """Load the scores of the tasks that were completed in a previous run."""
+        indices = {(kind, name, params): ind for (kind, name, ind), params in self.params_.items()}
+        completed = {}
+        for dataset_name, ov_name, ov_params, clf_name, clf_params, run, fold, *scores in store.read(self.scoring_).itertuples(index=False, name=None):
+            ov_ind, clf_ind = indices.get(('ov', ov_name, ov_params)), indices.get(('clf', clf_name, clf_params))
+            if dataset_name in self.folds_ and ov_ind is not None and clf_ind is not None:
+                completed[(dataset_name, ov_name, ov_ind, clf_name, clf_ind, int(run), int(fold))] = scores
+        return completed
+
+    def _generate_candidates(self):
+        """Generate the candidates of all datasets, oversamplers and classifiers."""
+        return [
+            (dataset_name, ov_name, clf_name, ov_ind, clf_ind)
+            for dataset_name, _ in self.datasets_
+            for ov_name, _, ov_grid in self.oversamplers_
+            for clf_name, _, clf_grid in self.classifiers_
+            for ov_ind in range(len(ov_grid))
+            for clf_ind in range(len(clf_grid))
+        ]
+
+    def _generate_tasks(self, candidates, start, end, completed):
+        """Generate the tasks that evaluate the candidates on the folds between start and end.
+
+        Each training fold is resampled once per class of equivalent oversampler
+        configurations and the configurations of an oversampler are kept in the
+        same task in order to share cached intermediate results. Candidates that
+        are completed and tasks of other shards are excluded.
+        """
+
+        # Group the classifiers of each class of equivalent oversampler configurations
+        grouped_candidates = {}
+        for dataset_name, ov_name, clf_name, ov_ind, clf_ind in candidates:
+            ov_candidates = grouped_candidates.setdefault((dataset_name, ov_name), {})
+            ov_candidates.setdefault(self.representatives_[ov_name][ov_ind], {})[(clf_name, clf_ind)] = None
+
+        tasks = []
+        for (dataset_name, ov_name), ov_candidates in grouped_candidates.items():
+            for run, fold, *_ in self.folds_[dataset_name][start:end]:
+                if self.shard_ is not None:
+                    shard, n_shards = self.shard_
+                    key = [dataset_name, ov_name] if self.search == 'halving' else [dataset_name, ov_name, run, fold]
+                    if select_shard(key, n_shards) != shard:
+                        continue
+                remaining_candidates = [
+                    (ov_ind, remaining_clfs) for ov_ind, remaining_clfs in (
+                        (ov_ind, [
+                            (clf_name, clf_ind) for clf_name, clf_ind in clfs
+                            if any((dataset_name, ov_name, ind, clf_name, clf_ind, run, fold) not in completed for ind in self.equivalents_[ov_name][ov_ind])
+                        ])
+                        for ov_ind, clfs in ov_candidates.items()
+                    )
+                    if remaining_clfs
+                ]
+                if remaining_candidates:
+                    tasks.append((dataset_name, ov_name, remaining_candidates, run, fold))
+        return tasks
+
+    def _execute(self, tasks, profile=False):
+        """Execute tasks in parallel, yielding their position, scores and profiled events as they are completed."""
+        oversamplers = {name: (ov, grid) for name, ov, grid in self.oversamplers_}
+        classifiers = {name: (clf, grid) for name, clf, grid in self.classifiers_}
+        datasets = dict(self.datasets_)
+        return Parallel(n_jobs=self.n_jobs_, verbose=self.verbose_, return_as='generator_unordered')(
+            delayed(fit_score)(
+                task_id,
+                [
+                    (
+                        build_estimator(oversamplers[ov_name][0], oversamplers[ov_name][1][ov_ind]),
+                        [build_estimator(classifiers[clf_name][0], classifiers[clf_name][1][clf_ind]) for clf_name, clf_ind in clfs]
+                    )
+                    for ov_ind, clfs in ov_candidates
+                ],
+                *datasets[dataset_name], *self.folds_[dataset_name][run * self.n_splits + fold][2:], self.scorers_, self.random_states_[run], profile
+            )
+            for task_id, (dataset_name, ov_name, ov_candidates, run, fold) in enumerate(tasks)
+        )
+
+    def _to_rows(self, task, task_scores):
+        """Convert the scores of a task to rows of every equivalent oversampler configuration."""
+        dataset_name, ov_name, ov_candidates, run, fold = task
+        return [
+            (dataset_name, ov_name, ind, clf_name, clf_ind, run, fold, *clf_scores)
+            for (ov_ind, clfs), ov_scores in zip(ov_candidates, task_scores)
+            for ind in self.equivalents_[ov_name][ov_ind]
+            for (clf_name, clf_ind), clf_scores in zip(clfs, ov_scores)
+        ]
+
+    def _evaluate(self, candidates, start, end, completed, store):
+        """Evaluate the candidates on the folds between start and end."""
+        profile = self.profile_events_ is not None
+        tasks = self._generate_tasks(candidates, start, end, completed)
+
+        # Checkpoint the scores of each task as soon as it is completed
+        for task_id, task_scores, events in self._execute(tasks, profile):
+            dataset_name, ov_name, _, run, fold = tasks[task_id]
+            if profile:
+                task = next(self._tasks_counter)
+                for event in events:
+                    event['task'] = task
+                    event['args'].update(dataset=dataset_name, oversampler=ov_name, run=run, fold=fold)
+                self.profile_events_ += events
+            rows = self._to_rows(tasks[task_id], task_scores)
+            if store is not None:
+                store.append(self._to_records(rows), self.scoring_)
+            completed.update((tuple(row[:len(COLUMNS)]), row[len(COLUMNS):]) for row in rows)
+
+    def _select(self, scores, candidates, end):
+        """Select the best candidates of each dataset, oversampler and classifier.
+
+        The candidates are ranked by their mean ranking across the metrics.
+        """
+        scores = scores[scores['Run'] * self.n_splits + scores['Fold'] < end]
+        candidates = pd.DataFrame(candidates, columns=['Dataset', 'Oversampler', 'Classifier', 'ov_ind', 'clf_ind'])
+        scores = scores.merge(candidates).groupby(['Dataset', 'Oversampler', 'Classifier', 'ov_ind', 'clf_ind'], sort=False)[self.scoring_].mean()
+        selected = set()
+        for _, group_scores in scores.groupby(level=['Dataset', 'Oversampler', 'Classifier'], sort=False):
+            n_candidates = ceil(len(group_scores) / self.reduction_factor)
+            mean_ranking = group_scores.rank(ascending=False).mean(axis=1)
+            selected.update(mean_ranking.nsmallest(n_candidates, keep='first').index)
+        return [candidate for candidate in candidates.itertuples(index=False, name=None) if candidate in selected]
+
+    def _select_completed(self, candidates, completed, end):
+        """Select the best candidates given the completed scores."""
+        scores = pd.DataFrame([(*key, *scores) for key, scores in completed.items()], columns=COLUMNS + self.scoring_)
+        return self._select(scores, candidates, end)
+
+    def _generate_metadata(self):
+        """Generate the metadata of the scores store.
+
+        The random states of the runs are stored instead of ``random_state``,
+        since they determine the folds and the random states of the tasks.
+        """
+        return dict(
+            datasets=[name for name, _ in self.datasets_],
+            oversamplers=[name for name, *_ in self.oversamplers_],
+            classifiers=[name for name, *_ in self.classifiers_],
+            metrics=self.scoring_,
+            n_folds=self.max_resource_,
+            n_splits=self.n_splits,
+            random_states=self.random_states_.tolist(),
+            search=self.search,
+            min_resource=self.min_resource_,
+            reduction_factor=self.reduction_factor,
+            dtype=None if self.dtype is None else np.dtype(self.dtype).name
+        )
+
+    def _set_scores(self, completed):
+        """Store scores in the order of the configuration."""
+        datasets_order, ovs_order, clfs_order = ({name: position for position, (name, *_) in enumerate(items)} for items in (self.datasets_, self.oversamplers_, self.classifiers_))
+        rows = sorted(
+            ((*key, *scores) for key, scores in completed.items()),
+            key=lambda row: (datasets_order[row[0]], ovs_order[row[1]], row[2], clfs_order[row[3]], *row[4:len(COLUMNS)])
+        )
+        self.scores_ = pd.DataFrame(self._to_records(rows), columns=KEYS + ['Run', 'Fold'] + self.scoring_)
+
+    @contextmanager
+    def _broadcast(self):
+        """Share the datasets with the parallel workers while the tasks are executed."""
+        datasets, folder = self.datasets_, mkdtemp(prefix='experiment-')
+        try:
+            self.datasets_ = broadcast_datasets(datasets, folder)
+            yield
+        finally:
+            self.datasets_ = datasets
+            rmtree(folder, ignore_errors=True)
+
+    def run(self, n_jobs=-1, verbose=0, checkpoint=None, resume=False, profile=None, shard=None):
+        """Run the experiment.
+
+        When a checkpoint path is given, the scores of every completed task
+        are streamed to a scores store. If resume is true, the tasks found in
+        the store are not evaluated again. When a profile path is given, the
+        wall time and memory of every stage of the tasks are recorded and
+        exported to it as a CSV file of aggregated stages and a Chrome trace.
+
+        When a shard ``(index, n_shards)`` is given, only the tasks that are
+        assigned to it are evaluated. Tasks are assigned by a stable hash of
+        their dataset, oversampler, run and fold, or only of their dataset and
+        oversampler for the halving search, since the selection of candidates
+        requires all of their scores. The scores do not depend on the sharding,
+        since the folds and random states are derived from ``random_state``,
+        and the checkpoints of all shards are combined with the ``merge`` method.
+        """
+
+        # Initialize experiment
+        self._initialize(n_jobs, verbose)
+        if shard is not None:
+            index, n_shards = shard
+            if not 0 <= index < n_shards:
+                raise ValueError(f'Parameter `shard` should be a pair of index and number of shards with 0 <= index < n_shards. Got {shard} instead.')
+            self.shard_ = (index, n_shards)
+        self.profile_events_ = [] if profile is not None else None
+        self._tasks_counter = count()
+
+        # Initialize checkpoint
+        store, completed = None, {}
+        if checkpoint is not None:
+            store = ScoresStore(checkpoint).initialize(reset=not resume)
+            store.write_metadata(**self._generate_metadata(), shard=self.shard_, finished=False)
+            if resume:
+                completed = self._load_completed(store)
+
+        # Generate all candidates
+        candidates = self._generate_candidates()
+
+        # Evaluate candidates with increasing resources on
+        # datasets that are shared with the parallel workers
+        with self._broadcast():
+            start, end = 0, self.min_resource_
+            while True:
+                self._evaluate(candidates, start, end, completed, store)
+                if end == self.max_resource_:
+                    break
+                candidates = self._select_completed(candidates, completed, end)
+                start, end = end, min(end * self.reduction_factor, self.max_resource_)
+
+        self._set_scores(completed)
+        if store is not None:
+            store.write_metadata(finished=True)
+
+        # Export profile
+        if profile is not None:
+            makedirs(profile, exist_ok=True)
+            export_profile(self.profile_events_, profile, self.name)
+            self.profile_ = aggregate_profile(self.profile_events_)
+        del self.profile_events_, self._tasks_counter
+
+        return self
+
+    def merge(self, paths, checkpoint):
+        """Merge the checkpoints of all shards of the experiment into a single checkpoint.
+
+        The scores of the experiment are the same as the ones of an experiment
+        that is not sharded.
+        """
+        self._initialize(1, 0)
+        shards = {}
+        for path in paths:
+            metadata = ScoresStore(path).read_metadata()
+            if metadata.get('shard') is None:
+                raise ValueError(f'The checkpoint {path} is not a shard of the experiment.')
+            if not metadata.get('finished'):
+                raise ValueError(f'The shard of checkpoint {path} is not finished.')
+            index, n_shards = metadata['shard']
+            shards[index] = (n_shards, path)
+        n_shards = {n_shards for n_shards, _ in shards.values()}
+        if len(n_shards) != 1 or set(shards) != set(range(n_shards.pop())):
+            raise ValueError('The checkpoints of all shards of the experiment should be merged.')
+        store = ScoresStore(checkpoint).initialize(reset=True)
+        store.write_metadata(**self._generate_metadata(), shard=None, finished=True)
+        for _, path in sorted(shards.values()):
+            store.extend(path)
+        self._set_scores(self._load_completed(store))
+        return self
+
+    def _work(self, queue, worker):
+        """Claim tasks from a queue, execute them and complete them with their scores.
+
+        The leases of the claimed tasks are renewed while they are executed.
+        The number of claimed tasks is returned.
+        """
+        claimed_tasks = queue.claim(worker, effective_n_jobs(self.n_jobs_))
+        if not claimed_tasks:
+            return 0
+        tasks_ids = [task_id for task_id, _ in claimed_tasks]
+        tasks = [
+            (dataset_name, ov_name, [(ov_ind, [tuple(clf) for clf in clfs]) for ov_ind, clfs in ov_candidates], run, fold)
+            for _, (dataset_name, ov_name, ov_candidates, run, fold) in claimed_tasks
+        ]
+        stopped = Event()
+
+        def renew_leases():
+            while not stopped.wait(queue.lease_duration / 3):
+                queue.renew(tasks_ids, worker)
+
+        renewal = Thread(target=renew_leases, daemon=True)
+        renewal.start()
+        try:
+            for position, task_scores, _ in self._execute(tasks):
+                queue.complete(tasks_ids[position], self._to_records(self._to_rows(tasks[position], task_scores)), self.scoring_)
+        finally:
+            stopped.set()
+            renewal.join()
+        return len(claimed_tasks)
+
+    def distribute(self, path, n_jobs=-1, verbose=0, resume=False, lease_duration=600, poll_interval=5):
+        """Run the experiment through a work queue that is shared with workers.
+
+        The tasks of every iteration of the search are put in a queue in the
+        SQLite database of the given path. Workers that are started with the
+        ``work`` method on any node claim and execute the tasks, while this
+        process also executes tasks and waits until all of them are completed.
+        The candidates of the next iteration are then selected and the scores
+        are finally merged as in the ``run`` method.
+        """
+
+        # Initialize experiment and queue
+        self._initialize(n_jobs, verbose)
+        queue = TaskQueue(path, lease_duration).initialize(reset=not resume)
+        queue.write_metadata(**self._generate_metadata(), status='running')
+        worker = f'{gethostname()}:{getpid()}'
+        completed = self._load_completed(queue) if resume else {}
+        candidates = self._generate_candidates()
+
+        # Queue the tasks of each iteration and wait until they are completed
+        with self._broadcast():
+            start, end, iteration = 0, self.min_resource_, 0
+            while True:
+                queue.put([list(task) for task in self._generate_tasks(candidates, start, end, completed)], iteration)
+                while queue.count_pending():
+                    if not self._work(queue, worker):
+                        sleep(poll_interval)
+                completed = self._load_completed(queue)
+                if end == self.max_resource_:
+                    break
+                candidates = self._select_completed(candidates, completed, end)
+                start, end, iteration = end, min(end * self.reduction_factor, self.max_resource_), iteration + 1
+        queue.write_metadata(status='finished')
+
+        self._set_scores(completed)
+        return self
+
+    def work(self, path, n_jobs=-1, verbose=0, lease_duration=600, poll_interval=5):
+        """Execute tasks from the work queue of an experiment that is distributed.
+
+        The worker waits for the queue to be created, executes the claimed
+        tasks and stops when the experiment is finished. Its configuration
+        should be the same as the one of the distributed experiment.
+        """
+        self._initialize(n_jobs, verbose)
+        queue = TaskQueue(path, lease_duration)
+        worker = f'{gethostname()}:{getpid()}'
+
+        # Wait for the queue and check the configuration
+        while not exists(path) or queue.read_status() is None:
+            sleep(poll_interval)
+        metadata = queue.read_metadata()
+        for key, value in self._generate_metadata().items():
+            if metadata.get(key) != value:
+                raise ValueError(f'The {key} of the worker do not match the ones of the distributed experiment.')
+
+        # Execute tasks until the experiment is finished
+        with self._broadcast():
+            while True:
+                if not self._work(queue, worker):
+                    if queue.read_status() == 'finished':
+                        break
+                    sleep(poll_interval)
+        return self
+
+    def calculate_results(self, compared_oversamplers=None, alpha=0.05, control_oversampler=None):
+        """Calculate the results and statistical tests of the experiment."""
+
+        # Mean cross validation scores of candidates evaluated on all folds
+        grouped_scores = self.scores_.groupby(KEYS, sort=False)[self.scoring_]
+        results = grouped_scores.mean()[grouped_scores.size() == self.max_resource_]
+        self.results_ = results.reset_index()
+
+        # Optimal scores
+        optimal_results = results.groupby(level=['Dataset', 'Oversampler', 'Classifier'], sort=False).max()
+        optimal_results = optimal_results.rename_axis(columns='Metric').stack().rename('Score').reset_index()
+        self.optimal_results_ = pivot_optimal_results(optimal_results, [name for name, *_ in self.oversamplers_])
+
+        # Aggregated results and statistical tests
+        for name, result in calculate_results(self.optimal_results_, compared_oversamplers, alpha, control_oversampler).items():
+            setattr(self, name, result)
+
+        return self
+
+    def dump(self, path):
+        """Dump the experiment object."""
+        makedirs(path, exist_ok=True)
+        with open(join(path, f'{self.name}.pkl'), 'wb') as file:
+            dump(self, file)
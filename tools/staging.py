@@ -0,0 +1,139 @@
+"""
+Evaluate nested classifier configurations from a single fit.
+"""
+
+# Author: Georgios Douzas <gdouzas@icloud.com>
+# License: MIT
+
+from copy import copy
+
+import numpy as np
+from sklearn.base import BaseEstimator, ClassifierMixin
+from sklearn.ensemble import GradientBoostingClassifier
+from sklearn.neighbors import KNeighborsClassifier
+
+STAGED_PARAMS = ((GradientBoostingClassifier, 'n_estimators'), (KNeighborsClassifier, 'n_neighbors'))
+
+
+def get_staged_param(classifier):
+    """Get the parameter whose smaller values correspond to stages of a classifier fitted with its largest value.
+
+    The first stages of a gradient boosting classifier are the same as the
+    ones of a classifier with fewer estimators, unless early stopping is
+    used. A nearest neighbors classifier with fewer neighbors selects the
+    nearest of the neighbors of a classifier with more neighbors.
+    """
+    for classifier_class, param in STAGED_PARAMS:
+        if isinstance(classifier, classifier_class):
+            if isinstance(classifier, GradientBoostingClassifier) and classifier.n_iter_no_change is not None:
+                return None
+            if isinstance(classifier, KNeighborsClassifier) and classifier.weights not in ('uniform', 'distance'):
+                return None
+            return param
+    return None
+
+
+def group_staged_classifiers(classifiers):
+    """Group the positions of classifiers that differ only in their staged parameter.
+
+    The groups are sorted in decreasing order of the staged parameter,
+    therefore the first classifier of every group is the one to fit.
+    """
+    groups = {}
+    for position, classifier in enumerate(classifiers):
+        param = get_staged_param(classifier)
+        params = classifier.get_params()
+        value = params.pop(param) if param is not None else None
+        key = (classifier.__class__.__name__, param, str(params)) if param is not None else position
+        groups.setdefault(key, []).append((value, position))
+    return [[position for _, position in sorted(group, key=lambda item: -item[0] if item[0] is not None else 0)] for group in groups.values()]
+
+
+def truncate_boosting(classifier, n_estimators):
+    """Truncate a fitted gradient boosting classifier to its first stages."""
+    truncated = copy(classifier)
+    truncated.n_estimators = n_estimators
+    truncated.estimators_ = classifier.estimators_[:n_estimators]
+    for attribute in ('train_score_', 'oob_improvement_', 'oob_scores_'):
+        if hasattr(classifier, attribute):
+            setattr(truncated, attribute, getattr(classifier, attribute)[:n_estimators])
+    if hasattr(classifier, 'oob_scores_'):
+        truncated.oob_score_ = truncated.oob_scores_[-1]
+    if hasattr(classifier, 'n_estimators_'):
+        truncated.n_estimators_ = n_estimators
+    return truncated
+
+
+class TruncatedNeighborsClassifier(ClassifierMixin, BaseEstimator):
+    """Nearest neighbors classifier that selects the nearest of the precomputed neighbors of queries.
+
+    The neighbors of the queries are calculated once by a fitted classifier
+    with the largest number of neighbors. Queries whose nearest neighbors
+    are ambiguous, i.e. when the distance of the last selected neighbor is
+    equal to the one of the next neighbor, are searched again. Other queries
+    are predicted by a copy of the fitted classifier with fewer neighbors.
+    """
+
+    def __init__(self, classifier, n_neighbors, X, distances, indices, labels):
+        self.classifier = classifier
+        self.n_neighbors = n_neighbors
+        self.X = X
+        self.distances = distances
+        self.indices = indices
+        self.labels = labels
+
+    @property
+    def classes_(self):
+        return self.classifier.classes_
+
+    def _truncate(self):
+        """Get a copy of the fitted classifier with fewer neighbors."""
+        return copy(self.classifier).set_params(n_neighbors=self.n_neighbors)
+
+    def _calculate_votes(self):
+        """Calculate the weighted votes of each class for the queries."""
+        distances, indices = self.distances[:, :self.n_neighbors], self.indices[:, :self.n_neighbors]
+        if self.n_neighbors < self.indices.shape[1]:
+            ambiguous = np.flatnonzero(self.distances[:, self.n_neighbors - 1] == self.distances[:, self.n_neighbors])
+            if ambiguous.size:
+                distances, indices = distances.copy(), indices.copy()
+                distances[ambiguous], indices[ambiguous] = self._truncate().kneighbors(self.X[ambiguous])
+        if self.classifier.weights == 'uniform':
+            weights = np.ones_like(indices)
+        else:
+            with np.errstate(divide='ignore'):
+                weights = 1.0 / distances
+            inf_mask = np.isinf(weights)
+            inf_rows = np.any(inf_mask, axis=1)
+            weights[inf_rows] = inf_mask[inf_rows]
+        votes = np.zeros((len(indices), len(self.classes_)))
+        rows = np.arange(len(indices))
+        for position, labels in enumerate(self.labels[indices].T):
+            votes[rows, labels] += weights[:, position]
+        return votes
+
+    def predict_proba(self, X):
+        """Predict the class probabilities of the queries."""
+        if X is not self.X:
+            return self._truncate().predict_proba(X)
+        votes = self._calculate_votes()
+        return votes / votes.sum(axis=1)[:, np.newaxis]
+
+    def predict(self, X):
+        """Predict the class of the queries."""
+        if X is not self.X:
+            return self._truncate().predict(X)
+        return self.classes_[np.argmax(self._calculate_votes(), axis=1)]
+
+
+def truncate_classifier(classifier, param, values, X, y):
+    """Get the classifiers of smaller values of the staged parameter from a fitted classifier.
+
+    The returned classifiers predict the queries ``X`` the same as classifiers
+    that are fitted with the smaller values on the training data with labels ``y``.
+    """
+    if param == 'n_estimators':
+        return [truncate_boosting(classifier, value) for value in values]
+    distances, indices = classifier.kneighbors(X)
+    labels = np.searchsorted(classifier.classes_, y)
+    return [TruncatedNeighborsClassifier(classifier, value, X, distances, indices, labels) for value in values]
@@ -0,0 +1,222 @@
+"""
+Store the scores of the experimental procedure.
+"""
+
+# Author: Georgios Douzas <gdouzas@icloud.com>
+# License: MIT
+
+from contextlib import closing
+from json import dumps, loads
+from sqlite3 import connect
+from time import time
+from types import SimpleNamespace
+
+import pandas as pd
+
+from .results import pivot_optimal_results, calculate_results
+
+KEYS = ['Dataset', 'Oversampler', 'Oversampler params', 'Classifier', 'Classifier params', 'Run', 'Fold']
+
+
+class ScoresStore:
+    """Store the scores of an experiment's tasks in an SQLite database.
+
+    Every row corresponds to the score of a metric for a dataset, oversampler
+    configuration, classifier configuration, run and fold. The rows are
+    committed as soon as they are appended, therefore the store is a durable
+    checkpoint of the completed tasks. The results of the experiment can be
+    calculated lazily from the store, optionally for a subset of classifiers
+    and metrics, without loading the experiment object.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def _connect(self):
+        connection = connect(self.path, timeout=60)
+        connection.execute('PRAGMA journal_mode=WAL')
+        return closing(connection)
+
+    def initialize(self, reset=False):
+        """Create the scores table and optionally remove previous scores."""
+        with self._connect() as connection, connection:
+            if reset:
+                connection.execute('DROP TABLE IF EXISTS scores')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS scores ('
+                'dataset TEXT, oversampler TEXT, oversampler_params TEXT, classifier TEXT, classifier_params TEXT, '
+                'run INTEGER, fold INTEGER, metric TEXT, score REAL, '
+                'PRIMARY KEY (dataset, oversampler, oversampler_params, classifier, classifier_params, run, fold, metric))'
+            )
+            connection.execute('CREATE INDEX IF NOT EXISTS scores_classifier_metric ON scores (classifier, metric)')
+            connection.execute('CREATE TABLE IF NOT EXISTS metadata (key TEXT PRIMARY KEY, value TEXT)')
+        return self
+
+    def write_metadata(self, **metadata):
+        """Write metadata of the experiment, e.g. the names of datasets, oversamplers, classifiers and metrics."""
+        with self._connect() as connection, connection:
+            connection.executemany('INSERT OR REPLACE INTO metadata VALUES (?, ?)', [(key, dumps(value)) for key, value in metadata.items()])
+
+    def read_metadata(self):
+        """Read the metadata of the experiment."""
+        with self._connect() as connection:
+            return {key: loads(value) for key, value in connection.execute('SELECT key, value FROM metadata')}
+
+    def append(self, rows, metrics):
+        """Append the scores of completed tasks, each row contains the keys followed by a score per metric."""
+        records = [(*row[:len(KEYS)], metric, score) for row in rows for metric, score in zip(metrics, row[len(KEYS):])]
+        with self._connect() as connection, connection:
+            connection.executemany('INSERT OR REPLACE INTO scores VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', records)
+
+    def extend(self, path):
+        """Append the scores of another store, e.g. of a shard of the experiment."""
+        with self._connect() as connection:
+            connection.execute('ATTACH DATABASE ? AS other', (path,))
+            with connection:
+                connection.execute('INSERT OR REPLACE INTO scores SELECT * FROM other.scores')
+            connection.execute('DETACH DATABASE other')
+
+    def read(self, metrics):
+        """Read the scores of completed tasks, one column per metric."""
+        with self._connect() as connection:
+            scores = pd.read_sql('SELECT * FROM scores', connection)
+        scores.columns = KEYS + ['Metric', 'Score']
+        if scores.empty:
+            return pd.DataFrame(columns=KEYS + list(metrics))
+        scores = scores.set_index(KEYS + ['Metric'])['Score'].unstack('Metric').reset_index()
+        return scores.reindex(columns=KEYS + list(metrics))
+
+    def read_optimal_results(self, classifiers=None, metrics=None):
+        """Read the optimal scores of each dataset, oversampler, classifier and metric.
+
+        The mean cross validation score of every configuration that was evaluated
+        on all folds is calculated and the maximum across configurations is selected.
+        """
+        metadata = self.read_metadata()
+        classifiers = metadata['classifiers'] if classifiers is None else list(classifiers)
+        metrics = metadata['metrics'] if metrics is None else list(metrics)
+        query = (
+            'SELECT dataset, oversampler, classifier, metric, MAX(score) FROM ('
+            'SELECT dataset, oversampler, classifier, metric, AVG(score) AS score FROM scores '
+            f'WHERE classifier IN ({", ".join("?" * len(classifiers))}) AND metric IN ({", ".join("?" * len(metrics))}) '
+            'GROUP BY dataset, oversampler, oversampler_params, classifier, classifier_params, metric '
+            'HAVING COUNT(*) = ?) '
+            'GROUP BY dataset, oversampler, classifier, metric'
+        )
+        with self._connect() as connection:
+            optimal_results = pd.read_sql(query, connection, params=[*classifiers, *metrics, metadata['n_folds']])
+        optimal_results.columns = ['Dataset', 'Oversampler', 'Classifier', 'Metric', 'Score']
+
+        # Order the optimal scores as the configuration
+        for column, names in (('Dataset', metadata['datasets']), ('Classifier', classifiers), ('Metric', metrics)):
+            optimal_results[column] = pd.Categorical(optimal_results[column], categories=names, ordered=True)
+        optimal_results = optimal_results.sort_values(['Classifier', 'Metric', 'Dataset'])
+        for column in ('Dataset', 'Classifier', 'Metric'):
+            optimal_results[column] = optimal_results[column].astype(str)
+
+        return pivot_optimal_results(optimal_results, metadata['oversamplers'])
+
+    def calculate_results(self, compared_oversamplers=None, alpha=0.05, control_oversampler=None, classifiers=None, metrics=None):
+        """Calculate the results and statistical tests of the experiment for a subset of classifiers and metrics.
+
+        The returned object has the same result attributes as an experiment.
+        """
+        optimal_results = self.read_optimal_results(classifiers, metrics)
+        return SimpleNamespace(optimal_results_=optimal_results, **calculate_results(optimal_results, compared_oversamplers, alpha, control_oversampler))
+
+
+class TaskQueue(ScoresStore):
+    """Queue the tasks of an experiment in the SQLite database of its scores.
+
+    Workers on any node that has access to the database claim pending tasks
+    with a lease. A task whose lease expires, e.g. because its worker was
+    terminated, is claimed again by another worker. The scores of a task are
+    appended and the task is marked as done in the same transaction, therefore
+    every completed task is checkpointed exactly once. The database should be
+    placed on a filesystem with working file locks and the rollback journal
+    should be used instead of WAL on network filesystems.
+    """
+
+    def __init__(self, path, lease_duration=600, journal_mode='DELETE'):
+        super(TaskQueue, self).__init__(path)
+        self.lease_duration = lease_duration
+        self.journal_mode = journal_mode
+
+    def _connect(self):
+        connection = connect(self.path, timeout=60, isolation_level=None)
+        connection.execute(f'PRAGMA journal_mode={self.journal_mode}')
+        return closing(connection)
+
+    def initialize(self, reset=False):
+        """Create the scores and tasks tables and optionally remove previous scores and tasks."""
+        super(TaskQueue, self).initialize(reset)
+        with self._connect() as connection:
+            if reset:
+                connection.execute('DROP TABLE IF EXISTS tasks')
+                connection.execute("DELETE FROM metadata WHERE key = 'status'")
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS tasks ('
+                'id INTEGER PRIMARY KEY, iteration INTEGER, payload TEXT, done INTEGER DEFAULT 0, '
+                'worker TEXT, lease_expiration REAL, attempts INTEGER DEFAULT 0)'
+            )
+            connection.execute('CREATE INDEX IF NOT EXISTS tasks_pending ON tasks (done, lease_expiration)')
+        return self
+
+    def read_status(self):
+        """Read the status of the experiment or None when the queue is not initialized."""
+        with self._connect() as connection:
+            if connection.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'tasks'").fetchone() is None:
+                return None
+            status = connection.execute("SELECT value FROM metadata WHERE key = 'status'").fetchone()
+        return None if status is None else loads(status[0])
+
+    def put(self, payloads, iteration):
+        """Put the tasks of an iteration in the queue, replacing the pending tasks of a previous run."""
+        with self._connect() as connection:
+            connection.execute('BEGIN IMMEDIATE')
+            connection.execute('DELETE FROM tasks WHERE done = 0')
+            connection.executemany('INSERT INTO tasks (iteration, payload) VALUES (?, ?)', [(iteration, dumps(payload)) for payload in payloads])
+            connection.execute('COMMIT')
+
+    def claim(self, worker, n_tasks=1):
+        """Claim pending tasks or tasks with expired leases."""
+        now = time()
+        with self._connect() as connection:
+            connection.execute('BEGIN IMMEDIATE')
+            tasks = connection.execute(
+                'SELECT id, payload FROM tasks WHERE done = 0 AND (lease_expiration IS NULL OR lease_expiration < ?) ORDER BY id LIMIT ?',
+                (now, n_tasks)
+            ).fetchall()
+            connection.executemany(
+                'UPDATE tasks SET worker = ?, lease_expiration = ?, attempts = attempts + 1 WHERE id = ?',
+                [(worker, now + self.lease_duration, task_id) for task_id, _ in tasks]
+            )
+            connection.execute('COMMIT')
+        return [(task_id, loads(payload)) for task_id, payload in tasks]
+
+    def renew(self, task_ids, worker):
+        """Extend the leases of tasks that are claimed by a worker."""
+        with self._connect() as connection:
+            connection.execute('BEGIN IMMEDIATE')
+            connection.executemany(
+                'UPDATE tasks SET lease_expiration = ? WHERE id = ? AND worker = ? AND done = 0',
+                [(time() + self.lease_duration, task_id, worker) for task_id in task_ids]
+            )
+            connection.execute('COMMIT')
+
+    def complete(self, task_id, rows, metrics):
+        """Append the scores of a task and mark it as done."""
+        records = [(*row[:len(KEYS)], metric, score) for row in rows for metric, score in zip(metrics, row[len(KEYS):])]
+        with self._connect() as connection:
+            connection.execute('BEGIN IMMEDIATE')
+            connection.executemany('INSERT OR REPLACE INTO scores VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', records)
+            connection.execute('UPDATE tasks SET done = 1 WHERE id = ?', (task_id,))
+            connection.execute('COMMIT')
+
+    def count_pending(self, iteration=None):
+        """Count the tasks that are not done, optionally of an iteration."""
+        query, params = 'SELECT COUNT(*) FROM tasks WHERE done = 0', ()
+        if iteration is not None:
+            query, params = query + ' AND iteration = ?', (iteration,)
+        with self._connect() as connection:
+            return connection.execute(query, params).fetchone()[0]
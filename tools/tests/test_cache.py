@@ -0,0 +1,120 @@
+"""
+Test the caches of the intermediate results.
+"""
+
+# Author: Georgios Douzas <gdouzas@icloud.com>
+# License: MIT
+
+import numpy as np
+import pytest
+from sklearn.cluster import KMeans
+from sklearn.neighbors import NearestNeighbors
+from imblearn.over_sampling import SMOTE
+
+from tools.cache import LRUCache, CachedClustererMixin, CachedNearestNeighbors, CLUSTERERS_CACHE, NEIGHBORS_CACHE, fingerprint, clear_caches
+from tools.runner import build_estimator, set_random_state
+from tools.tests.test_runner import generate_dataset, create_experiment, assert_scores_equal, OVERSAMPLERS
+
+
+class CachedKMeans(CachedClustererMixin, KMeans):
+    pass
+
+
+@pytest.fixture(autouse=True)
+def empty_caches():
+    clear_caches()
+
+
+def test_fingerprint():
+    """Test that the fingerprint depends on the content, shape and data type of an array."""
+    array = np.arange(6, dtype=float)
+    assert fingerprint(array) == fingerprint(array.copy())
+    assert fingerprint(array) != fingerprint(array.reshape(2, 3))
+    assert fingerprint(array) != fingerprint(array.astype(np.float32))
+    assert fingerprint(array[::2]) == fingerprint(np.array([0.0, 2.0, 4.0]))
+
+
+def test_lru_cache():
+    """Test that the least recently used entries are evicted when the cache exceeds its size."""
+    cache = LRUCache(maxsize=2, max_nbytes=200)
+    cache.put('first', np.zeros(10))
+    cache.put('second', np.zeros(10))
+    cache.get('first')
+    cache.put('third', np.zeros(10))
+    assert 'first' in cache and 'third' in cache and 'second' not in cache
+    cache.put('fourth', np.zeros(20))
+    assert list(cache.entries_) == ['fourth']
+    assert cache.nbytes_ == 160
+    cache.put('fifth', np.zeros(30))
+    assert 'fifth' not in cache
+    assert (cache.hits_, cache.misses_) == (1, 0)
+
+
+@pytest.mark.parametrize('algorithm', ['brute', 'kd_tree'])
+def test_cached_neighbors(algorithm):
+    """Test that the cached neighbors are the same as the exact ones and the graph is searched once."""
+    X = np.random.RandomState(0).normal(size=(50, 3))
+    for query in (None, X[:10]):
+        for n_neighbors in (5, 3, 1):
+            neighbors = CachedNearestNeighbors(n_neighbors=n_neighbors, max_n_neighbors=5, algorithm=algorithm).fit(X)
+            distances, indices = neighbors.kneighbors(query)
+            expected_distances, expected_indices = NearestNeighbors(n_neighbors=n_neighbors).fit(X).kneighbors(query)
+            np.testing.assert_array_equal(indices, expected_indices)
+            np.testing.assert_allclose(distances, expected_distances)
+    assert len(NEIGHBORS_CACHE) == 2
+    assert (NEIGHBORS_CACHE.hits_, NEIGHBORS_CACHE.misses_) == (4, 2)
+
+
+def test_cached_neighbors_smote():
+    """Test that SMOTE resamples the same data with the cached neighbors and searches them once per fold."""
+    X, y = generate_dataset(0)
+    for k_neighbors in (5, 3):
+        nn = CachedNearestNeighbors(n_neighbors=k_neighbors + 1, max_n_neighbors=6)
+        X_resampled, y_resampled = SMOTE(k_neighbors=nn, random_state=0).fit_resample(X, y)
+        expected_X_resampled, expected_y_resampled = SMOTE(k_neighbors=k_neighbors, random_state=0).fit_resample(X, y)
+        np.testing.assert_allclose(X_resampled, expected_X_resampled)
+        np.testing.assert_array_equal(y_resampled, expected_y_resampled)
+    assert len(NEIGHBORS_CACHE) == 1
+
+
+def test_cached_clusterer():
+    """Test that a clusterer that is fitted on the same data is fitted once."""
+    X, _ = generate_dataset(0)
+    labels = CachedKMeans(n_clusters=3, n_init=1, random_state=0).fit(X).labels_
+    clusterer = CachedKMeans(n_clusters=3, n_init=1, random_state=0).fit(X)
+    np.testing.assert_array_equal(clusterer.labels_, labels)
+    np.testing.assert_allclose(clusterer.cluster_centers_, KMeans(n_clusters=3, n_init=1, random_state=0).fit(X).cluster_centers_)
+    assert (CLUSTERERS_CACHE.hits_, CLUSTERERS_CACHE.misses_) == (1, 1)
+    CachedKMeans(n_clusters=4, n_init=1, random_state=0).fit(X)
+    assert len(CLUSTERERS_CACHE) == 2
+
+
+def test_build_cached_neighbors():
+    """Test that the integer numbers of neighbors of a grid are replaced by copies of the cached nearest neighbors estimator."""
+    nn = CachedNearestNeighbors(max_n_neighbors=6, algorithm='kd_tree')
+    oversampler = build_estimator(SMOTE(k_neighbors=nn), {'k_neighbors': 3})
+    assert isinstance(oversampler.k_neighbors, CachedNearestNeighbors)
+    assert oversampler.k_neighbors.get_params() == {**nn.get_params(), 'n_neighbors': 4}
+    assert nn.n_neighbors == 5
+    assert build_estimator(SMOTE(), {'k_neighbors': 3}).k_neighbors == 3
+
+
+def test_cached_neighbors_scores():
+    """Test that the scores of oversamplers with cached nearest neighbors are the same as the ones with integer neighbors."""
+    oversamplers = [
+        (name, SMOTE(k_neighbors=CachedNearestNeighbors(max_n_neighbors=6)), grid) if name == 'SMOTE' else (name, ov, grid)
+        for name, ov, grid in OVERSAMPLERS
+    ]
+    scores = create_experiment(oversamplers=oversamplers).run(n_jobs=1).scores_
+    assert set(scores.loc[scores['Oversampler'] == 'SMOTE', 'Oversampler params']) == {"{'k_neighbors': 3}", "{'k_neighbors': 5}"}
+    assert_scores_equal(scores, create_experiment().run(n_jobs=1).scores_)
+    assert len(NEIGHBORS_CACHE) > 0
+
+
+def test_build_estimator():
+    """Test that the estimators of a parameter grid are not modified by the configurations."""
+    nn = CachedNearestNeighbors(n_neighbors=4, max_n_neighbors=6, algorithm='rp_forest')
+    oversampler = set_random_state(build_estimator(SMOTE(), {'k_neighbors': nn}), 5)
+    assert oversampler.k_neighbors is not nn
+    assert oversampler.k_neighbors.random_state == 5
+    assert nn.random_state is None
@@ -0,0 +1,68 @@
+"""
+Test the clusterers of large datasets.
+"""
+
+# Author: Georgios Douzas <gdouzas@icloud.com>
+# License: MIT
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from tools.cluster import MiniBatchKMeans, OnlineSOM, check_n_clusters
+from tools.tests.test_runner import generate_dataset
+
+
+@pytest.mark.parametrize('n_clusters, expected_n_clusters', [(0.0, 1), (0.1, 9), (1.0, 90), (0, 1), (5, 5), (100, 90)])
+def test_check_n_clusters(n_clusters, expected_n_clusters):
+    """Test that the number of clusters is bounded by one and the number of samples."""
+    assert check_n_clusters(n_clusters, 90) == expected_n_clusters
+
+
+def test_mini_batch_kmeans():
+    """Test that the fraction of the samples is converted to the number of clusters and the parameter is kept."""
+    X, _ = generate_dataset(0)
+    clusterer = MiniBatchKMeans(n_clusters=0.1, n_init=1, random_state=0).fit(X)
+    assert clusterer.cluster_centers_.shape == (9, X.shape[1])
+    assert clusterer.n_clusters == 0.1
+
+
+@pytest.mark.parametrize('n_clusters, n_units', [(0.0, 1), (1.0, 90), (5, 5), (8, 8)])
+def test_online_som_units(n_clusters, n_units):
+    """Test that the grid has as many units as clusters and the clusters are the occupied units."""
+    X, _ = generate_dataset(0)
+    clusterer = OnlineSOM(n_clusters=n_clusters, random_state=0).fit(X)
+    assert len(clusterer.grid_) == n_units
+    assert len(np.unique(clusterer.grid_, axis=0)) == n_units
+    assert clusterer.codebook_.shape == (n_units, X.shape[1])
+    assert clusterer.n_clusters_ <= n_units
+    np.testing.assert_array_equal(np.unique(clusterer.labels_), np.arange(clusterer.n_clusters_))
+    assert clusterer.cluster_centers_.shape == (clusterer.n_clusters_, X.shape[1])
+
+
+def test_online_som_predict():
+    """Test that the predicted clusters of the training data are their labels, regardless of the input type."""
+    X, _ = generate_dataset(0)
+    clusterer = OnlineSOM(n_clusters=6, batch_size=16, random_state=0).fit(X)
+    np.testing.assert_array_equal(clusterer.predict(X), clusterer.labels_)
+    np.testing.assert_array_equal(OnlineSOM(n_clusters=6, batch_size=16, random_state=0).fit(pd.DataFrame(X)).labels_, clusterer.labels_)
+    np.testing.assert_array_equal(clusterer.predict(pd.DataFrame(X)), clusterer.labels_)
+
+
+@pytest.mark.parametrize('n_clusters', [5, 9])
+def test_online_som_neighbors(n_clusters):
+    """Test that the neighboring clusters are ordered pairs of labels of adjacent units."""
+    X, _ = generate_dataset(0)
+    clusterer = OnlineSOM(n_clusters=n_clusters, random_state=0).fit(X)
+    occupied = np.flatnonzero(clusterer.labels_mapping_ >= 0)
+    assert isinstance(clusterer.neighbors_, list) and clusterer.neighbors_
+    assert len(set(clusterer.neighbors_)) == len(clusterer.neighbors_)
+    for label1, label2 in clusterer.neighbors_:
+        assert type(label1) is int and type(label2) is int
+        assert 0 <= label1 < label2 < clusterer.n_clusters_
+        assert np.abs(clusterer.grid_[occupied[label1]] - clusterer.grid_[occupied[label2]]).sum() == 1
+    adjacent = [
+        (label1, label2) for label1 in range(clusterer.n_clusters_) for label2 in range(label1 + 1, clusterer.n_clusters_)
+        if np.abs(clusterer.grid_[occupied[label1]] - clusterer.grid_[occupied[label2]]).sum() == 1
+    ]
+    assert sorted(clusterer.neighbors_) == adjacent
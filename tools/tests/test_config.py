@@ -0,0 +1,69 @@
+"""
+Test the registry of the experiments' configurations.
+"""
+
+# Author: Georgios Douzas <gdouzas@icloud.com>
+# License: MIT
+
+import sys
+from subprocess import run
+
+import pytest
+
+from tools.config import CONFIG, EXPERIMENTS
+
+SINGLE_OVERSAMPLER_NAMES = [name for name in EXPERIMENTS if name.endswith('_imbalanced')]
+
+
+def test_lazy_registry():
+    """Test that the registry is iterated and grouped without importing the estimators of the experiments."""
+    code = (
+        'import sys; from tools.config import CONFIG; '
+        'assert len(CONFIG) == len(list(CONFIG)) and "lucas" in CONFIG; CONFIG.group(list(CONFIG)); '
+        'assert "tools.experiment" not in sys.modules and "sklearnext" not in sys.modules'
+    )
+    assert run([sys.executable, '-c', code]).returncode == 0
+
+
+def test_group():
+    """Test that the experiments are grouped when they differ only in their oversamplers."""
+    groups = CONFIG.group(list(CONFIG))
+    assert SINGLE_OVERSAMPLER_NAMES in groups
+    assert sorted(map(len, groups)) == [1, 1, 1, len(SINGLE_OVERSAMPLER_NAMES)]
+    assert CONFIG.group(['smote_imbalanced', 'lucas', 'adasyn_imbalanced']) == [['smote_imbalanced', 'adasyn_imbalanced'], ['lucas']]
+
+
+def test_get_name():
+    """Test that the name of combined experiments is their joined names or their database and number."""
+    assert CONFIG.get_name(['smote_imbalanced']) == 'smote_imbalanced'
+    assert CONFIG.get_name(SINGLE_OVERSAMPLER_NAMES[:3]) == '+'.join(SINGLE_OVERSAMPLER_NAMES[:3])
+    assert CONFIG.get_name(SINGLE_OVERSAMPLER_NAMES) == f'imbalanced_binary_class_{len(SINGLE_OVERSAMPLER_NAMES)}_experiments'
+
+
+def test_combine():
+    """Test that the combined configuration includes every oversampler of the experiments once."""
+    pytest.importorskip('sklearnext')
+    configuration = CONFIG.combine(['no_oversampling_imbalanced', 'smote_imbalanced', 'adasyn_imbalanced'])
+    assert [name for name, *_ in configuration['oversamplers']] == ['NO OVERSAMPLING', 'SMOTE', 'ADASYN']
+    configuration = CONFIG.combine(SINGLE_OVERSAMPLER_NAMES)
+    assert len(configuration['oversamplers']) == len(SINGLE_OVERSAMPLER_NAMES)
+    with pytest.raises(ValueError, match='can not be combined'):
+        CONFIG.combine(['smote_imbalanced', 'lucas'])
+
+
+def test_getitem():
+    """Test that every access of an experiment generates a new configuration of its oversamplers."""
+    pytest.importorskip('sklearnext')
+    [(name, oversampler, _)] = CONFIG['smote_imbalanced']['oversamplers']
+    [(_, other_oversampler, _)] = CONFIG['smote_imbalanced']['oversamplers']
+    assert name == 'SMOTE'
+    assert oversampler is not other_oversampler
+
+
+def test_select_oversamplers():
+    """Test that a list of names selects the oversamplers and the predefined selections are kept."""
+    pytest.importorskip('sklearnext')
+    from tools.experiment import generate_oversamplers
+    assert [name for name, *_ in generate_oversamplers(['SMOTE', 'ADASYN'])] == ['SMOTE', 'ADASYN']
+    assert len(generate_oversamplers('basic')) == 6
+    assert len(generate_oversamplers('all')) == 12
@@ -0,0 +1,196 @@
+"""
+Test the downloading and storage of the datasets.
+"""
+
+# Author: Georgios Douzas <gdouzas@icloud.com>
+# License: MIT
+
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from io import BytesIO
+from os import listdir
+from os.path import join
+from sqlite3 import connect
+from threading import Lock, Thread
+from time import sleep
+from zipfile import ZipFile
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from tools import cli
+from tools.data import Datasets, write_arrays, read_arrays, write_folds, read_folds
+from tools.runner import Experiment, generate_random_states, generate_folds
+from tools.tests.test_runner import create_experiment, sort_scores, DATASETS, OVERSAMPLERS, CLASSIFIERS, SCORING, N_SPLITS, N_RUNS, RANDOM_STATE
+
+CSV_CONTENT = b'1.0,2.0,0\n3.0,4.0,1\n5.0,6.0,0\n'
+
+
+def generate_archive(name, content):
+    """Generate a zip archive of a single file."""
+    archive = BytesIO()
+    with ZipFile(archive, 'w') as file:
+        file.writestr(name, content)
+    return archive.getvalue()
+
+
+class FixtureServer(ThreadingHTTPServer):
+    """Local HTTP server of fixture payloads that counts the requests and their maximum concurrency."""
+
+    def __init__(self, payloads, delay=0.1):
+        super(FixtureServer, self).__init__(('127.0.0.1', 0), FixtureHandler)
+        self.payloads = payloads
+        self.delay = delay
+        self.requests = []
+        self.n_active = self.max_active = 0
+        self.lock = Lock()
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self.server_address[1]}/'
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests.append(self.path)
+            server.n_active += 1
+            server.max_active = max(server.max_active, server.n_active)
+        sleep(server.delay)
+        with server.lock:
+            server.n_active -= 1
+        content = server.payloads.get(self.path.lstrip('/'))
+        self.send_response(200 if content is not None else 404)
+        self.send_header('Content-Length', str(len(content or b'')))
+        self.end_headers()
+        self.wfile.write(content or b'')
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    payloads = {f'data/{name}.csv': CSV_CONTENT for name in ('first', 'second', 'third')}
+    payloads['archives/fourth.zip'] = generate_archive('fourth.csv', CSV_CONTENT)
+    server = FixtureServer(payloads)
+    thread = Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def create_datasets(server_url):
+    """Create the datasets of the fixture server."""
+
+    class FixtureDatasets(Datasets):
+
+        UCI_URL = server_url
+
+        def _read(self, name):
+            data = pd.read_csv(self._open(f'{self.UCI_URL}data/{name}.csv'), header=None)
+            return data.rename(columns={2: 'target'})
+
+        def fetch_first(self):
+            return self._read('first')
+
+        def fetch_second(self):
+            return self._read('second')
+
+        def fetch_third(self):
+            return self._read('third')
+
+        def fetch_fourth(self):
+            with ZipFile(self._open(f'{self.UCI_URL}archives/fourth.zip')) as archive:
+                data = pd.read_csv(archive.open('fourth.csv'), header=None)
+            return data.rename(columns={2: 'target'})
+
+    return FixtureDatasets
+
+
+def test_download_concurrently(server, tmp_path):
+    """Test that the datasets are downloaded concurrently through a bounded number of connections."""
+    datasets = create_datasets(server.url)(max_connections=3, cache_path=str(tmp_path)).download()
+    assert [name for name, _ in datasets.datasets_] == ['FIRST', 'FOURTH', 'SECOND', 'THIRD']
+    for _, data in datasets.datasets_:
+        pd.testing.assert_frame_equal(data, pd.DataFrame({0: [1.0, 3.0, 5.0], 1: [2.0, 4.0, 6.0], 'target': [0, 1, 0]}))
+    assert len(server.requests) == 4
+    assert 1 < server.max_active <= 3
+
+
+def test_content_addressed_cache(server, tmp_path):
+    """Test that cached payloads are not downloaded again and identical payloads are stored once."""
+    datasets_class = create_datasets(server.url)
+    datasets_class(cache_path=str(tmp_path)).download()
+    assert len(server.requests) == 4
+    assert len(listdir(join(tmp_path, 'urls'))) == 4
+    assert len(listdir(join(tmp_path, 'contents'))) == 2
+    datasets = datasets_class(cache_path=str(tmp_path)).download()
+    assert len(server.requests) == 4
+    [(_, first_hash)], [(_, second_hash)] = datasets.payloads_['fetch_first'], datasets.payloads_['fetch_second']
+    assert first_hash == second_hash
+    datasets_class(cache_path=str(tmp_path)).download(['fetch_first'])._fetch(f'{server.url}data/first.csv', revalidate=True)
+    assert len(server.requests) == 5
+
+
+def test_offline(server, tmp_path):
+    """Test that offline downloads use only the cached payloads."""
+    datasets_class = create_datasets(server.url)
+    with pytest.raises(ConnectionError):
+        datasets_class(cache_path=str(tmp_path), offline=True).download()
+    assert not server.requests
+    datasets_class(cache_path=str(tmp_path)).download()
+    n_requests = len(server.requests)
+    server.payloads.clear()
+    datasets = datasets_class(cache_path=str(tmp_path), offline=True).download()
+    assert len(server.requests) == n_requests
+    assert len(datasets.datasets_) == 4
+
+
+def test_saved_folds(tmp_path):
+    """Test that the saved fold plans are reloaded without writing and they are the generated ones."""
+    path = str(tmp_path)
+    write_arrays(path, [(name, pd.DataFrame(np.column_stack([X, y]))) for name, (X, y) in DATASETS])
+    random_states = generate_random_states(RANDOM_STATE, N_RUNS)
+    write_folds(path, {name: generate_folds(y, N_SPLITS, random_states) for name, (_, y) in read_arrays(path).items()}, N_SPLITS, N_RUNS, RANDOM_STATE)
+    files = sorted(listdir(path))
+    folds = read_folds(path, N_SPLITS, N_RUNS, RANDOM_STATE)
+    for name, (_, y) in DATASETS:
+        np.testing.assert_array_equal(folds[name], generate_folds(y, N_SPLITS, random_states))
+    assert read_folds(path, N_SPLITS, N_RUNS, RANDOM_STATE + 1) == {}
+    experiment = create_experiment(folds=folds)
+    experiment._initialize(1, 0)
+    expected_experiment = create_experiment()
+    expected_experiment._initialize(1, 0)
+    for name, _ in DATASETS:
+        for (*fold, train_indices, test_indices), (*expected_fold, expected_train_indices, expected_test_indices) in zip(
+            experiment.folds_[name], expected_experiment.folds_[name]
+        ):
+            assert fold == expected_fold
+            np.testing.assert_array_equal(train_indices, expected_train_indices)
+            np.testing.assert_array_equal(test_indices, expected_test_indices)
+    assert sorted(listdir(path)) == files
+
+
+def test_single_precision(tmp_path, monkeypatch):
+    """Test that the single precision input data are converted in memory and their scores are close to the double precision ones."""
+    monkeypatch.setattr(cli, 'DATA_PATH', str(tmp_path))
+    datasets = [(name, pd.DataFrame(np.column_stack([X, y]))) for name, (X, y) in DATASETS]
+    with connect(str(tmp_path / 'test.db')) as connection:
+        for name, data in datasets:
+            data.to_sql(name, connection, index=False)
+    write_arrays(str(tmp_path / 'test'), datasets)
+    files = sorted(listdir(tmp_path / 'test'))
+    scores = {}
+    for dtype in ('float64', 'float32'):
+        loaded_datasets = cli.load_datasets('test', 'all', dtype)
+        assert all(X.dtype == dtype for _, (X, _) in loaded_datasets)
+        experiment = Experiment('test', loaded_datasets, OVERSAMPLERS, CLASSIFIERS, SCORING, N_SPLITS, N_RUNS, RANDOM_STATE, dtype=dtype)
+        scores[dtype] = sort_scores(experiment.run(n_jobs=1).scores_)
+        assert all(X.dtype == dtype for _, (X, _) in experiment.datasets_)
+    assert sorted(listdir(tmp_path / 'test')) == files
+    for metric in SCORING:
+        assert abs(scores['float32'][metric] - scores['float64'][metric]).mean() < 0.01
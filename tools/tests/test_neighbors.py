@@ -0,0 +1,76 @@
+"""
+Test the approximate search of the nearest neighbors.
+"""
+
+# Author: Georgios Douzas <gdouzas@icloud.com>
+# License: MIT
+
+import numpy as np
+import pytest
+from sklearn.neighbors import NearestNeighbors, KNeighborsClassifier
+
+from tools.neighbors import RandomProjectionForest, ForestKNeighborsClassifier
+from tools.tests.test_runner import generate_dataset
+
+
+def calculate_recall(indices, expected_indices):
+    """Calculate the proportion of the exact neighbors that are found."""
+    return np.mean([len(set(row) & set(expected_row)) for row, expected_row in zip(indices, expected_indices)]) / expected_indices.shape[1]
+
+
+def test_forest_recall():
+    """Test that the default forest finds most of the nearest neighbors of high dimensional data."""
+    X = np.random.RandomState(0).normal(size=(1000, 20))
+    indices = RandomProjectionForest(random_state=0).fit(X).kneighbors(n_neighbors=5, return_distance=False)
+    expected_indices = NearestNeighbors(n_neighbors=5).fit(X).kneighbors(return_distance=False)
+    assert calculate_recall(indices, expected_indices) > 0.85
+
+
+@pytest.mark.parametrize('query', [None, 'X'])
+def test_forest_few_candidates(query):
+    """Test that the queries with fewer candidates than neighbors are searched exhaustively."""
+    X = np.random.RandomState(1).normal(size=(40, 3))
+    query = X[:10] if query == 'X' else None
+    forest = RandomProjectionForest(n_trees=1, leaf_size=3, random_state=0).fit(X)
+    distances, indices = forest.kneighbors(query, n_neighbors=8)
+    expected_distances, expected_indices = NearestNeighbors(n_neighbors=8).fit(X).kneighbors(query)
+    np.testing.assert_array_equal(indices, expected_indices)
+    np.testing.assert_allclose(distances, expected_distances, atol=1e-6)
+
+
+def test_forest_self_exclusion():
+    """Test that the neighbors of the fitted data exclude every sample from its own neighbors."""
+    X = np.random.RandomState(2).normal(size=(30, 4))
+    indices = RandomProjectionForest(n_trees=2, leaf_size=40, random_state=0).fit(X).kneighbors(n_neighbors=29, return_distance=False)
+    assert not (indices == np.arange(len(X))[:, np.newaxis]).any()
+    np.testing.assert_array_equal(np.sort(indices, axis=1), [np.delete(np.arange(len(X)), position) for position in range(len(X))])
+    with pytest.raises(ValueError, match='n_neighbors <= n_samples_fit'):
+        RandomProjectionForest().fit(X).kneighbors(n_neighbors=30)
+
+
+def test_forest_duplicates():
+    """Test that duplicate samples are neighbors of each other but not of themselves and candidates are selected once."""
+    X = np.repeat(np.random.RandomState(3).normal(size=(20, 2)), 2, axis=0)
+    distances, indices = RandomProjectionForest(n_trees=5, leaf_size=40, random_state=0).fit(X).kneighbors(n_neighbors=3)
+    np.testing.assert_array_equal(indices[:, 0], np.arange(len(X)) ^ 1)
+    np.testing.assert_allclose(distances[:, 0], 0, atol=1e-6)
+    assert all(len(set(row)) == 3 for row in indices)
+    indices = RandomProjectionForest(n_trees=5, leaf_size=4, random_state=0).fit(X).kneighbors(n_neighbors=3, return_distance=False)
+    assert not (indices == np.arange(len(X))[:, np.newaxis]).any()
+    assert all(len(set(row)) == 3 for row in indices)
+
+
+def test_forest_classifier(monkeypatch):
+    """Test that the classifier predicts through the neighbors of the forest."""
+    X, y = generate_dataset(0)
+    classifier = ForestKNeighborsClassifier(algorithm='rp_forest', random_state=0).fit(X, y)
+    assert classifier.algorithm == 'rp_forest'
+    queries = []
+    kneighbors = classifier.forest_.kneighbors
+    monkeypatch.setattr(classifier.forest_, 'kneighbors', lambda X, *args: queries.append(X) or kneighbors(X, *args))
+    predictions = classifier.predict(X)
+    assert len(queries) == 1
+    neighbors_y = y[kneighbors(X, 5, False)]
+    np.testing.assert_array_equal(predictions, (neighbors_y.mean(axis=1) > 0.5).astype(float))
+    exact_predictions = KNeighborsClassifier().fit(X, y).predict(X)
+    assert np.mean(predictions == exact_predictions) > 0.9
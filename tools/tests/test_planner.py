@@ -0,0 +1,59 @@
+"""
+Test the planning of the computational cost of an experiment.
+"""
+
+# Author: Georgios Douzas <gdouzas@icloud.com>
+# License: MIT
+
+import pytest
+from imblearn.over_sampling import SMOTE
+
+from tools.cache import CachedNearestNeighbors, NEIGHBORS_CACHE, clear_caches
+from tools.planner import calculate_halving_schedule, plan_experiment
+from tools.tests.test_runner import create_experiment, CountingClassifier, DATASETS, N_SPLITS, N_RUNS
+
+
+@pytest.mark.parametrize('n_candidates, min_resource, max_resource, reduction_factor, schedule', [
+    (6, 1, 6, 2, [(6, 1), (3, 1), (2, 2), (1, 2)]),
+    (10, 5, 15, 3, [(10, 5), (4, 10)]),
+    (9, 3, 27, 3, [(9, 3), (3, 6), (1, 18)]),
+    (4, 6, 6, 2, [(4, 6)]),
+])
+def test_halving_schedule(n_candidates, min_resource, max_resource, reduction_factor, schedule):
+    """Test that the candidates are reduced to ceil(n_candidates / reduction_factor) and the folds sum to the maximum resource."""
+    assert calculate_halving_schedule(n_candidates, min_resource, max_resource, reduction_factor) == schedule
+    assert sum(n_folds for _, n_folds in schedule) == max_resource
+
+
+def test_plan_counts():
+    """Test that the planned resamplings and fits of the grid search are the ones of the experiment."""
+    plan = plan_experiment(create_experiment(), n_jobs=1).set_index(['Dataset', 'Oversampler'])
+    n_folds = N_SPLITS * N_RUNS
+    for (_, ov_name), row in plan.iterrows():
+        n_configurations = 2 if ov_name == 'SMOTE' else 1
+        assert row['Configurations'] == n_configurations
+        assert row['Resamplings'] == n_folds * n_configurations
+
+        # The configurations of the KNN classifier are staged, the ones of the decision tree are fitted separately
+        assert row['Fits'] == n_folds * n_configurations * (1 + 2)
+        assert row['Duration'] > 0 and row['Peak memory'] > 0
+
+    # Fits of the experiment
+    classifiers = [('DT', CountingClassifier(), {'max_depth': [2, None]})]
+    plan = plan_experiment(create_experiment(classifiers=classifiers), n_jobs=1)
+    CountingClassifier.n_fits = 0
+    create_experiment(classifiers=classifiers).run(n_jobs=1)
+    assert plan['Fits'].sum() == CountingClassifier.n_fits
+    assert plan['Resamplings'].sum() == len(DATASETS) * n_folds * 4
+
+
+def test_plan_cold_caches():
+    """Test that the probes search the nearest neighbors instead of reading them from the caches of previous runs."""
+    oversamplers = [('SMOTE', SMOTE(k_neighbors=CachedNearestNeighbors(max_n_neighbors=6)), {'k_neighbors': [3, 5]})]
+    experiment = create_experiment(oversamplers=oversamplers)
+    clear_caches()
+    experiment.run(n_jobs=1)
+    assert len(NEIGHBORS_CACHE) > 0
+    plan_experiment(experiment, n_jobs=1)
+    assert NEIGHBORS_CACHE.misses_ > 0
+    assert NEIGHBORS_CACHE.hits_ == 0
@@ -0,0 +1,101 @@
+"""
+Test the profiling of the experimental procedure.
+"""
+
+# Author: Georgios Douzas <gdouzas@icloud.com>
+# License: MIT
+
+from json import load
+
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import MinMaxScaler
+from imblearn.over_sampling import SMOTE, KMeansSMOTE
+from imblearn.pipeline import make_pipeline
+
+from tools.cache import CachedNearestNeighbors, clear_caches
+from tools.profiling import Profiler, instrument_steps, aggregate_profile, export_profile
+from tools.tests.test_cache import CachedKMeans
+from tools.tests.test_runner import create_experiment, assert_scores_equal, generate_dataset, OVERSAMPLERS, N_SPLITS, N_RUNS
+
+PIPELINE_OVERSAMPLERS = OVERSAMPLERS[:1] + [
+    (
+        'K-MEANS SMOTE',
+        make_pipeline(
+            MinMaxScaler(),
+            KMeansSMOTE(
+                kmeans_estimator=CachedKMeans(n_clusters=2, n_init=1), k_neighbors=CachedNearestNeighbors(max_n_neighbors=6), cluster_balance_threshold=0.1
+            )
+        ),
+        {'kmeanssmote__k_neighbors': [3, 5]}
+    )
+]
+
+
+def test_instrument_steps():
+    """Test that the steps of a pipeline are recorded as nested stages without changing the resampled data."""
+    X, y = generate_dataset(0)
+    oversampler = make_pipeline(MinMaxScaler(), SMOTE(random_state=0))
+    expected_X, expected_y = oversampler.fit_resample(X, y)
+    profiler = Profiler().start()
+    with profiler.stage('SMOTE', 'resample'):
+        X_resampled, y_resampled = instrument_steps(oversampler, profiler).fit_resample(X, y)
+    profiler.stop()
+    np.testing.assert_array_equal(X_resampled, expected_X)
+    np.testing.assert_array_equal(y_resampled, expected_y)
+    [resample, *steps] = sorted(profiler.events_, key=lambda event: event['id'])
+    assert [(event['name'], event['cat'], event['parent']) for event in steps] == [('MinMaxScaler', 'step', resample['id']), ('SMOTE', 'step', resample['id'])]
+    assert resample['dur'] >= sum(event['dur'] for event in steps)
+
+
+def test_aggregate_profile():
+    """Test that the self time of a stage excludes the time of its nested stages."""
+    events = [
+        {'name': 'task', 'cat': 'task', 'dur': 10.0, 'pid': 1, 'task': 0, 'id': 0, 'parent': None, 'memory': 5, 'args': {}},
+        {'name': 'SMOTE', 'cat': 'resample', 'dur': 6.0, 'pid': 1, 'task': 0, 'id': 1, 'parent': 0, 'memory': 3, 'args': {'oversampler': 'SMOTE'}},
+        {'name': 'kneighbors', 'cat': 'neighbors', 'dur': 4.0, 'pid': 1, 'task': 0, 'id': 2, 'parent': 1, 'memory': 2, 'args': {'oversampler': 'SMOTE'}},
+        {'name': 'task', 'cat': 'task', 'dur': 8.0, 'pid': 1, 'task': 1, 'id': 0, 'parent': None, 'memory': 7, 'args': {}},
+    ]
+    profile = aggregate_profile(events).set_index('Stage')
+    assert profile.loc['task', 'Count'] == 2
+    np.testing.assert_allclose(profile['Self time'].to_numpy() * 1e6, [12.0, 4.0, 2.0])
+    np.testing.assert_allclose(profile.loc['task', ['Total time', 'Mean time']].to_numpy(dtype=float) * 1e6, [18.0, 9.0])
+    assert profile.loc['task', 'Peak memory'] == 7
+    assert aggregate_profile([]).empty
+
+
+def test_profiled_run(tmp_path):
+    """Test that a profiled run records every stage of its tasks and its scores are unchanged."""
+    clear_caches()
+    experiment = create_experiment(oversamplers=PIPELINE_OVERSAMPLERS).run(n_jobs=1, profile=str(tmp_path))
+    clear_caches()
+    assert_scores_equal(experiment.scores_, create_experiment(oversamplers=PIPELINE_OVERSAMPLERS).run(n_jobs=1).scores_)
+    assert not hasattr(experiment, 'profile_events_')
+
+    # Every category of stages is recorded
+    profile = experiment.profile_
+    assert set(profile['Category']) == {'task', 'resample', 'step', 'cluster', 'neighbors', 'fit', 'stage', 'score'}
+    assert set(profile.loc[profile['Category'] == 'step', 'Stage']) == {'MinMaxScaler', 'KMeansSMOTE'}
+    assert set(profile.loc[profile['Category'] == 'score', 'Stage']) == {'accuracy_score', 'f1_score'}
+    assert (profile['Self time'] <= profile['Total time'] + 1e-9).all()
+    counts = profile.groupby('Category')['Count'].sum()
+    n_folds = len(experiment.datasets_) * N_SPLITS * N_RUNS
+    assert counts['task'] == n_folds * len(PIPELINE_OVERSAMPLERS)
+    assert counts['resample'] == n_folds * len(experiment.equivalents_['K-MEANS SMOTE'])
+
+    # The exported files are consistent with the profile
+    pd.testing.assert_frame_equal(pd.read_csv(tmp_path / 'test.profile.csv'), profile, check_dtype=False)
+    with open(tmp_path / 'test.trace.json') as file:
+        trace_events = load(file)['traceEvents']
+    assert len(trace_events) == profile['Count'].sum()
+    assert all(event['ph'] == 'X' and 'memory' in event['args'] for event in trace_events)
+
+
+def test_export_profile(tmp_path):
+    """Test that the events are exported as a Chrome trace and the aggregated stages as a CSV file."""
+    events = [{'name': 'task', 'cat': 'task', 'ts': 1.0, 'dur': 2.0, 'pid': 1, 'tid': 2, 'task': 0, 'id': 0, 'parent': None, 'memory': 3, 'args': {}}]
+    export_profile(events, str(tmp_path), 'test')
+    with open(tmp_path / 'test.trace.json') as file:
+        trace = load(file)
+    assert trace['traceEvents'] == [{'name': 'task', 'cat': 'task', 'ph': 'X', 'ts': 1.0, 'dur': 2.0, 'pid': 1, 'tid': 2, 'args': {'memory': 3}}]
+    assert pd.read_csv(tmp_path / 'test.profile.csv')['Count'].tolist() == [1]
@@ -0,0 +1,100 @@
+"""
+Test the results and statistical tests of the experimental procedure.
+"""
+
+# Author: Georgios Douzas <gdouzas@icloud.com>
+# License: MIT
+
+import numpy as np
+import pandas as pd
+import pytest
+from scipy.stats import friedmanchisquare, ttest_rel
+from sklearn.datasets import make_classification
+from sklearn.linear_model import LogisticRegression
+from sklearn.tree import DecisionTreeClassifier
+
+from tools.results import holm_correction, calculate_results
+from tools.runner import Experiment
+
+RESULTS_ATTRIBUTES = (
+    'mean_scores_', 'sem_scores_', 'mean_perc_diff_scores_', 'sem_perc_diff_scores_',
+    'mean_ranking_', 'sem_ranking_', 'friedman_test_', 'holms_test_'
+)
+
+
+def generate_optimal_results(random_state=0):
+    """Generate optimal scores of three oversamplers."""
+    random_state = np.random.RandomState(random_state)
+    index = pd.MultiIndex.from_product([['A', 'B', 'C', 'D', 'E'], ['LR', 'DT'], ['accuracy']], names=['Dataset', 'Classifier', 'Metric'])
+    columns = pd.Index(['NO OVERSAMPLING', 'RANDOM OVERSAMPLING', 'SMOTE'], name='Oversampler')
+    return pd.DataFrame(random_state.uniform(0.5, 1.0, size=(len(index), len(columns))), index=index, columns=columns)
+
+
+def test_holm_correction():
+    """Test the Holm step-down correction of p-values."""
+    np.testing.assert_allclose(holm_correction([0.01, 0.04, 0.03]), [0.03, 0.06, 0.06])
+    np.testing.assert_allclose(holm_correction([0.5, 0.9]), [1.0, 1.0])
+
+
+def test_calculate_results():
+    """Test the aggregated results and the Friedman test of optimal scores."""
+    optimal_results = generate_optimal_results()
+    results = calculate_results(optimal_results, ['NO OVERSAMPLING', 'SMOTE'])
+    lr_results = optimal_results.xs('LR', level='Classifier')
+    mean_scores = results['mean_scores_'].set_index(['Classifier', 'Metric'])
+    np.testing.assert_allclose(mean_scores.loc[('LR', 'accuracy')], lr_results.mean())
+    perc_diff = 100 * (lr_results['SMOTE'] - lr_results['NO OVERSAMPLING']) / lr_results['NO OVERSAMPLING']
+    mean_perc_diff = results['mean_perc_diff_scores_'].set_index(['Classifier', 'Metric'])
+    np.testing.assert_allclose(mean_perc_diff.loc[('LR', 'accuracy'), 'Difference'], perc_diff.mean())
+    mean_ranking = results['mean_ranking_'].set_index(['Classifier', 'Metric'])
+    np.testing.assert_allclose(mean_ranking.loc[('LR', 'accuracy')], lr_results.rank(axis=1, ascending=False).mean())
+    friedman_test = results['friedman_test_'].set_index(['Classifier', 'Metric'])
+    assert friedman_test.loc[('LR', 'accuracy'), 'p-value'] == pytest.approx(friedmanchisquare(*lr_results.values.T).pvalue)
+    assert list(results['holms_test_'].columns) == ['Classifier', 'Metric', 'NO OVERSAMPLING', 'RANDOM OVERSAMPLING']
+
+
+def test_holms_test():
+    """Test that the Holm's test adjusts the p-values of the paired t-tests of the control oversampler's scores."""
+    optimal_results = generate_optimal_results()
+    optimal_results['SMOTE'] += 0.1
+    holms_test = calculate_results(optimal_results)['holms_test_'].set_index(['Classifier', 'Metric'])
+    lr_results = optimal_results.xs('LR', level='Classifier')
+    pvalues = [ttest_rel(lr_results['SMOTE'], lr_results[name]).pvalue for name in ('NO OVERSAMPLING', 'RANDOM OVERSAMPLING')]
+    np.testing.assert_allclose(holms_test.loc[('LR', 'accuracy')], holm_correction(pvalues))
+
+    # Oversamplers with the same mean ranking have different p-values when their scores differ
+    optimal_results = pd.DataFrame(
+        {'A': [0.79, 0.689, 0.588, 0.487], 'B': [0.5, 0.5, 0.595, 0.494], 'C': [0.8, 0.7, 0.6, 0.5]},
+        index=pd.MultiIndex.from_product([['A', 'B', 'C', 'D'], ['LR'], ['accuracy']], names=['Dataset', 'Classifier', 'Metric'])
+    )
+    ranking = calculate_results(optimal_results)['mean_ranking_']
+    holms_test = calculate_results(optimal_results)['holms_test_']
+    assert ranking.loc[0, 'A'] == ranking.loc[0, 'B']
+    assert holms_test.loc[0, 'A'] < 0.01 < holms_test.loc[0, 'B']
+
+
+def test_results_parity():
+    """Test that the results are the same as the ones of sklearnext's binary experiment."""
+    tools = pytest.importorskip('sklearnext.tools')
+    over_sampling = pytest.importorskip('sklearnext.over_sampling')
+    datasets = [
+        (f'DATASET {position}', make_classification(n_samples=120, n_features=4, weights=[0.8], random_state=position))
+        for position in range(4)
+    ]
+    oversamplers = [
+        ('NO OVERSAMPLING', None, {}),
+        ('RANDOM OVERSAMPLING', over_sampling.RandomOverSampler(), {}),
+        ('SMOTE', over_sampling.SMOTE(), {'k_neighbors': [3, 5]})
+    ]
+    classifiers = [('LR', LogisticRegression(solver='lbfgs'), {}), ('DT', DecisionTreeClassifier(), {'max_depth': [3, 6]})]
+    params = dict(scoring=['accuracy', 'f1'], n_splits=3, n_runs=2, random_state=0)
+    expected = tools.BinaryExperiment('parity', datasets, oversamplers, classifiers, **params)
+    expected.run(n_jobs=1)
+    expected.calculate_results()
+    experiment = Experiment('parity', datasets, oversamplers, classifiers, **params).run(n_jobs=1).calculate_results()
+    for attribute in RESULTS_ATTRIBUTES:
+        np.testing.assert_allclose(
+            getattr(experiment, attribute).select_dtypes('number').to_numpy(dtype=float),
+            getattr(expected, attribute).select_dtypes('number').to_numpy(dtype=float),
+            err_msg=attribute
+        )
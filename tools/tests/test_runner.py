@@ -0,0 +1,197 @@
+"""
+Test the experimental procedure.
+"""
+
+# Author: Georgios Douzas <gdouzas@icloud.com>
+# License: MIT
+
+from math import ceil
+from sqlite3 import connect
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.base import clone
+from sklearn.cluster import KMeans
+from sklearn.datasets import make_classification
+from sklearn.metrics import get_scorer
+from sklearn.model_selection import StratifiedKFold, ParameterGrid
+from sklearn.neighbors import KNeighborsClassifier
+from sklearn.tree import DecisionTreeClassifier
+from sklearn.utils import check_random_state
+from imblearn.over_sampling import RandomOverSampler, SMOTE
+
+from tools.runner import Experiment, set_random_state, canonicalize_params, KEYS
+
+
+def generate_dataset(random_state):
+    """Generate an imbalanced binary class dataset."""
+    X, y = make_classification(n_samples=90, n_features=4, weights=[0.75], random_state=random_state)
+    return X, y.astype(float)
+
+
+DATASETS = [(f'DATASET {position}', generate_dataset(position)) for position in range(2)]
+OVERSAMPLERS = [
+    ('NO OVERSAMPLING', None, {}),
+    ('RANDOM OVERSAMPLING', RandomOverSampler(), {}),
+    ('SMOTE', SMOTE(), {'k_neighbors': [3, 5]})
+]
+CLASSIFIERS = [
+    ('KNN', KNeighborsClassifier(), {'n_neighbors': [1, 3, 5]}),
+    ('DT', DecisionTreeClassifier(), {'max_depth': [2, None]})
+]
+SCORING = ['accuracy', 'f1']
+N_SPLITS, N_RUNS, RANDOM_STATE = 3, 2, 5
+
+
+class CountingClassifier(DecisionTreeClassifier):
+    """Decision tree that counts its fits."""
+
+    n_fits = 0
+
+    def fit(self, X, y, **fit_params):
+        CountingClassifier.n_fits += 1
+        return super(CountingClassifier, self).fit(X, y, **fit_params)
+
+
+class GeometricOversampler(SMOTE):
+    """SMOTE with the selection strategy and clusterer parameters of geometric oversamplers."""
+
+    def __init__(self, k_neighbors=5, selection_strategy='combined', clusterer=None, random_state=None):
+        super(GeometricOversampler, self).__init__(k_neighbors=k_neighbors, random_state=random_state)
+        self.selection_strategy = selection_strategy
+        self.clusterer = clusterer
+
+
+def create_experiment(oversamplers=OVERSAMPLERS, classifiers=CLASSIFIERS, **params):
+    """Create an experiment of the test datasets, oversamplers and classifiers."""
+    params = {'scoring': SCORING, 'n_splits': N_SPLITS, 'n_runs': N_RUNS, 'random_state': RANDOM_STATE, **params}
+    return Experiment('test', DATASETS, oversamplers, classifiers, **params)
+
+
+def sort_scores(scores):
+    """Sort the scores by their keys."""
+    return scores.sort_values(KEYS + ['Run', 'Fold']).reset_index(drop=True)
+
+
+def calculate_scores_separately():
+    """Fit and score every pair of oversampler and classifier configurations on every fold separately."""
+    random_states = check_random_state(RANDOM_STATE).randint(np.iinfo(np.int32).max, size=N_RUNS)
+    scores = []
+    for dataset_name, (X, y) in DATASETS:
+        for run, random_state in enumerate(random_states):
+            for fold, (train_indices, test_indices) in enumerate(StratifiedKFold(N_SPLITS, shuffle=True, random_state=random_state).split(X, y)):
+                for ov_name, ov, ov_grid in OVERSAMPLERS:
+                    for ov_params in ParameterGrid(ov_grid):
+                        X_resampled, y_resampled = X[train_indices], y[train_indices]
+                        if ov is not None:
+                            oversampler = set_random_state(clone(ov).set_params(**ov_params), random_state)
+                            X_resampled, y_resampled = oversampler.fit_resample(X_resampled, y_resampled)
+                        for clf_name, clf, clf_grid in CLASSIFIERS:
+                            for clf_params in ParameterGrid(clf_grid):
+                                classifier = set_random_state(clone(clf).set_params(**clf_params), random_state).fit(X_resampled, y_resampled)
+                                scores.append((
+                                    dataset_name, ov_name, str(ov_params), clf_name, str(clf_params), run, fold,
+                                    *[get_scorer(scoring)(classifier, X[test_indices], y[test_indices]) for scoring in SCORING]
+                                ))
+    return sort_scores(pd.DataFrame(scores, columns=KEYS + ['Run', 'Fold'] + SCORING))
+
+
+@pytest.fixture(scope='module')
+def separate_scores():
+    return calculate_scores_separately()
+
+
+def assert_scores_equal(scores, expected_scores):
+    """Assert that the scores of two experiments are the same."""
+    scores, expected_scores = sort_scores(scores), sort_scores(expected_scores)
+    pd.testing.assert_frame_equal(scores[KEYS + ['Run', 'Fold']], expected_scores[KEYS + ['Run', 'Fold']], check_dtype=False)
+    np.testing.assert_allclose(scores[SCORING].to_numpy(dtype=float), expected_scores[SCORING].to_numpy(dtype=float))
+
+
+def test_grid_scores(separate_scores):
+    """Test that the scores of the grid search are the same as the ones of separate fits."""
+    experiment = create_experiment().run(n_jobs=1)
+    assert_scores_equal(experiment.scores_, separate_scores)
+
+
+def test_halving_scores(separate_scores):
+    """Test that the halving search evaluates the selected candidates as separate fits and selects ceil(n / reduction_factor) of them."""
+    experiment = create_experiment(search='halving', min_resource=1, reduction_factor=2).run(n_jobs=1)
+    scores = experiment.scores_.merge(separate_scores, on=KEYS + ['Run', 'Fold'], suffixes=('', ' expected'))
+    assert len(scores) == len(experiment.scores_)
+    np.testing.assert_allclose(scores[SCORING].to_numpy(dtype=float), scores[[f'{scoring} expected' for scoring in SCORING]].to_numpy(dtype=float))
+
+    # Candidates evaluated on each number of folds
+    grids_sizes = {name: len(ParameterGrid(grid)) for name, _, grid in OVERSAMPLERS + CLASSIFIERS}
+    n_folds = experiment.scores_.groupby(KEYS).size()
+    for (_, ov_name, clf_name), candidates_folds in n_folds.groupby(level=['Dataset', 'Oversampler', 'Classifier']):
+        n_candidates = grids_sizes[ov_name] * grids_sizes[clf_name]
+        for end in (1, 2, 4, 6):
+            assert (candidates_folds >= end).sum() == n_candidates
+            n_candidates = ceil(n_candidates / 2)
+
+
+def test_resume(tmp_path, separate_scores):
+    """Test that a resumed experiment evaluates the missing tasks with the same scores."""
+    checkpoint = str(tmp_path / 'test.db')
+    create_experiment().run(n_jobs=1, checkpoint=checkpoint)
+    with connect(checkpoint) as connection:
+        connection.execute("DELETE FROM scores WHERE run = 1 OR oversampler = 'SMOTE'")
+    experiment = create_experiment().run(n_jobs=1, checkpoint=checkpoint, resume=True)
+    assert_scores_equal(experiment.scores_, separate_scores)
+
+
+@pytest.mark.parametrize('search', ['grid', 'halving'])
+def test_shards_merge(tmp_path, search):
+    """Test that the merged shards of an experiment have the same scores as the experiment."""
+    params = {'search': search, 'min_resource': 1, 'reduction_factor': 2} if search == 'halving' else {}
+    expected_scores = create_experiment(**params).run(n_jobs=1).scores_
+    paths = [str(tmp_path / f'test.shard-{index + 1}-of-3.db') for index in range(3)]
+    for index, path in enumerate(paths):
+        create_experiment(**params).run(n_jobs=1, checkpoint=path, shard=(index, 3))
+    experiment = create_experiment(**params).merge(paths, str(tmp_path / 'test.db'))
+    assert_scores_equal(experiment.scores_, expected_scores)
+
+
+def test_merge_missing_shard(tmp_path):
+    """Test that the shards are merged only when all of them are finished."""
+    path = str(tmp_path / 'test.shard-1-of-2.db')
+    create_experiment().run(n_jobs=1, checkpoint=path, shard=(0, 2))
+    with pytest.raises(ValueError, match='all shards'):
+        create_experiment().merge([path], str(tmp_path / 'test.db'))
+
+
+def test_canonicalize_params():
+    """Test that the number of minority neighbors is removed only when the majority neighbors are selected without clustering."""
+    params = {'k_neighbors': 3, 'truncation_factor': 0.5}
+    assert canonicalize_params(params, {'selection_strategy': 'majority'}) == {'truncation_factor': 0.5}
+    assert canonicalize_params(params, {'selection_strategy': 'combined'}) == params
+    assert canonicalize_params({**params, 'selection_strategy': 'majority'}, {}) == {'truncation_factor': 0.5, 'selection_strategy': 'majority'}
+    assert canonicalize_params(params, {'selection_strategy': 'majority', 'clusterer': KMeans()}) == params
+    assert canonicalize_params({'smote__k_neighbors': 3}, {'smote__selection_strategy': 'majority', 'smote__clusterer': None}) == {}
+
+
+@pytest.mark.parametrize('clusterer', [None, KMeans(n_clusters=2, n_init=1)])
+def test_equivalent_geometric_oversamplers(clusterer):
+    """Test that the number of minority neighbors is ignored with the majority selection strategy only by unclustered oversamplers."""
+    grid = {'k_neighbors': [3, 5], 'selection_strategy': ['combined', 'majority']}
+    oversamplers = [('G-SMOTE', GeometricOversampler(clusterer=clusterer), grid)]
+    experiment = Experiment('test', DATASETS, oversamplers, CLASSIFIERS, n_splits=N_SPLITS, n_runs=N_RUNS, random_state=RANDOM_STATE)
+    experiment._initialize(1, 0)
+    expected_equivalents = {0: [0], 1: [1, 3], 2: [2]} if clusterer is None else {0: [0], 1: [1], 2: [2], 3: [3]}
+    assert experiment.equivalents_['G-SMOTE'] == expected_equivalents
+
+
+def test_equivalent_oversamplers():
+    """Test that oversampler configurations with identical resampled data fit the classifiers once and share their scores."""
+    oversamplers = [('RANDOM OVERSAMPLING', RandomOverSampler(), {'sampling_strategy': ['auto', 'minority', 1.0]})]
+    classifiers = [('DT', CountingClassifier(), {})]
+    CountingClassifier.n_fits = 0
+    experiment = Experiment(
+        'test', DATASETS, oversamplers, classifiers, scoring=SCORING, n_splits=N_SPLITS, n_runs=N_RUNS, random_state=RANDOM_STATE
+    ).run(n_jobs=1)
+    assert CountingClassifier.n_fits == len(DATASETS) * N_SPLITS * N_RUNS
+    assert len(experiment.scores_) == 3 * len(DATASETS) * N_SPLITS * N_RUNS
+    scores = experiment.scores_.groupby(['Dataset', 'Run', 'Fold'])[SCORING].nunique()
+    assert (scores == 1).all().all()
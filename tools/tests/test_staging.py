@@ -0,0 +1,68 @@
+"""
+Test the evaluation of nested classifier configurations from a single fit.
+"""
+
+# Author: Georgios Douzas <gdouzas@icloud.com>
+# License: MIT
+
+import numpy as np
+import pytest
+from sklearn.base import clone
+from sklearn.ensemble import GradientBoostingClassifier
+from sklearn.neighbors import KNeighborsClassifier
+from sklearn.tree import DecisionTreeClassifier
+
+from tools.staging import get_staged_param, group_staged_classifiers, truncate_classifier
+from tools.tests.test_runner import generate_dataset
+
+
+def generate_tied_dataset():
+    """Generate a dataset of integer features and duplicated samples, therefore with many equidistant neighbors."""
+    X, y = generate_dataset(0)
+    X = np.round(X)
+    return np.vstack([X, X[:20]]), np.hstack([y, y[:20]])
+
+
+@pytest.mark.parametrize('weights', ['uniform', 'distance'])
+@pytest.mark.parametrize('tied', [False, True])
+def test_truncated_neighbors(weights, tied):
+    """Test that the truncated nearest neighbors classifiers predict the same as separate fits."""
+    X, y = generate_tied_dataset() if tied else generate_dataset(0)
+    X_train, y_train, X_test = X[::2], y[::2], X[1::2]
+    classifier = KNeighborsClassifier(n_neighbors=7, weights=weights).fit(X_train, y_train)
+    values = [5, 3, 1]
+    for value, truncated in zip(values, truncate_classifier(classifier, 'n_neighbors', values, X_test, y_train)):
+        expected = KNeighborsClassifier(n_neighbors=value, weights=weights).fit(X_train, y_train)
+        np.testing.assert_array_equal(truncated.predict(X_test), expected.predict(X_test))
+        np.testing.assert_allclose(truncated.predict_proba(X_test), expected.predict_proba(X_test))
+        np.testing.assert_array_equal(truncated.predict(X_train), expected.predict(X_train))
+
+
+def test_truncated_boosting():
+    """Test that the truncated gradient boosting classifiers predict the same as separate fits."""
+    X, y = generate_dataset(0)
+    classifier = GradientBoostingClassifier(n_estimators=20, max_depth=2, random_state=0).fit(X, y)
+    values = [10, 5]
+    for value, truncated in zip(values, truncate_classifier(classifier, 'n_estimators', values, X, y)):
+        expected = GradientBoostingClassifier(n_estimators=value, max_depth=2, random_state=0).fit(X, y)
+        np.testing.assert_allclose(truncated.predict_proba(X), expected.predict_proba(X))
+        np.testing.assert_array_equal(truncated.predict(X), expected.predict(X))
+    assert len(classifier.estimators_) == 20
+
+
+def test_group_staged_classifiers():
+    """Test that the classifiers are grouped by their other parameters with the largest staged parameter first."""
+    classifiers = [
+        KNeighborsClassifier(n_neighbors=3),
+        KNeighborsClassifier(n_neighbors=5),
+        KNeighborsClassifier(n_neighbors=3, weights='distance'),
+        GradientBoostingClassifier(n_estimators=50),
+        GradientBoostingClassifier(n_estimators=100),
+        GradientBoostingClassifier(n_estimators=100, n_iter_no_change=5),
+        GradientBoostingClassifier(n_estimators=50, n_iter_no_change=5),
+        DecisionTreeClassifier(),
+        clone(DecisionTreeClassifier())
+    ]
+    assert group_staged_classifiers(classifiers) == [[1, 0], [2], [4, 3], [5], [6], [7], [8]]
+    assert get_staged_param(classifiers[5]) is None
+    assert get_staged_param(KNeighborsClassifier(weights=lambda distances: distances)) is None
@@ -0,0 +1,107 @@
+"""
+Test the scores store and the work queue of the experiments.
+"""
+
+# Author: Georgios Douzas <gdouzas@icloud.com>
+# License: MIT
+
+from threading import Thread
+from time import sleep
+
+import numpy as np
+import pytest
+
+from tools.store import ScoresStore, TaskQueue
+from tools.tests.test_runner import create_experiment, assert_scores_equal
+
+ROW = ('DATASET', 'SMOTE', "{'k_neighbors': 3}", 'KNN', "{'n_neighbors': 3}", 0, 1)
+
+
+def test_store_append_read(tmp_path):
+    """Test that the appended scores are read once per key, one column per metric."""
+    store = ScoresStore(str(tmp_path / 'test.db')).initialize()
+    store.write_metadata(metrics=['accuracy', 'f1'])
+    store.append([(*ROW, 0.5, 0.25)], ['accuracy', 'f1'])
+    store.append([(*ROW, 0.75, 0.5)], ['accuracy', 'f1'])
+    scores = store.read(['accuracy', 'f1'])
+    assert len(scores) == 1
+    assert tuple(scores.iloc[0]) == (*ROW, 0.75, 0.5)
+    assert store.read_metadata() == {'metrics': ['accuracy', 'f1']}
+    assert ScoresStore(str(tmp_path / 'test.db')).initialize(reset=True).read(['accuracy']).empty
+
+
+def test_store_results(tmp_path):
+    """Test that the results calculated from the store are the same as the ones of the experiment."""
+    checkpoint = str(tmp_path / 'test.db')
+    experiment = create_experiment().run(n_jobs=1, checkpoint=checkpoint).calculate_results()
+    results = ScoresStore(checkpoint).calculate_results()
+    for attribute in ('optimal_results_', 'mean_scores_', 'mean_ranking_', 'friedman_test_', 'holms_test_'):
+        np.testing.assert_allclose(
+            getattr(results, attribute).select_dtypes('number').to_numpy(dtype=float),
+            getattr(experiment, attribute).select_dtypes('number').to_numpy(dtype=float),
+            atol=1e-10
+        )
+
+
+def test_queue_claim_lease(tmp_path):
+    """Test that tasks are claimed once while their leases are valid and claimed again when they expire."""
+    queue = TaskQueue(str(tmp_path / 'test.db'), lease_duration=0.2).initialize()
+    queue.put([['first'], ['second'], ['third']], 0)
+    assert [payload for _, payload in queue.claim('worker-1', 2)] == [['first'], ['second']]
+    [(task_id, payload)] = queue.claim('worker-2', 2)
+    assert payload == ['third']
+    assert not queue.claim('worker-3')
+
+    # Renewed leases are kept, expired ones are claimed again
+    sleep(0.1)
+    queue.renew([task_id], 'worker-2')
+    queue.renew([task_id], 'worker-1')
+    sleep(0.15)
+    assert [payload for _, payload in queue.claim('worker-3', 3)] == [['first'], ['second']]
+    assert queue.count_pending() == 3
+
+    # Completed tasks are not claimed again and their scores are appended
+    queue.complete(task_id, [(*ROW, 0.5)], ['accuracy'])
+    assert queue.count_pending() == 2
+    sleep(0.25)
+    assert [payload for _, payload in queue.claim('worker-4', 3)] == [['first'], ['second']]
+    assert tuple(queue.read(['accuracy']).iloc[0]) == (*ROW, 0.5)
+
+
+def test_queue_put(tmp_path):
+    """Test that the tasks of an iteration replace the pending tasks."""
+    queue = TaskQueue(str(tmp_path / 'test.db')).initialize()
+    queue.put([['first'], ['second']], 0)
+    [(task_id, _)] = queue.claim('worker')
+    queue.complete(task_id, [], ['accuracy'])
+    queue.put([['third']], 1)
+    assert queue.count_pending() == 1
+    assert queue.count_pending(0) == 0
+    assert queue.read_status() is None
+    queue.write_metadata(status='running')
+    assert queue.read_status() == 'running'
+
+
+def test_distribute(tmp_path):
+    """Test that a distributed experiment and its worker have the same scores as the experiment."""
+    path = str(tmp_path / 'test.db')
+    params = {'search': 'halving', 'min_resource': 1, 'reduction_factor': 2}
+    worker = Thread(target=create_experiment(**params).work, args=(path, 1, 0, 60, 0.05))
+    worker.start()
+    experiment = create_experiment(**params).distribute(path, n_jobs=1, poll_interval=0.05)
+    worker.join(timeout=60)
+    assert not worker.is_alive()
+    assert TaskQueue(path).read_status() == 'finished'
+    assert_scores_equal(experiment.scores_, create_experiment(**params).run(n_jobs=1).scores_)
+
+
+@pytest.mark.parametrize('params', [{'n_splits': 2}, {'random_state': 6}, {'search': 'halving'}, {'scoring': ['accuracy']}])
+def test_worker_configuration(tmp_path, params):
+    """Test that a worker with a different configuration than the distributed experiment is rejected."""
+    path = str(tmp_path / 'test.db')
+    experiment = create_experiment()
+    experiment._initialize(1, 0)
+    queue = TaskQueue(path).initialize()
+    queue.write_metadata(**experiment._generate_metadata(), status='running')
+    with pytest.raises(ValueError, match='do not match'):
+        create_experiment(**params).work(path, 1, poll_interval=0.05)